@@ -1,14 +1,61 @@
 import re
-from collections import Counter
+import heapq
+import itertools
+import threading
+from collections import Counter, deque
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, NamedTuple, FrozenSet
+
+from Slack_ingestion.keyword_automaton import KeywordAutomaton, TOKEN_PATTERN
+
+# Common words left out of trending topics
+STOP_WORDS = frozenset({'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'who', 'boy', 'did', 'man', 'men', 'put', 'say', 'she', 'too', 'use'})
+
+# Keyword-set labels reported by the automaton
+PROBLEM, QUESTION, URGENCY, BLOCKER = 'problem', 'question', 'urgency', 'blocker'
+PROBLEM_STATEMENT, AUTH_THEME, DEPLOY_THEME = 'problem statement', 'auth theme', 'deploy theme'
+
+THEME_KEYWORDS = {
+    PROBLEM_STATEMENT: ('problem statement',),
+    AUTH_THEME: ('authentication', 'api', 'auth', 'login'),
+    DEPLOY_THEME: ('deployment', 'deploy', 'deploying', 'deployed', 'hosting', 'database connection'),
+}
+
+# Checked in order; the first matching category wins
+PROBLEM_CATEGORIES = (
+    ('Database/Infrastructure', ('database', 'connection', 'timeout', 'timeouts')),
+    ('Authentication', ('authentication', 'login', 'auth')),
+    ('Deployment', ('deployment', 'deploy', 'deploying', 'deployed', 'hosting')),
+    ('Problem Understanding', ('problem', 'problems', 'statement', 'understanding')),
+    ('API Issues', ('api', 'endpoint', 'endpoints', 'request', 'requests')),
+)
+QUESTION_CATEGORIES = (
+    ('How-to', ('how', 'tutorial', 'guide')),
+    ('Clarification', ('what', 'explain', 'clarify')),
+    ('Resource Location', ('where', 'find', 'location')),
+)
+
+class MessageFeatures(NamedTuple):
+    """Everything the analysis needs from one message, computed in a single pass."""
+    message: Dict
+    text: str
+    text_lower: str
+    words: List[str]
+    is_problem: bool
+    is_question: bool
+    urgency: int
+    category: str
+    # Labels of every keyword set found in the message
+    keywords: FrozenSet[str]
 
 class AIService:
     def __init__(self):
+        # Keywords match whole words, so plural and verb forms are listed explicitly
         self.problem_keywords = [
             'problem', 'issue', 'error', 'bug', 'stuck', 'help', 'broken', 
             'not working', 'failed', 'trouble', 'difficult', 'confused',
-            'timeout', 'connection', 'authentication', 'deployment', 'database'
+            'timeout', 'connection', 'authentication', 'deployment', 'database',
+            'problems', 'issues', 'errors', 'bugs', 'fails', 'failing', 'timeouts'
         ]
         
         self.question_keywords = [
@@ -20,18 +67,32 @@ class AIService:
             'urgent', 'asap', 'immediately', 'critical', 'blocking', 'stuck',
             'deadline', 'emergency', 'priority'
         ]
+        
+        # Every keyword set in one automaton, so each message is scanned once
+        self._automaton = KeywordAutomaton({
+            PROBLEM: self.problem_keywords,
+            QUESTION: self.question_keywords,
+            URGENCY: self.urgency_keywords,
+            BLOCKER: ('blocking', 'stuck'),
+            **THEME_KEYWORDS,
+            **dict(PROBLEM_CATEGORIES),
+            **dict(QUESTION_CATEGORIES)
+        })
 
     def analyze_messages(self, messages: List[Dict]) -> Dict[str, Any]:
         """Analyze messages and generate rich insights."""
         if not messages:
             return self._get_empty_insights()
         
-        # Categorize messages
-        problems = self._find_problems(messages)
-        questions = self._find_questions(messages)
-        trending = self._find_trending_topics(messages)
-        
-        # Generate insights
+        # Read every message once; each section works from the feature records
+        features = self._extract_features(messages)
+        problems = self._find_problems(features)
+        questions = self._find_questions(features)
+        trending = self._find_trending_topics(features)
+        return self._format_insights(problems, questions, trending)
+    
+    def _format_insights(self, problems: List[Dict], questions: List[Dict], trending: Dict[str, Any]) -> Dict[str, str]:
+        """Generate insights from the analyzed sections."""
         insights = {
             'problems': self._format_problems(problems),
             'questions': self._format_questions(questions),
@@ -40,63 +101,86 @@ class AIService:
         
         return insights
     
-    def _find_problems(self, messages: List[Dict]) -> List[Dict]:
+    def _extract_features(self, messages: List[Dict]) -> List[MessageFeatures]:
+        """Lowercase, tokenize, flag and score every message exactly once."""
+        return [self._message_features(msg) for msg in messages]
+    
+    def _message_features(self, msg: Dict) -> MessageFeatures:
+        """Everything the analysis needs from one message."""
+        text = msg.get('text', '')
+        text_lower = text.lower()
+        tokens = TOKEN_PATTERN.findall(text_lower)
+        keywords = self._automaton.scan_tokens(tokens)
+        is_problem = PROBLEM in keywords
+        is_question = text.strip().endswith('?') or QUESTION in keywords
+        
+        if is_problem:
+            urgency, category = self._assess_urgency(text_lower, keywords), self._categorize_problem(keywords)
+        elif is_question:
+            urgency, category = 0, self._categorize_question(keywords)
+        else:
+            urgency, category = 0, ''
+        
+        return MessageFeatures(
+            message=msg,
+            text=text,
+            text_lower=text_lower,
+            # ASCII words of 3+ letters, as \b[a-zA-Z]{3,}\b would find them
+            words=[word for word in tokens
+                   if len(word) > 2 and word.isalpha() and word.isascii() and word not in STOP_WORDS],
+            is_problem=is_problem,
+            is_question=is_question,
+            urgency=urgency,
+            category=category,
+            keywords=keywords
+        )
+    
+    def _find_problems(self, features: List[MessageFeatures]) -> List[Dict]:
         """Find problem-related messages with context."""
-        problems = []
-        
-        for msg in messages:
-            text = msg.get('text', '').lower()
-            if any(keyword in text for keyword in self.problem_keywords):
-                # Extract context
-                context = self._extract_context(text, msg)
-                problems.append({
-                    'message': msg,
-                    'context': context,
-                    'urgency': self._assess_urgency(text),
-                    'category': self._categorize_problem(text)
-                })
-        
-        return sorted(problems, key=lambda x: x['urgency'], reverse=True)[:5]
+        problems = [f for f in features if f.is_problem]
+        top = sorted(problems, key=lambda f: f.urgency, reverse=True)[:5]
+        
+        # Context is only built for the problems that are shown
+        return [{
+            'message': f.message,
+            'context': self._extract_context(f.text_lower, f.message),
+            'urgency': f.urgency,
+            'category': f.category
+        } for f in top]
     
-    def _find_questions(self, messages: List[Dict]) -> List[Dict]:
+    def _find_questions(self, features: List[MessageFeatures]) -> List[Dict]:
         """Find question messages with context."""
         questions = []
         
-        for msg in messages:
-            text = msg.get('text', '')
-            if (text.strip().endswith('?') or 
-                any(keyword in text.lower() for keyword in self.question_keywords)):
-                context = self._extract_context(text, msg)
-                questions.append({
-                    'message': msg,
-                    'context': context,
-                    'category': self._categorize_question(text)
-                })
-        
-        return questions[:5]
+        for f in features:
+            if not f.is_question:
+                continue
+            # A problem that is also a question was categorized as a problem
+            category = self._categorize_question(f.keywords) if f.is_problem else f.category
+            questions.append({
+                'message': f.message,
+                'context': self._extract_context(f.text, f.message),
+                'category': category
+            })
+            if len(questions) == 5:
+                break
+        
+        return questions
     
-    def _find_trending_topics(self, messages: List[Dict]) -> Dict[str, Any]:
+    def _find_trending_topics(self, features: List[MessageFeatures]) -> Dict[str, Any]:
         """Find trending topics and themes."""
-        # Extract words and phrases
-        all_text = ' '.join([msg.get('text', '') for msg in messages])
-        
-        # Clean and extract meaningful words
-        words = re.findall(r'\b[a-zA-Z]{3,}\b', all_text.lower())
-        
-        # Filter out common words
-        stop_words = {'the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'who', 'boy', 'did', 'man', 'men', 'put', 'say', 'she', 'too', 'use'}
-        meaningful_words = [word for word in words if word not in stop_words]
-        
         # Count frequency
-        word_counts = Counter(meaningful_words)
+        word_counts = Counter()
+        for f in features:
+            word_counts.update(f.words)
         
         # Extract themes
-        themes = self._extract_themes(messages)
+        themes = self._extract_themes(features)
         
         return {
             'top_words': word_counts.most_common(10),
             'themes': themes,
-            'team_activity': self._analyze_team_activity(messages)
+            'team_activity': self._analyze_team_activity(features)
         }
     
     def _extract_context(self, text: str, msg: Dict) -> str:
@@ -134,14 +218,14 @@ class AIService:
             return text
         return text[0].upper() + text[1:] if text and not text[0].isupper() else text
     
-    def _assess_urgency(self, text: str) -> int:
-        """Assess urgency level (1-5)."""
+    def _assess_urgency(self, text: str, keywords: FrozenSet[str]) -> int:
+        """Assess urgency level (1-5) from the text and its matched keyword sets."""
         urgency_score = 1
         
-        if any(keyword in text for keyword in self.urgency_keywords):
+        if URGENCY in keywords:
             urgency_score += 2
         
-        if 'blocking' in text or 'stuck' in text:
+        if BLOCKER in keywords:
             urgency_score += 1
             
         if '?' in text:
@@ -149,84 +233,73 @@ class AIService:
             
         return min(urgency_score, 5)
     
-    def _categorize_problem(self, text: str) -> str:
-        """Categorize the type of problem."""
-        text_lower = text.lower()
-        
-        if any(word in text_lower for word in ['database', 'connection', 'timeout']):
-            return 'Database/Infrastructure'
-        elif any(word in text_lower for word in ['authentication', 'login', 'auth']):
-            return 'Authentication'
-        elif any(word in text_lower for word in ['deployment', 'deploy', 'hosting']):
-            return 'Deployment'
-        elif any(word in text_lower for word in ['problem', 'statement', 'understanding']):
-            return 'Problem Understanding'
-        elif any(word in text_lower for word in ['api', 'endpoint', 'request']):
-            return 'API Issues'
-        else:
-            return 'General Technical'
+    def _categorize_problem(self, keywords: FrozenSet[str]) -> str:
+        """Categorize the type of problem from its matched keyword sets."""
+        for category, _ in PROBLEM_CATEGORIES:
+            if category in keywords:
+                return category
+        return 'General Technical'
     
-    def _categorize_question(self, text: str) -> str:
-        """Categorize the type of question."""
-        text_lower = text.lower()
-        
-        if any(word in text_lower for word in ['how', 'tutorial', 'guide']):
-            return 'How-to'
-        elif any(word in text_lower for word in ['what', 'explain', 'clarify']):
-            return 'Clarification'
-        elif any(word in text_lower for word in ['where', 'find', 'location']):
-            return 'Resource Location'
-        else:
-            return 'General Question'
+    def _categorize_question(self, keywords: FrozenSet[str]) -> str:
+        """Categorize the type of question from its matched keyword sets."""
+        for category, _ in QUESTION_CATEGORIES:
+            if category in keywords:
+                return category
+        return 'General Question'
     
-    def _extract_themes(self, messages: List[Dict]) -> List[Dict]:
+    def _extract_themes(self, features: List[MessageFeatures]) -> List[Dict]:
         """Extract common themes from messages."""
+        theme_counts = Counter()
+        for f in features:
+            theme_counts.update(f.keywords & THEME_KEYWORDS.keys())
+        return self._themes(theme_counts)
+    
+    def _themes(self, theme_counts: Dict[str, int]) -> List[Dict]:
+        """Describe the themes from the number of messages matching each one."""
         themes = []
+        problem_statement_count = theme_counts.get(PROBLEM_STATEMENT, 0)
+        auth_count = theme_counts.get(AUTH_THEME, 0)
+        deploy_count = theme_counts.get(DEPLOY_THEME, 0)
         
         # Problem statement confusion
-        problem_statement_msgs = [msg for msg in messages 
-                                if 'problem statement' in msg.get('text', '').lower()]
-        if problem_statement_msgs:
+        if problem_statement_count:
             themes.append({
                 'name': 'Problem Statement Clarification',
                 'description': 'Multiple participants are struggling to understand the problem statement.',
-                'count': len(problem_statement_msgs),
+                'count': problem_statement_count,
                 'urgency': 'high'
             })
         
         # API/Authentication issues
-        auth_msgs = [msg for msg in messages 
-                    if any(word in msg.get('text', '').lower() 
-                          for word in ['authentication', 'api', 'auth', 'login'])]
-        if auth_msgs:
+        if auth_count:
             themes.append({
                 'name': 'API & Authentication Issues',
                 'description': 'Several teams are reporting problems with API authentication and general authentication flows.',
-                'count': len(auth_msgs),
+                'count': auth_count,
                 'urgency': 'high'
             })
         
         # Deployment issues
-        deploy_msgs = [msg for msg in messages 
-                      if any(word in msg.get('text', '').lower() 
-                            for word in ['deployment', 'deploy', 'hosting', 'database connection'])]
-        if deploy_msgs:
+        if deploy_count:
             themes.append({
                 'name': 'Deployment & Infrastructure',
                 'description': 'Questions about deploying apps and database connection timeouts highlight infrastructure challenges.',
-                'count': len(deploy_msgs),
+                'count': deploy_count,
                 'urgency': 'medium'
             })
         
         return themes
     
-    def _analyze_team_activity(self, messages: List[Dict]) -> Dict[str, Any]:
+    def _analyze_team_activity(self, features: List[MessageFeatures]) -> Dict[str, Any]:
         """Analyze team activity patterns."""
         user_activity = {}
-        for msg in messages:
-            user = msg.get('user', 'unknown')
+        for f in features:
+            user = f.message.get('user', 'unknown')
             user_activity[user] = user_activity.get(user, 0) + 1
-        
+        return self._team_activity(user_activity)
+    
+    def _team_activity(self, user_activity: Dict[str, int]) -> Dict[str, Any]:
+        """Summarize team activity from message counts per user."""
         return {
             'most_active_users': sorted(user_activity.items(), key=lambda x: x[1], reverse=True)[:5],
             'total_active_users': len(user_activity),
@@ -299,5 +372,98 @@ class AIService:
             'trending': "No trending topics identified. Activity level is low."
         }
 
+class InsightWindow:
+    """Running analyzer state over the last `window` messages.
+
+    Each message is analyzed once when it arrives and its counts are
+    subtracted again when it leaves the window, so reading the insights only
+    formats the current state instead of re-analyzing every message. The
+    result is kept until the next message arrives.
+    """
+
+    def __init__(self, analyzer: AIService, window: int = 100):
+        self.analyzer = analyzer
+        self.window = window
+        self.entries = deque()
+        self.seq = 0
+        # Arrival numbers of the messages in the window using each word / posted by each user;
+        # the counts are their lengths, and ties are ordered by first appearance as in analyze_messages
+        self.word_seen = {}
+        self.user_seen = {}
+        self.theme_counts = Counter()
+        # Problems queued per urgency level (1-5) and questions, oldest first
+        self.problems = {level: deque() for level in range(1, 6)}
+        self.questions = deque()
+        self._insights = None
+        self._lock = threading.Lock()
+
+    def _apply(self, features: MessageFeatures, seq: int, sign: int):
+        _track(self.user_seen, features.message.get('user', 'unknown'), seq, sign)
+        for position, word in enumerate(features.words):
+            _track(self.word_seen, word, (seq, position), sign)
+        for theme in features.keywords & THEME_KEYWORDS.keys():
+            self.theme_counts[theme] += sign
+
+    def add(self, msg: Dict):
+        """Analyze a new message, dropping the oldest one if the window is full."""
+        features = self.analyzer._message_features(msg)
+        with self._lock:
+            self.seq += 1
+            self.entries.append((self.seq, features))
+            self._apply(features, self.seq, 1)
+            if features.is_problem:
+                self.problems[features.urgency].append(features)
+            if features.is_question:
+                self.questions.append(features)
+
+            if len(self.entries) > self.window:
+                seq, oldest = self.entries.popleft()
+                self._apply(oldest, seq, -1)
+                # The oldest message is also the oldest in its queues
+                if oldest.is_problem:
+                    self.problems[oldest.urgency].popleft()
+                if oldest.is_question:
+                    self.questions.popleft()
+            self._insights = None
+
+    def insights(self) -> Dict[str, str]:
+        """Return the insights for the current window, as analyze_messages would."""
+        with self._lock:
+            if self._insights is None:
+                self._insights = self._build()
+            return dict(self._insights)
+
+    def _build(self) -> Dict[str, str]:
+        if not self.entries:
+            return self.analyzer._get_empty_insights()
+
+        # Most urgent first, oldest first within a level
+        top_problems = []
+        for level in range(5, 0, -1):
+            top_problems.extend(itertools.islice(self.problems[level], 5 - len(top_problems)))
+
+        top_words = heapq.nsmallest(10, self.word_seen.items(), key=lambda item: (-len(item[1]), item[1][0]))
+        users = sorted(self.user_seen.items(), key=lambda item: item[1][0])
+
+        analyzer = self.analyzer
+        trending = {
+            'top_words': [(word, len(seen)) for word, seen in top_words],
+            'themes': analyzer._themes(self.theme_counts),
+            'team_activity': analyzer._team_activity({user: len(seen) for user, seen in users})
+        }
+        return analyzer._format_insights(analyzer._find_problems(top_problems),
+                                         analyzer._find_questions(list(itertools.islice(self.questions, 5))),
+                                         trending)
+
+def _track(seen: Dict[Any, deque], key: Any, seq: Any, sign: int):
+    """Record an occurrence of key at seq, or forget its oldest one when sign is negative."""
+    if sign > 0:
+        seen.setdefault(key, deque()).append(seq)
+        return
+    occurrences = seen[key]
+    occurrences.popleft()
+    if not occurrences:
+        del seen[key]
+
 # Global instance
 ai_service = AIService()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for AIService.analyze_messages.
+Times the single feature-extraction pass and the sections built from it on
+synthetic hackathon chat, then compares an /api/insights poll that re-analyzes
+the window with one served from the incremental InsightWindow. Run from the
+repository root:
+
+    python -m Slack_ingestion.benchmark_analyzer --sizes 10000 100000
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from Slack_ingestion.ai_service import AIService, InsightWindow
+
+PHRASES = [
+    "we have a problem with the login api", "database connection timeout again",
+    "how do we deploy the frontend", "is there a mentor for the ml track",
+    "urgent: the build is blocking our demo", "what is the problem statement for track two",
+    "docker image fails on the hosting provider", "great progress everyone",
+    "lunch is served in the main hall", "can someone explain the judging criteria",
+]
+
+def make_messages(count: int) -> list:
+    """Synthetic chat: one or two phrases per message from a few dozen users."""
+    random.seed(11)
+    messages = []
+    for i in range(count):
+        text = ". ".join(random.sample(PHRASES, random.randint(1, 2))).capitalize()
+        messages.append({'user': f"user{random.randint(0, 60)}", 'text': text + random.choice(["", "?", "!"]),
+                         'ts': str(1700000000 + i)})
+    return messages
+
+def timed(func, runs: int) -> float:
+    """Best wall time of func over runs."""
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="AIService.analyze_messages benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    service = AIService()
+    print(f"🧪 analyze_messages, best of {args.runs} runs")
+    print("=" * 60)
+    print(f"{'messages':>10} {'features':>12} {'sections':>12} {'total':>12} {'per msg':>10}")
+    for size in args.sizes:
+        messages = make_messages(size)
+        features = service._extract_features(messages)
+        extract = timed(lambda: service._extract_features(messages), args.runs)
+        sections = timed(lambda: (service._find_problems(features), service._find_questions(features),
+                                  service._find_trending_topics(features)), args.runs)
+        total = timed(lambda: service.analyze_messages(messages), args.runs)
+        print(f"{size:>10} {extract * 1000:>10.1f}ms {sections * 1000:>10.1f}ms {total * 1000:>10.1f}ms "
+              f"{total / size * 1e6:>8.2f}us")
+
+    print("\n📊 /api/insights poll after one new message")
+    print("=" * 60)
+    print(f"{'window':>10} {'re-analyze':>12} {'incremental':>12}")
+    for size in args.sizes:
+        messages = make_messages(size + args.runs)
+        window = InsightWindow(service, window=size)
+        for msg in messages[:size]:
+            window.add(msg)
+        stream = iter(messages[size:])
+
+        def poll():
+            window.add(next(stream))
+            return window.insights()
+
+        full = timed(lambda: service.analyze_messages(messages[-size:]), args.runs)
+        incremental = timed(poll, args.runs)
+        print(f"{size:>10} {full * 1000:>10.1f}ms {incremental * 1000:>10.2f}ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import re
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Sequence
+
+# Word tokens, split at the same places as regex \b; keywords only match whole tokens
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton over word tokens for several labelled keyword sets.
+
+    Every keyword (a word or a phrase such as "not working") is compiled into
+    one trie with failure links, so a message is tokenized and scanned once
+    and the scan reports the label of every keyword set that matched. Because
+    transitions are on whole tokens, "how" does not match inside "show".
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[FrozenSet[str]] = [frozenset()]
+
+        for label, keywords in groups.items():
+            for keyword in keywords:
+                state = 0
+                for token in TOKEN_PATTERN.findall(keyword.lower()):
+                    next_state = self.goto[state].get(token)
+                    if next_state is None:
+                        next_state = len(self.goto)
+                        self.goto[state][token] = next_state
+                        self.goto.append({})
+                        self.fail.append(0)
+                        self.output.append(frozenset())
+                    state = next_state
+                if state:
+                    self.output[state] = self.output[state] | {label}
+
+        # Breadth-first, so each state's failure target is finished before it is used
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(token, 0)
+                self.output[next_state] = self.output[next_state] | self.output[self.fail[next_state]]
+                queue.append(next_state)
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        """Return the labels of all keyword sets with a whole-word match in the (lowercased) text."""
+        return self.scan_tokens(TOKEN_PATTERN.findall(text))
+
+    def scan_tokens(self, tokens: Sequence[str]) -> FrozenSet[str]:
+        """Like scan(), for text already split with TOKEN_PATTERN."""
+        goto, fail, output = self.goto, self.fail, self.output
+        found = frozenset()
+        state = 0
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if output[state]:
+                found = found | output[state]
+        return found
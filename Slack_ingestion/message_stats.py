@@ -0,0 +1,54 @@
+from collections import Counter, deque
+
+PROBLEM_KEYWORDS = ['problem', 'issue', 'error', 'bug', 'stuck', 'help', 'broken', 'not working']
+
+
+class RecentMessageStats:
+    """Running counters over the last `window` messages.
+
+    Each message is scored once when it arrives and subtracted again when it
+    leaves the window, so reading the stats never rescans messages.
+    """
+
+    def __init__(self, window=100):
+        self.window = window
+        self.entries = deque()
+        self.users = Counter()
+        self.length_sum = 0
+        self.questions = 0
+        self.problems = 0
+
+    def _apply(self, entry, sign):
+        user, length, is_question, has_problem = entry
+        self.length_sum += sign * length
+        self.questions += sign * is_question
+        self.problems += sign * has_problem
+        self.users[user] += sign
+        if self.users[user] <= 0:
+            del self.users[user]
+
+    def add(self, msg):
+        """Count a new message, dropping the oldest one if the window is full."""
+        text = msg.get('text', '') or ''
+        text_lower = text.lower()
+        entry = (
+            msg.get('user', ''),
+            len(text),
+            int(text.strip().endswith('?')),
+            int(any(keyword in text_lower for keyword in PROBLEM_KEYWORDS)),
+        )
+        self.entries.append(entry)
+        self._apply(entry, 1)
+        if len(self.entries) > self.window:
+            self._apply(self.entries.popleft(), -1)
+
+    def snapshot(self):
+        """Return the stats for the current window."""
+        total = len(self.entries)
+        return {
+            'total_messages': total,
+            'unique_users': len(self.users),
+            'avg_message_length': round(self.length_sum / total if total else 0, 1),
+            'questions_count': self.questions,
+            'problems_count': self.problems,
+        }
@@ -1,15 +1,19 @@
 from flask import Flask, request, render_template, jsonify, redirect, session, url_for
 import os
+import heapq
 from dotenv import load_dotenv
 from datetime import datetime
 import json
 from authlib.integrations.flask_client import OAuth
-from Slack_ingestion.ai_service import ai_service
+from Slack_ingestion.ai_service import ai_service, InsightWindow
+from Slack_ingestion.message_stats import RecentMessageStats
 from Slack_ingestion.utils import markdown_to_html, clean_message_text, highlight_keywords, format_user_mention
 
 
 load_dotenv()
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
+# Messages behind /api/insights
+INSIGHTS_WINDOW = int(os.getenv("INSIGHTS_WINDOW", "100"))
 
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", os.urandom(24))
@@ -37,6 +41,10 @@ oauth.register(
 
 # In-memory storage for messages (simple approach)
 messages = []
+# Running counters behind /api/stats (last 100 messages)
+message_stats = RecentMessageStats(window=100)
+# Running analyzer state behind /api/insights
+insight_window = InsightWindow(ai_service, window=INSIGHTS_WINDOW)
 
 def handle_general_question(user_message, query_lower):
     """Handle general questions about programming, technology, and skills."""
@@ -248,6 +256,8 @@ def slack_events():
         # Filter out bot messages and empty text
         if msg.get("text") and msg.get("user"):
             messages.append(msg)
+            message_stats.add(msg)
+            insight_window.add(msg)
             print("New message received:", msg)
             
             # Keep only last 1000 messages to prevent memory issues
@@ -351,12 +361,8 @@ def get_response():
 def get_insights():
     """Get rich AI insights from recent messages."""
     try:
-        recent_messages = messages[-100:] if messages else []
-        
-        # Use AI service for rich analysis
-        insights = ai_service.analyze_messages(recent_messages)
-        
-        return jsonify(insights)
+        # Messages are analyzed as they arrive; this only formats the current window
+        return jsonify(insight_window.insights())
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -365,22 +371,9 @@ def get_insights():
 def get_stats():
     """Get basic statistics about messages."""
     try:
-        recent_messages = messages[-100:] if messages else []
-        
-        unique_users = len(set(msg.get('user', '') for msg in recent_messages))
-        questions_count = sum(1 for msg in recent_messages if msg.get('text', '').strip().endswith('?'))
-        problem_keywords = ['problem', 'issue', 'error', 'bug', 'stuck', 'help', 'broken', 'not working']
-        problems_count = sum(1 for msg in recent_messages 
-                           if any(keyword in msg.get('text', '').lower() for keyword in problem_keywords))
-        
-        return jsonify({
-            'total_messages': len(recent_messages),
-            'unique_users': unique_users,
-            'avg_message_length': round(sum(len(msg.get('text', '')) for msg in recent_messages) / len(recent_messages) if recent_messages else 0, 1),
-            'questions_count': questions_count,
-            'problems_count': problems_count,
-            'last_updated': datetime.now().isoformat()
-        })
+        stats = message_stats.snapshot()
+        stats['last_updated'] = datetime.now().isoformat()
+        return jsonify(stats)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -390,10 +383,8 @@ def get_messages():
     """Get recent messages."""
     try:
         limit = request.args.get("limit", 50, type=int)
-        recent_messages = messages[-limit:] if messages else []
-        
-        # Sort by timestamp (most recent first)
-        recent_messages.sort(key=lambda x: float(x.get('ts', '0')), reverse=True)
+        # Newest `limit` messages by timestamp (most recent first), without sorting them all
+        recent_messages = heapq.nlargest(limit, messages, key=lambda x: float(x.get('ts', '0')))
         
         return jsonify({"messages": recent_messages})
         
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for multi-section insights.
+Uses a local stub model with an injected delay to compare generating the
+problems / questions / trending sections one after another against the
+concurrent fan-out, including the partial result returned when one section is slow.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from ai_service import RAGService
+from insight_cache import InsightCache
+from llm_provider import StubProvider
+from response_cache import ResponseCache
+
+MESSAGES = [
+    {"user": "alice", "text": "We are stuck on an auth error in the API", "ts": str(time.time() - 300)},
+    {"user": "bob", "text": "How do we deploy the frontend?", "ts": str(time.time() - 200)},
+    {"user": "carol", "text": "Database connection timeout again, urgent", "ts": str(time.time() - 100)},
+    {"user": "dave", "text": "Finished the landing page, looks great", "ts": str(time.time() - 50)},
+]
+
+class SlowSectionProvider(StubProvider):
+    """Stub model that takes longer to answer prompts mentioning slow_query."""
+
+    def __init__(self, latency_seconds: float, slow_query: str, slow_latency: float):
+        super().__init__(latency_seconds=latency_seconds)
+        self.slow_query = slow_query
+        self.slow_latency = slow_latency
+
+    def generate(self, prompt: str, max_tokens: int, temperature: float, timeout=None) -> str:
+        if self.slow_query not in prompt:
+            return super().generate(prompt, max_tokens, temperature, timeout=timeout)
+        self.calls += 1
+        self._wait(self.slow_latency, time.monotonic() + timeout if timeout else None)
+        return self._answer(prompt, max_tokens)
+
+def uncached(service: RAGService, func):
+    """Wrap func so every call pays for the model round trips."""
+    def run():
+        service.cache = ResponseCache(path="")
+        return func()
+    return run
+
+def sequential_insights(service: RAGService, messages) -> dict:
+    """The previous behaviour: one model round trip after another."""
+    problems = [m for m in messages if any(k in m['text'].lower() for k in ('error', 'stuck', 'problem'))]
+    questions = [m for m in messages if m['text'].strip().endswith('?')]
+    return {
+        'problems': service.generate_response("What are the top 3 problems teams are facing right now?", problems[:5]),
+        'questions': service.generate_response("Summarize the most frequently asked questions.", questions[:5]),
+        'trending': service.generate_response("What topics are trending in the chat right now?", messages[-10:]),
+    }
+
+def timed(func, runs: int) -> float:
+    """Average wall time of func over runs."""
+    started = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - started) / runs
+
+def main():
+    parser = argparse.ArgumentParser(description="Insight fan-out latency benchmark")
+    parser.add_argument("--delay", type=float, default=0.5, help="stub model latency per call (seconds)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    service = RAGService(provider=StubProvider(latency_seconds=args.delay))
+    service.insight_mode = 'sections'
+
+    print(f"🧪 Insight latency with a stub model ({args.delay:.2f}s per call, {args.runs} runs)")
+    print("=" * 60)
+
+    sequential = timed(uncached(service, lambda: sequential_insights(service, MESSAGES)), args.runs)
+    concurrent = timed(uncached(service, lambda: service.get_predefined_insights(MESSAGES)), args.runs)
+    print(f"{'sequential':<28} {sequential:>8.3f}s")
+    print(f"{'concurrent fan-out':<28} {concurrent:>8.3f}s   ({sequential / concurrent:.1f}x faster)")
+
+    cache = InsightCache(service.generate_response)
+    cache.add_section('problems', "What are the top 3 problems?", lambda: MESSAGES[:1], "No problems.")
+    cache.add_section('questions', "Summarize the questions.", lambda: MESSAGES[1:2], "No questions.")
+    cache.add_section('trending', "What topics are trending?", lambda: MESSAGES, "No activity.")
+    refresh = timed(uncached(service, lambda: cache.refresh(force=True)), args.runs)
+    print(f"{'insight cache refresh':<28} {refresh:>8.3f}s")
+
+    # One section 4x slower than the rest: the others come back at the timeout
+    slow = RAGService(provider=SlowSectionProvider(args.delay, "What topics are trending", args.delay * 4))
+    slow.insight_mode = 'sections'
+    slow.cache = ResponseCache(path="")
+    timeout = args.delay * 2
+    started = time.perf_counter()
+    insights = slow.get_predefined_insights(MESSAGES, timeout=timeout)
+    elapsed = time.perf_counter() - started
+    finished = [name for name, text in insights.items() if text.startswith("Stub answer")]
+    print(f"{'slow section, timeout ' + format(timeout, '.2f') + 's':<28} {elapsed:>8.3f}s   "
+          f"(returned {', '.join(finished)}; trending pending)")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
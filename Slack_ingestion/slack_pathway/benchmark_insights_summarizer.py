@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for insight summarization engines.
+Summarizes the same synthetic chat with the local TextRank summarizer and with
+the LLM path (offline stub model by default, or Gemini with --backend gemini),
+per section and through get_predefined_insights.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from ai_service import RAGService
+from llm_provider import StubProvider, create_provider
+from response_cache import ResponseCache
+
+TOPICS = [
+    "the database connection keeps timing out when we deploy",
+    "login API returns an authentication error",
+    "docker build fails on the frontend image",
+    "how do we submit the demo video",
+    "is there a mentor for the machine learning track",
+    "the judges want a pitch deck by five",
+    "websocket reconnects every few seconds in production",
+]
+FILLER = ["anyone else seeing this?", "we tried restarting it.", "still stuck here.", "thanks for the help!"]
+
+def make_messages(count: int) -> list:
+    """Synthetic chat: topic sentences with some noise, one message per second."""
+    random.seed(7)
+    now = time.time()
+    return [{
+        'message_id': f"m{i}",
+        'user': f"user{i % 25}",
+        'text': f"{random.choice(TOPICS).capitalize()}. {random.choice(FILLER)}",
+        'ts': str(now - (count - i)),
+    } for i in range(count)]
+
+def timed(func, runs: int) -> float:
+    """Average wall time of func over runs."""
+    started = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return (time.perf_counter() - started) / runs
+
+def main():
+    parser = argparse.ArgumentParser(description="TextRank vs LLM insight latency")
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--backend", default="stub", help="LLM backend for the LLM path (stub or gemini)")
+    parser.add_argument("--latency", type=float, default=1.0, help="stub model latency per call (seconds)")
+    args = parser.parse_args()
+
+    provider = StubProvider(latency_seconds=args.latency) if args.backend == "stub" else create_provider(args.backend)
+    service = RAGService(provider=provider)
+    messages = make_messages(args.messages)
+
+    def llm_section():
+        service.cache = ResponseCache(path="")  # every run pays for the model call
+        return service.generate_response("What topics are trending in the chat right now?", messages)
+
+    print(f"🧪 Insight summarization, {args.messages} messages, {args.runs} runs, LLM backend: {args.backend}")
+    print("=" * 60)
+
+    textrank = timed(lambda: service.summarizer.summarize(messages), args.runs)
+    llm = timed(llm_section, args.runs)
+    print(f"{'one section, textrank':<32} {textrank * 1000:>9.1f} ms")
+    print(f"{'one section, llm':<32} {llm * 1000:>9.1f} ms   ({llm / textrank:.0f}x slower)")
+
+    all_textrank = {'problems': 'textrank', 'questions': 'textrank', 'trending': 'textrank'}
+    all_llm = {'problems': 'llm', 'questions': 'llm', 'trending': 'llm'}
+    textrank = timed(lambda: service.get_predefined_insights(messages, engines=all_textrank), args.runs)
+
+    def llm_insights():
+        service.cache = ResponseCache(path="")
+        return service.get_predefined_insights(messages, engines=all_llm)
+
+    llm = timed(llm_insights, args.runs)
+    print(f"{'all insights, textrank':<32} {textrank * 1000:>9.1f} ms")
+    print(f"{'all insights, llm':<32} {llm * 1000:>9.1f} ms")
+
+    print("\nTextRank trending summary:")
+    print(service.summarizer.summarize(messages))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
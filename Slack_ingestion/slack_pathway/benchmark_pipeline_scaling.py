@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark for the Pathway pipeline.
+Runs the keyed aggregates of the pipeline (users, channels, hourly stats) over a
+synthetic multi-channel stream with 1, 2, 4 and 8 Pathway workers and reports throughput.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+WORKER_COUNTS = [1, 2, 4, 8]
+
+def make_message(i: int, num_channels: int, num_users: int, start_ts: float) -> dict:
+    """Build one synthetic hackathon message."""
+    kinds = [
+        "We are stuck on an auth error in the API",
+        "How do we deploy the frontend?",
+        "Database connection timeout again, urgent",
+        "Finished the landing page, looks great",
+    ]
+    return {
+        "user": f"user_{i % num_users}",
+        "text": f"{kinds[i % len(kinds)]} #{i}",
+        "ts": str(start_ts + i * 0.01),
+        "channel": f"channel_{i % num_channels}",
+    }
+
+def run_child(num_messages: int, num_channels: int, num_users: int, shards: int) -> dict:
+    """Build and run the aggregation graph once; worker count comes from PATHWAY_THREADS."""
+    import pathway as pw
+    from stream import channel_shard
+
+    class BenchSchema(pw.Schema):
+        user: str
+        text: str
+        ts: str
+        channel: str
+
+    start_ts = time.time() - num_messages * 0.01
+
+    class SyntheticSubject(pw.io.python.ConnectorSubject):
+        def __init__(self, shard: int, num_shards: int):
+            super().__init__()
+            self.shard = shard
+            self.num_shards = num_shards
+
+        def run(self):
+            # Only build messages for this shard's channels
+            own_channels = {c for c in range(num_channels)
+                            if channel_shard(f"channel_{c}", self.num_shards) == self.shard}
+            for i in range(num_messages):
+                if i % num_channels not in own_channels:
+                    continue
+                self.next(**make_message(i, num_channels, num_users, start_ts))
+
+    shard_tables = [
+        pw.io.python.read(SyntheticSubject(shard, shards), schema=BenchSchema, autocommit_duration_ms=100)
+        for shard in range(shards)
+    ]
+    messages = shard_tables[0] if shards == 1 else pw.Table.concat_reindex(*shard_tables)
+
+    processed = messages.select(
+        user=messages.user,
+        channel=messages.channel,
+        message_length=pw.apply_with_type(len, int, messages.text),
+        is_question=pw.apply_with_type(lambda text: "?" in text, bool, messages.text),
+        hour=pw.apply_with_type(lambda ts: datetime.fromtimestamp(float(ts)).strftime("%Y-%m-%d %H:00"), str, messages.ts),
+    )
+    users = processed.groupby(processed.user).reduce(
+        user_id=processed.user,
+        message_count=pw.reducers.count(),
+    )
+    channels = processed.groupby(processed.channel).reduce(
+        channel_id=processed.channel,
+        message_count=pw.reducers.count(),
+    )
+    hourly = processed.groupby(processed.channel, processed.hour).reduce(
+        channel=processed.channel,
+        hour=processed.hour,
+        message_count=pw.reducers.count(),
+        avg_message_length=pw.reducers.avg(processed.message_length),
+        questions_count=pw.reducers.sum(pw.cast(int, processed.is_question)),
+    )
+
+    for table in (users, channels, hourly):
+        pw.io.subscribe(table, on_change=lambda key, row, time, is_addition: None)
+
+    started = time.perf_counter()
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "workers": int(os.getenv("PATHWAY_THREADS", "1")),
+        "shards": shards,
+        "messages": num_messages,
+        "seconds": round(elapsed, 3),
+        "messages_per_sec": round(num_messages / elapsed, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Pathway pipeline scaling benchmark")
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--channels", type=int, default=64)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=WORKER_COUNTS)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--shards", type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.messages, args.channels, args.users, args.shards)))
+        return 0
+
+    print(f"🧪 Pathway scaling benchmark: {args.messages} messages, {args.channels} channels, {args.users} users")
+    print("=" * 60)
+    print(f"{'workers':>8} {'shards':>7} {'seconds':>9} {'msgs/sec':>12} {'speedup':>8}")
+
+    baseline = None
+    for workers in args.workers:
+        # Each run needs a fresh process: the engine reads PATHWAY_THREADS at startup
+        env = os.environ.copy()
+        env["PATHWAY_THREADS"] = str(workers)
+        result = subprocess.run(
+            [sys.executable, __file__, "--child", "--messages", str(args.messages),
+             "--channels", str(args.channels), "--users", str(args.users), "--shards", str(workers)],
+            env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(f"❌ Run with {workers} workers failed:\n{result.stderr[-2000:]}")
+            return 1
+
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        baseline = baseline or stats["messages_per_sec"]
+        speedup = stats["messages_per_sec"] / baseline
+        print(f"{stats['workers']:>8} {stats['shards']:>7} {stats['seconds']:>9.3f} "
+              f"{stats['messages_per_sec']:>12.1f} {speedup:>7.2f}x")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,7 @@ This demonstrates how Pathway's built-in database engine would work.
 
 import json
 import time
+import bisect
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
@@ -59,7 +60,7 @@ class PathwayDatabase:
         self.indexes = {
             'by_user': defaultdict(list),
             'by_channel': defaultdict(list),
-            'by_timestamp': [],
+            'by_timestamp': [],  # kept sorted by (ts, idx)
             'by_text': defaultdict(list)
         }
     
@@ -71,7 +72,7 @@ class PathwayDatabase:
         # Update indexes (Pathway does this automatically)
         self.indexes['by_user'][message.user].append(len(self.messages) - 1)
         self.indexes['by_channel'][message.channel].append(len(self.messages) - 1)
-        self.indexes['by_timestamp'].append((float(message.ts), len(self.messages) - 1))
+        bisect.insort(self.indexes['by_timestamp'], (float(message.ts), len(self.messages) - 1))
         
         # Text search index
         words = message.text.lower().split()
@@ -105,16 +106,11 @@ class PathwayDatabase:
         """Query recent messages (simulating Pathway's SQL-like queries)."""
         cutoff_time = time.time() - (hours * 3600)
         
-        # Use timestamp index for efficient querying
-        recent_indices = []
-        for timestamp, idx in sorted(self.indexes['by_timestamp'], reverse=True):
-            if timestamp >= cutoff_time:
-                recent_indices.append(idx)
-                if len(recent_indices) >= limit:
-                    break
-        
+        # Scan the time-ordered index from the newest entry; stops after `limit` matches
         results = []
-        for idx in recent_indices:
+        for timestamp, idx in reversed(self.indexes['by_timestamp']):
+            if timestamp < cutoff_time or len(results) >= limit:
+                break
             msg = self.messages[idx]
             if channel is None or msg.channel == channel:
                 results.append({
@@ -174,25 +170,28 @@ class PathwayDatabase:
         cutoff_time = time.time() - (hours * 3600)
         problem_keywords = ['problem', 'issue', 'error', 'bug', 'stuck', 'help', 'broken', 'not working']
         
+        # Newest problems first, scanning the time-ordered index
         results = []
-        for idx, msg in enumerate(self.messages):
-            if float(msg.ts) >= cutoff_time:
-                if any(keyword in msg.text.lower() for keyword in problem_keywords):
-                    results.append({
-                        'message_id': msg.message_id,
-                        'user': msg.user,
-                        'text': msg.text,
-                        'channel': msg.channel,
-                        'timestamp': datetime.fromtimestamp(float(msg.ts)).isoformat(),
-                        'ts': msg.ts,
-                        'message_length': len(msg.text),
-                        'is_question': msg.text.strip().endswith('?'),
-                        'has_problem_keywords': True,
-                        'has_urgency': any(keyword in msg.text.lower() 
-                                         for keyword in ['urgent', 'asap', 'emergency', 'critical'])
-                    })
-                    if len(results) >= limit:
-                        break
+        for timestamp, idx in reversed(self.indexes['by_timestamp']):
+            if timestamp < cutoff_time:
+                break
+            msg = self.messages[idx]
+            if any(keyword in msg.text.lower() for keyword in problem_keywords):
+                results.append({
+                    'message_id': msg.message_id,
+                    'user': msg.user,
+                    'text': msg.text,
+                    'channel': msg.channel,
+                    'timestamp': datetime.fromtimestamp(float(msg.ts)).isoformat(),
+                    'ts': msg.ts,
+                    'message_length': len(msg.text),
+                    'is_question': msg.text.strip().endswith('?'),
+                    'has_problem_keywords': True,
+                    'has_urgency': any(keyword in msg.text.lower() 
+                                     for keyword in ['urgent', 'asap', 'emergency', 'critical'])
+                })
+                if len(results) >= limit:
+                    break
         
         logger.info(f"🔍 Found {len(results)} problem messages")
         return results
@@ -1,101 +1,282 @@
-import google.generativeai as genai
 import os
 import json
-from typing import List, Dict, Any
+import threading
+from typing import List, Dict, Any, Optional, Iterator, Tuple, Callable
 from datetime import datetime
 import logging
+import time
+from utils import message_ts, select_top_k
+from fanout import fan_out
+from embedding_index import EmbeddingIndex
+from response_cache import ResponseCache, response_key
+from context_packer import context_packer, estimate_tokens
+from llm_provider import LLMProvider, create_provider, LLM_REQUEST_TIMEOUT_SECONDS
+from single_flight import SingleFlight
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from llm_scheduler import LLMScheduler, INTERACTIVE, BACKGROUND
+from extractive_answer import extractive_answer
+from textrank import textrank_summarizer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Summarization engine per insight section, e.g. "trending=textrank,problems=textrank" (default llm)
+INSIGHT_ENGINES = os.getenv("INSIGHT_ENGINES", "")
+ENGINE_NAMES = ('llm', 'textrank')
+# "sections" asks the model once per insight section; "batch" answers all LLM sections with one JSON prompt
+INSIGHT_MODE = os.getenv("INSIGHT_MODE", "sections").lower()
+
+PENDING_INSIGHT = "This analysis is taking longer than usual, please check back shortly."
+
+def parse_engines(spec: str) -> Dict[str, str]:
+    """Parse "section=engine,..." into a dict; unknown engines are ignored with a warning."""
+    engines = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        section, engine = (part.strip().lower() for part in item.split("=", 1))
+        if engine in ENGINE_NAMES:
+            engines[section] = engine
+        else:
+            logger.warning(f"⚠️ Unknown insight engine {engine!r} for section {section!r}, using llm")
+    return engines
+
+def _message_ref(msg: Dict) -> Any:
+    return msg.get('message_id') or (msg.get('ts'), msg.get('user'))
+
+def parse_json_object(text: str, keys: List[str]) -> Optional[Dict[str, str]]:
+    """Pull the requested keys out of a model's JSON answer.
+
+    Tolerates code fences and text around the object; list values become
+    bullet lines. Returns None when no JSON object with any of the keys is found.
+    """
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        text = text[text.find("\n") + 1:] if "\n" in text else text
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    result = {}
+    for key in keys:
+        value = data.get(key)
+        if isinstance(value, list):
+            value = "\n".join(f"• {item}" for item in value)
+        elif isinstance(value, dict):
+            value = "\n".join(f"• {k}: {v}" for k, v in value.items())
+        if value is not None and str(value).strip():
+            result[key] = str(value).strip()
+    return result or None
+
 class RAGService:
-    def __init__(self):
-        """Initialize the RAG service with Gemini API."""
-        # Configure Gemini API
-        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-        self.model = genai.GenerativeModel(os.getenv("AI_MODEL", "gemini-1.5-flash"))
+    def __init__(self, provider: Optional[LLMProvider] = None):
+        """Initialize the RAG service; the LLM backend is created on first use."""
+        self._provider = provider
+        self._provider_lock = threading.Lock()
         self.max_tokens = int(os.getenv("MAX_TOKENS", "500"))
         self.temperature = float(os.getenv("TEMPERATURE", "0.7"))
+        
+        # Identical query + context + model settings are answered from here
+        self.cache = ResponseCache()
+        # Identical calls made while one is already running wait for it instead of calling the model again
+        self.flights = SingleFlight()
+        # Bound model latency; while the model keeps failing, answer locally instead of waiting on it
+        self.request_timeout = LLM_REQUEST_TIMEOUT_SECONDS
+        self.breaker = CircuitBreaker()
+        self.fallbacks = 0
+        # Rate limits and concurrency bound shared by all model calls; queries go before insight refreshes
+        self.scheduler = LLMScheduler()
+        self.packer = context_packer
+        # Local TF-IDF hashing embeddings, computed once per message
+        self.embeddings = EmbeddingIndex()
+        
+        # Insight sections may be summarized locally instead of by the model
+        self.summarizer = textrank_summarizer
+        self.insight_engines = parse_engines(INSIGHT_ENGINES)
+        self.insight_mode = INSIGHT_MODE
+    
+    @property
+    def llm(self) -> LLMProvider:
+        """The LLM backend selected by LLM_BACKEND, built on first use."""
+        if self._provider is None:
+            with self._provider_lock:
+                if self._provider is None:
+                    self._provider = create_provider()
+        return self._provider
+    
+    @property
+    def model_name(self) -> str:
+        return self.llm.model_name
     
     def get_embedding(self, text: str) -> List[float]:
-        """Get embedding for text using Gemini API."""
+        """Get a local TF-IDF hashing embedding for text."""
         try:
-            # Gemini doesn't have a direct embedding API, so we'll use keyword matching instead
-            # This method is kept for compatibility but will return empty list
-            logger.info("Using keyword-based matching instead of embeddings")
-            return []
+            return self.embeddings.embed(text).tolist()
         except Exception as e:
             logger.error(f"Error getting embedding: {e}")
             return []
     
+    def with_semantic_scores(self, query: str, candidates: List[Dict]) -> List[Dict]:
+        """Copies of the candidates with their embedding cosine to the query as `semantic_score`, for the ranker."""
+        try:
+            scores = self.embeddings.similarities(query, candidates)
+        except Exception as e:
+            logger.error(f"Error scoring candidates: {e}")
+            return candidates
+        return [dict(msg, semantic_score=round(float(score), 4)) for msg, score in zip(candidates, scores)]
+    
     def find_relevant_messages(self, query: str, messages: List[Dict], top_k: int = 5) -> List[Dict]:
-        """Find most relevant messages for a query using keyword matching."""
+        """Find the most relevant messages for a query by cosine similarity of local embeddings."""
         if not messages:
             return []
         
-        # Extract keywords from query
-        query_words = set(query.lower().split())
-        
-        # Score messages based on keyword matches
-        scored_messages = []
-        for msg in messages:
-            msg_text = msg.get('text', '').lower()
-            msg_words = set(msg_text.split())
-            
-            # Calculate simple keyword overlap score
-            overlap = len(query_words.intersection(msg_words))
-            if overlap > 0:
-                scored_messages.append((overlap, msg))
-        
-        # Sort by score and return top_k
-        scored_messages.sort(key=lambda x: x[0], reverse=True)
+        # Messages already seen reuse their cached vectors; one matrix-vector product scores them all
+        relevant = [msg for _, msg in self.embeddings.search(query, messages, limit=top_k)]
         
         # If no keyword matches, return recent messages
-        if not scored_messages:
-            return sorted(messages, key=lambda x: x.get('ts', ''), reverse=True)[:top_k]
+        if not relevant:
+            return select_top_k(messages, top_k, key=message_ts)
         
-        return [msg for _, msg in scored_messages[:top_k]]
+        return relevant
     
-    def generate_response(self, query: str, context_messages: List[Dict]) -> str:
+    def generate_response(self, query: str, context_messages: List[Dict], priority: int = INTERACTIVE) -> str:
         """Generate AI response using RAG with context from relevant messages."""
         try:
-            # Prepare context
-            context_text = self._prepare_context(context_messages)
+            cache_key, prompt = self._prepare_prompt(query, context_messages)
+            return self.flights.do(cache_key, lambda: self._cached_generate(cache_key, prompt, priority))
             
-            # Create prompt for Gemini
-            prompt = f"""You are an AI assistant monitoring a hackathon in real-time. 
-            You analyze live chat messages from Slack/Discord/Telegram to help organizers and participants.
+        except CircuitOpenError:
+            return self._fallback(query, context_messages)
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            return self._fallback(query, context_messages)
+    
+    def _cached_generate(self, cache_key: str, prompt: str, priority: int) -> str:
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        permit = self.breaker.admit()
+        if permit is None:
+            raise CircuitOpenError("LLM circuit breaker is open")
+        
+        # Generate response using the configured backend, once the scheduler admits the call
+        settled = False
+        try:
+            with self.scheduler.slot(priority, estimate_tokens(prompt) + self.max_tokens):
+                started = time.perf_counter()
+                try:
+                    answer = self.llm.generate(prompt, self.max_tokens, self.temperature,
+                                               timeout=self.request_timeout).strip()
+                except Exception:
+                    self.breaker.record_failure()
+                    settled = True
+                    raise
+            self.breaker.record_success()
+            settled = True
+        finally:
+            # e.g. a queue timeout: the model was never asked, so there is no verdict
+            if not settled:
+                self.breaker.release(permit)
+        self.cache.put(cache_key, answer, latency_seconds=time.perf_counter() - started)
+        return answer
+    
+    def generate_response_stream(self, query: str, context_messages: List[Dict]) -> Iterator[str]:
+        """Like generate_response, but yields the answer in chunks as the model produces them."""
+        chunks = []
+        try:
+            cache_key, prompt = self._prepare_prompt(query, context_messages)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
             
-            Your role:
-            - Summarize problems teams are facing
-            - Identify trending topics and common issues
-            - Provide insights about team dynamics and progress
-            - Answer questions about what's happening in the hackathon
+            permit = self.breaker.admit()
+            if permit is None:
+                yield self._fallback(query, context_messages)
+                return
             
-            Be concise, helpful, and focus on actionable insights. Use emojis sparingly but effectively.
-
-            Query: {query}
-
-            Recent chat context:
-            {context_text}
-
-            Please provide a helpful response based on the current hackathon chat activity."""
-
-            # Generate response using Gemini
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    max_output_tokens=self.max_tokens,
-                    temperature=self.temperature,
-                )
-            )
+            settled = False
+            try:
+                with self.scheduler.slot(INTERACTIVE, estimate_tokens(prompt) + self.max_tokens):
+                    started = time.perf_counter()
+                    try:
+                        for text in self.llm.generate_stream(prompt, self.max_tokens, self.temperature,
+                                                             timeout=self.request_timeout):
+                            chunks.append(text)
+                            yield text
+                    except Exception:
+                        self.breaker.record_failure()
+                        settled = True
+                        raise
+                self.breaker.record_success()
+                settled = True
+            finally:
+                # A queue timeout or a client that disconnected mid-stream (GeneratorExit) leaves
+                # no verdict; give the permit back so a half-open breaker can try again
+                if not settled:
+                    self.breaker.release(permit)
             
-            return response.text.strip()
+            self.cache.put(cache_key, "".join(chunks).strip(), latency_seconds=time.perf_counter() - started)
             
         except Exception as e:
-            logger.error(f"Error generating response: {e}")
-            return f"I'm having trouble processing that request right now. Error: {str(e)}"
+            logger.error(f"Error streaming response: {e}")
+            if not chunks:
+                yield self._fallback(query, context_messages)
+            else:
+                yield f"\n\n(The answer was cut short: {str(e)})"
+    
+    def _fallback(self, query: str, context_messages: List[Dict]) -> str:
+        """Local extractive answer used when the model is failing, too slow or switched off by the breaker."""
+        self.fallbacks += 1
+        return extractive_answer(query, context_messages)
+    
+    def resilience_stats(self) -> Dict[str, Any]:
+        """Circuit breaker state plus how many answers came from the local fallback."""
+        return dict(self.breaker.stats(), fallbacks=self.fallbacks, request_timeout_seconds=self.request_timeout)
+    
+    def _prepare_prompt(self, query: str, context_messages: List[Dict]) -> Tuple[str, str]:
+        """Pack the context and build the prompt; returns (cache key, prompt)."""
+        # Keep prompts small and predictable: drop near-duplicates, trim long messages, fit the token budget
+        context_messages = self.packer.pack(query, context_messages)
+        
+        cache_key = response_key(
+            self.model_name,
+            {'max_output_tokens': self.max_tokens, 'temperature': self.temperature},
+            query, context_messages
+        )
+        
+        # Prepare context
+        context_text = self._prepare_context(context_messages)
+        
+        # Create prompt for the model
+        prompt = f"""You are an AI assistant monitoring a hackathon in real-time. 
+        You analyze live chat messages from Slack/Discord/Telegram to help organizers and participants.
+        
+        Your role:
+        - Summarize problems teams are facing
+        - Identify trending topics and common issues
+        - Provide insights about team dynamics and progress
+        - Answer questions about what's happening in the hackathon
+        
+        Be concise, helpful, and focus on actionable insights. Use emojis sparingly but effectively.
+
+        Query: {query}
+
+        Recent chat context:
+        {context_text}
+
+        Please provide a helpful response based on the current hackathon chat activity."""
+        
+        return cache_key, prompt
     
     def _prepare_context(self, messages: List[Dict]) -> str:
         """Prepare context string from relevant messages."""
@@ -122,9 +303,86 @@ class RAGService:
         
         return "\n".join(context_parts)
     
-    def get_predefined_insights(self, messages: List[Dict]) -> Dict[str, str]:
-        """Get predefined insights for demo purposes."""
-        insights = {}
+    def insight_engine(self, section: str, engine: Optional[str] = None) -> str:
+        """The engine ('llm' or 'textrank') that summarizes an insight section."""
+        return engine or self.insight_engines.get(section, 'llm')
+    
+    def insight_generator(self, section: str, engine: Optional[str] = None) -> Callable[[str, List[Dict]], str]:
+        """Return the (question, messages) -> text function configured for an insight section."""
+        if self.insight_engine(section, engine) == 'textrank':
+            return lambda question, messages: self.summarizer.summarize(messages)
+        return lambda question, messages: self.generate_response(question, messages, priority=BACKGROUND)
+    
+    def generate_insights_batch(self, sections: Dict[str, Tuple[str, List[Dict]]]) -> Dict[str, str]:
+        """Answer several insight sections with one model call returning JSON.
+        
+        The prompt lists the deduplicated union of the sections' messages once.
+        Sections missing from an unparseable or incomplete answer are generated
+        one by one instead.
+        """
+        names = list(sections)
+        union = {}
+        for _, messages in sections.values():
+            for msg in messages:
+                union.setdefault(_message_ref(msg), msg)
+        
+        questions = " ".join(question for question, _ in sections.values())
+        union = self.packer.pack(questions, list(union.values()))
+        numbers = {_message_ref(msg): i for i, msg in enumerate(union, 1)}
+        
+        # Each question points at its own messages by number, so none is repeated in the prompt
+        question_lines = []
+        for name, (question, messages) in sections.items():
+            refs = sorted({numbers[ref] for ref in map(_message_ref, messages) if ref in numbers})
+            about = f" (messages {', '.join(map(str, refs))})" if refs else ""
+            question_lines.append(f"- {name}: {question}{about}")
+        
+        prompt = f"""You are an AI assistant monitoring a hackathon in real-time.
+        You analyze live chat messages from Slack/Discord/Telegram to help organizers and participants.
+        Be concise, helpful, and focus on actionable insights. Use emojis sparingly but effectively.
+
+        Answer each of these questions from the chat messages below:
+        {chr(10).join(question_lines)}
+
+        Chat messages:
+        {self._prepare_context(union)}
+
+        Respond with only a JSON object with the keys {", ".join(f'"{name}"' for name in names)}.
+        Each value is a short plain-text answer to that question."""
+        
+        cache_key = response_key(
+            self.model_name,
+            {'max_output_tokens': self.max_tokens, 'temperature': self.temperature, 'format': 'json'},
+            "insights: " + questions, union
+        )
+        
+        parsed = None
+        try:
+            answer = self.flights.do(cache_key, lambda: self._cached_generate(cache_key, prompt, BACKGROUND))
+            parsed = parse_json_object(answer, names)
+            if parsed is None:
+                logger.warning("⚠️ Batched insight answer was not valid JSON, generating sections separately")
+        except Exception as e:
+            logger.error(f"Error generating batched insights: {e}")
+        
+        results = dict(parsed or {})
+        for name in names:
+            if name not in results:
+                question, messages = sections[name]
+                results[name] = self.generate_response(question, messages, priority=BACKGROUND)
+        return results
+    
+    def get_predefined_insights(self, messages: List[Dict], timeout: Optional[float] = None,
+                                engines: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """Get predefined insights for demo purposes.
+        
+        The sections are generated concurrently; a section that misses the
+        timeout is reported as pending instead of holding up the others.
+        `engines` overrides the INSIGHT_ENGINES choice per section. In batch
+        mode the LLM sections share one model call.
+        """
+        engines = engines or {}
+        sections = {}
         
         # Problem analysis
         problem_keywords = ['problem', 'issue', 'error', 'bug', 'stuck', 'help', 'broken', 'not working']
@@ -132,26 +390,36 @@ class RAGService:
                            if any(keyword in msg.get('text', '').lower() for keyword in problem_keywords)]
         
         if problem_messages:
-            insights['problems'] = self.generate_response(
-                "What are the top 3 problems teams are facing right now?", 
-                problem_messages[:5]
-            )
+            sections['problems'] = ("What are the top 3 problems teams are facing right now?", problem_messages[:5])
         
         # Question analysis
         question_messages = [msg for msg in messages 
                             if msg.get('text', '').strip().endswith('?')]
         
         if question_messages:
-            insights['questions'] = self.generate_response(
-                "Summarize the most frequently asked questions.", 
-                question_messages[:5]
-            )
+            sections['questions'] = ("Summarize the most frequently asked questions.", question_messages[:5])
         
         # Trending topics
-        insights['trending'] = self.generate_response(
-            "What topics are trending in the chat right now?", 
-            messages[-10:]  # Last 10 messages
-        )
+        sections['trending'] = ("What topics are trending in the chat right now?", messages[-10:])  # Last 10 messages
+        
+        calls = {}
+        batch = {name: section for name, section in sections.items()
+                 if self.insight_engine(name, engines.get(name)) == 'llm'}
+        if self.insight_mode == 'batch' and len(batch) > 1:
+            calls['batch'] = lambda: self.generate_insights_batch(batch)
+        else:
+            batch = {}
+        for name, (question, section_messages) in sections.items():
+            if name not in batch:
+                generate = self.insight_generator(name, engines.get(name))
+                calls[name] = lambda generate=generate, question=question, section_messages=section_messages: \
+                    generate(question, section_messages)
+        
+        results = fan_out(calls, timeout=timeout)
+        insights = results.pop('batch', None) or {}
+        insights.update(results)
+        for name in sections:
+            insights.setdefault(name, PENDING_INSIGHT)
         
         return insights
 
@@ -58,7 +58,8 @@ def slack_events():
             "user": data["event"].get("user"),
             "text": data["event"].get("text"),
             "ts": data["event"].get("ts"),
-            "channel": data["event"].get("channel", "general")
+            "channel": data["event"].get("channel", "general"),
+            "thread_ts": data["event"].get("thread_ts", "")
         }
 
         # Filter invalid messages
@@ -0,0 +1,144 @@
+import re
+import math
+import threading
+import logging
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+from utils import select_top_k
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# BM25 parameters (standard defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to
+too under until up very was we were what when where which while who whom why will with would you
+your yours yourself yourselves im ive its dont cant wont hey hi thanks thank please anyone someone
+""".split())
+
+def stem(token: str) -> str:
+    """Light suffix stripping so that e.g. 'deploying', 'deployed' and 'deploys' share a term."""
+    if len(token) <= 3 or token.isdigit():
+        return token
+    if token.endswith("ies") and len(token) > 4:
+        token = token[:-3] + "y"
+    elif token.endswith("sses"):
+        token = token[:-2]
+    elif token.endswith("s") and not token.endswith("ss") and not token.endswith("us"):
+        token = token[:-1]
+    for suffix in ("ing", "ed", "ly"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            break
+    if token.endswith("e") and len(token) > 3:
+        token = token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split into words, drop stop words and stem."""
+    return [stem(token) for token in TOKEN_PATTERN.findall((text or "").lower())
+            if token not in STOP_WORDS and len(token) > 1]
+
+class BM25Index:
+    """Incrementally maintained inverted index with BM25 scoring.
+
+    Documents are added and removed one at a time as messages arrive or are
+    retracted. A search only visits the postings of the query terms, never the
+    whole collection.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        # term -> {doc_id: term frequency}
+        self.postings: Dict[str, Dict[Any, int]] = {}
+        # doc_id -> (length, channel, ts, terms, payload)
+        self.docs: Dict[Any, Tuple[int, Optional[str], float, Tuple[str, ...], Any]] = {}
+        self.total_length = 0
+        self._lock = threading.Lock()
+
+    def attach(self, table) -> None:
+        """Keep the index current from a Pathway table with rag_index columns."""
+        import pathway as pw
+
+        def on_change(key, row, time, is_addition):
+            if is_addition:
+                self.add(row['message_id'], row['text'], channel=row['channel'],
+                         ts=row['timestamp_parsed'], payload=dict(row))
+            else:
+                self.remove(row['message_id'])
+
+        pw.io.subscribe(table, on_change=on_change)
+
+    def add(self, doc_id: Any, text: str, channel: Optional[str] = None, ts: float = 0.0, payload: Any = None) -> None:
+        """Index a document (replacing any previous version with the same id)."""
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            length = sum(terms.values())
+            self.docs[doc_id] = (length, channel, float(ts or 0), tuple(terms), payload)
+            self.total_length += length
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: Any) -> None:
+        """Drop a document from the index if present."""
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: Any) -> None:
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc[0]
+        for term in doc[3]:
+            docs = self.postings.get(term)
+            if docs and docs.pop(doc_id, None) is not None and not docs:
+                del self.postings[term]
+
+    def search(self, query: str, limit: int = 10, channel: Optional[str] = None,
+               since: Optional[float] = None) -> List[Tuple[float, Any]]:
+        """Return up to `limit` (score, payload) pairs, best first.
+
+        Only documents containing a query term are scored; ties go to the newer document.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            num_docs = len(self.docs)
+            if not num_docs:
+                return []
+            avg_length = self.total_length / num_docs or 1.0
+
+            scores: Dict[Any, float] = {}
+            for term in terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    length, doc_channel, ts, _, _ = self.docs[doc_id]
+                    if channel and doc_channel != channel:
+                        continue
+                    if since is not None and ts < since:
+                        continue
+                    norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+
+            best = select_top_k(scores.items(), limit, key=lambda item: (item[1], self.docs[item[0]][2]))
+            return [(score, self.docs[doc_id][4]) for doc_id, score in best]
+
+    def __len__(self) -> int:
+        return len(self.docs)
@@ -0,0 +1,102 @@
+import os
+import time
+import threading
+import logging
+from typing import Dict, Any, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Consecutive failures or timeouts that open the breaker
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+# How long the breaker stays open before one trial call is let through
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+class CircuitBreaker:
+    """Stops calling a failing upstream for a while.
+
+    closed: calls go through; `failure_threshold` consecutive failures open it.
+    open: calls are refused until `reset_seconds` have passed.
+    half_open: a single trial call goes through; success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES,
+                 reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+        self.rejected = 0
+        # Number of the half-open trial call in flight (0 if none)
+        self._trial = 0
+        self._trials = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may go upstream now."""
+        return self.admit() is not None
+
+    def admit(self) -> Optional[int]:
+        """Like allow(), but return a permit for release(): None if refused, 0 for a
+        closed-state call, or the trial number of the half-open trial call."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+                self._trial = 0
+            if self.state == CLOSED:
+                return 0
+            if self.state == HALF_OPEN and not self._trial:
+                self._trials += 1
+                self._trial = self._trials
+                return self._trial
+            self.rejected += 1
+            return None
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("LLM circuit breaker closed")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._trial = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial = 0
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                logger.warning(f"⚠️ LLM circuit breaker opened after {self.consecutive_failures} consecutive failure(s)")
+
+    def release(self, permit: Optional[int]) -> None:
+        """Give back an admitted call that ended without a success or failure to record
+        (e.g. it never reached the upstream, or its client went away).
+        Only frees the half-open trial if this permit is the one that took it."""
+        with self._lock:
+            if permit and permit == self._trial:
+                self._trial = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the breaker state and counters."""
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'failure_threshold': self.failure_threshold,
+                'reset_seconds': self.reset_seconds
+            }
@@ -0,0 +1,121 @@
+import os
+import math
+import logging
+from typing import List, Dict, Any
+from bm25_index import tokenize, stem, TOKEN_PATTERN
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Total tokens of chat context allowed in one prompt
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1200"))
+# Messages longer than this are cut down to a window around the query terms
+RAG_MESSAGE_TOKEN_LIMIT = int(os.getenv("RAG_MESSAGE_TOKEN_LIMIT", "150"))
+# Messages whose word sets overlap at least this much are treated as duplicates
+RAG_DUPLICATE_SIMILARITY = float(os.getenv("RAG_DUPLICATE_SIMILARITY", "0.8"))
+
+# Rough size of the "N. [HH:MM] user: " prefix each message gets in the prompt
+MESSAGE_OVERHEAD_TOKENS = 8
+
+def estimate_tokens(text: str) -> int:
+    """Estimate model tokens (about four characters per token for English chat)."""
+    return math.ceil(len(text or "") / 4)
+
+def truncate_around_terms(text: str, terms: set, max_tokens: int) -> str:
+    """Cut text to about max_tokens, centred on the first query term it contains."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+
+    anchor = 0
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        if stem(match.group()) in terms:
+            anchor = match.start()
+            break
+
+    start = max(0, min(anchor - max_chars // 3, len(text) - max_chars))
+    end = start + max_chars
+    # Snap to word boundaries
+    if start > 0:
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < start + 20 else start
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > end - 20 else end
+
+    snippet = text[start:end].strip()
+    return ("..." if start > 0 else "") + snippet + ("..." if end < len(text) else "")
+
+class ContextPacker:
+    """Packs ranked context messages into a fixed token budget.
+
+    Messages are taken in the order given (best first): near-duplicates of an
+    already packed message are dropped, long messages are truncated around the
+    query terms, and messages that no longer fit the budget are skipped.
+    """
+
+    def __init__(self, token_budget: int = RAG_CONTEXT_TOKEN_BUDGET,
+                 message_token_limit: int = RAG_MESSAGE_TOKEN_LIMIT,
+                 duplicate_similarity: float = RAG_DUPLICATE_SIMILARITY):
+        self.token_budget = token_budget
+        self.message_token_limit = message_token_limit
+        self.duplicate_similarity = duplicate_similarity
+        self.last_stats: Dict[str, Any] = {}
+
+    def pack(self, query: str, messages: List[Dict]) -> List[Dict]:
+        """Return the messages to put in the prompt, within the token budget."""
+        terms = set(tokenize(query))
+        packed = []
+        packed_words = []
+        used = 0
+        duplicates = 0
+        truncated = 0
+        tokens_in = 0
+
+        for msg in messages:
+            text = msg.get('text', '') or ''
+            tokens_in += estimate_tokens(text) + MESSAGE_OVERHEAD_TOKENS
+
+            words = set(tokenize(text))
+            if self._is_duplicate(words, text, packed, packed_words):
+                duplicates += 1
+                continue
+
+            if estimate_tokens(text) > self.message_token_limit:
+                text = truncate_around_terms(text, terms, self.message_token_limit)
+                truncated += 1
+
+            cost = estimate_tokens(text) + MESSAGE_OVERHEAD_TOKENS
+            if used + cost > self.token_budget:
+                # Keep scanning: a shorter, lower-ranked message may still fit
+                continue
+
+            packed.append(dict(msg, text=text) if text != msg.get('text') else msg)
+            packed_words.append(words)
+            used += cost
+
+        self.last_stats = {
+            'messages_in': len(messages),
+            'messages_out': len(packed),
+            'duplicates_dropped': duplicates,
+            'truncated': truncated,
+            'tokens_in': tokens_in,
+            'tokens_out': used,
+            'token_budget': self.token_budget
+        }
+        return packed
+
+    def _is_duplicate(self, words: set, text: str, packed: List[Dict], packed_words: List[set]) -> bool:
+        normalized = " ".join(text.lower().split())
+        for msg, other in zip(packed, packed_words):
+            if normalized == " ".join((msg.get('text') or '').lower().split()):
+                return True
+            if words and other:
+                overlap = len(words & other) / len(words | other)
+                if overlap >= self.duplicate_similarity:
+                    return True
+        return False
+
+# Global instance
+context_packer = ContextPacker()
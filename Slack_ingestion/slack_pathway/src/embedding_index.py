@@ -0,0 +1,169 @@
+import os
+import math
+import zlib
+import threading
+import logging
+import numpy as np
+from collections import Counter
+from typing import List, Dict, Any, Tuple
+from bm25_index import tokenize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Width of the hashed feature space
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "1024"))
+# Most message vectors kept; the oldest are evicted beyond this
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+
+def hash_features(text: str, dim: int) -> Dict[int, float]:
+    """Map unigrams and bigrams of the text to signed, sublinear term counts per hashed slot."""
+    terms = tokenize(text)
+    counts = Counter(terms)
+    counts.update(f"{a} {b}" for a, b in zip(terms, terms[1:]))
+
+    features: Dict[int, float] = {}
+    for term, tf in counts.items():
+        h = zlib.crc32(term.encode("utf-8"))
+        slot = h % dim
+        sign = 1.0 if (h >> 31) & 1 == 0 else -1.0
+        features[slot] = features.get(slot, 0.0) + sign * (1.0 + math.log(tf))
+    return features
+
+class EmbeddingIndex:
+    """Local TF-IDF hashing embeddings, computed once per message and kept in one float32 matrix.
+
+    Each message is embedded the first time it is seen, weighted by the
+    document frequencies known at that moment, and L2-normalised. Retrieval is
+    a single matrix-vector product over the candidate rows followed by
+    argpartition for the top k.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, capacity: int = EMBEDDING_CACHE_SIZE):
+        self.dim = dim
+        self.capacity = max(capacity, 1)
+        # Grows by doubling as messages arrive
+        self.matrix = np.zeros((min(64, self.capacity), dim), dtype=np.float32)
+        # message_id -> row, and row -> message_id (rows are reused oldest first once full)
+        self.rows: Dict[Any, int] = {}
+        self.row_ids: List[Any] = []
+        self.next_row = 0
+        # Hashed-slot document frequencies for the IDF weights
+        self.doc_freq = np.zeros(dim, dtype=np.float64)
+        self.num_docs = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _idf(self) -> np.ndarray:
+        return np.log((1.0 + self.num_docs) / (1.0 + self.doc_freq)) + 1.0
+
+    def _vector(self, features: Dict[int, float], idf: np.ndarray) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if features:
+            slots = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+            values = np.fromiter(features.values(), dtype=np.float64, count=len(features))
+            vector[slots] = values * idf[slots]
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector /= norm
+        return vector
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed arbitrary text (e.g. a query) with the current IDF weights, without storing it."""
+        features = hash_features(text, self.dim)
+        with self._lock:
+            return self._vector(features, self._idf())
+
+    def add(self, message_id: Any, text: str) -> int:
+        """Embed and store a message unless it is already cached; returns its row."""
+        with self._lock:
+            row = self.rows.get(message_id)
+            if row is not None:
+                self.hits += 1
+                return row
+            self.misses += 1
+
+        features = hash_features(text, self.dim)
+        with self._lock:
+            row = self.rows.get(message_id)
+            if row is not None:
+                return row
+
+            if features:
+                self.doc_freq[list(features)] += 1
+            self.num_docs += 1
+
+            row = self._allocate_row()
+            self.matrix[row] = self._vector(features, self._idf())
+            self.rows[message_id] = row
+            self.row_ids[row] = message_id
+            return row
+
+    def _allocate_row(self) -> int:
+        if self.next_row < len(self.row_ids):
+            # Full: evict the oldest message in this slot
+            row = self.next_row
+            del self.rows[self.row_ids[row]]
+            self.row_ids[row] = None
+        else:
+            row = len(self.row_ids)
+            self.row_ids.append(None)
+            if row >= len(self.matrix):
+                grown = np.zeros((min(len(self.matrix) * 2, self.capacity), self.dim), dtype=np.float32)
+                grown[:len(self.matrix)] = self.matrix
+                self.matrix = grown
+        self.next_row = (row + 1) % self.capacity
+        return row
+
+    def similarities(self, query: str, messages: List[Dict]) -> np.ndarray:
+        """Cosine similarity of the query to each message, embedding messages not seen before.
+
+        Only the last `capacity` messages are scored (so that none of their rows
+        is evicted mid-call); earlier ones get 0.
+        """
+        scores = np.zeros(len(messages), dtype=np.float32)
+        scored = messages[-self.capacity:]
+        if not scored:
+            return scores
+
+        rows = np.fromiter((self.add(_message_key(msg), msg.get('text', '') or '') for msg in scored),
+                           dtype=np.int64, count=len(scored))
+        query_vector = self.embed(query)
+        with self._lock:
+            scores[len(messages) - len(scored):] = self.matrix[rows] @ query_vector
+        return scores
+
+    def search(self, query: str, messages: List[Dict], limit: int = 5) -> List[Tuple[float, Dict]]:
+        """Return up to `limit` (cosine, message) pairs among `messages`, best first; zero scores are dropped."""
+        if not messages or limit <= 0:
+            return []
+        messages = messages[-self.capacity:]
+        scores = self.similarities(query, messages)
+
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), messages[i]) for i in top if scores[i] > 0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit counters."""
+        with self._lock:
+            return {
+                'messages': len(self.rows),
+                'capacity': self.capacity,
+                'dim': self.dim,
+                'hits': self.hits,
+                'misses': self.misses,
+                'matrix_bytes': int(self.matrix.nbytes)
+            }
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+def _message_key(msg: Dict) -> Any:
+    """Cache key for a message: its id, or its timestamp, user and text when it has none."""
+    return msg.get('message_id') or (msg.get('ts'), msg.get('user'), msg.get('text'))
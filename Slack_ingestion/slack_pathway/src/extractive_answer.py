@@ -0,0 +1,46 @@
+import re
+import sys
+import logging
+from pathlib import Path
+from typing import List, Dict
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FALLBACK_NOTICE = "⚠️ The AI model is unavailable right now, so this summary was extracted directly from the chat.\n\n"
+
+# Query words that pick which analyzer sections answer a question
+SECTION_TERMS = {
+    'problems': ('problem', 'issue', 'error', 'bug', 'stuck', 'broken', 'fail', 'blocker'),
+    'questions': ('question', 'ask', 'faq', 'wonder'),
+    'trending': ('trend', 'topic', 'popular', 'discuss', 'theme'),
+}
+DEFAULT_SECTIONS = ('problems', 'trending')
+
+def _plain_text(html: str) -> str:
+    """The analyzer formats for the chat page; callers such as the dashboard show plain text."""
+    text = re.sub(r"<br\s*/?>", "\n", html)
+    text = re.sub(r"<[^>]+>", "", text).replace("&bull;", "•")
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+def _heuristic_analyzer():
+    """The keyword analyzer from the dashboard app (Slack_ingestion/ai_service.py)."""
+    repo_root = str(Path(__file__).resolve().parents[3])
+    if repo_root not in sys.path:
+        sys.path.append(repo_root)
+    from Slack_ingestion.ai_service import ai_service
+    return ai_service
+
+def extractive_answer(query: str, messages: List[Dict]) -> str:
+    """Answer a query without the model, from keyword analysis of the context messages."""
+    query = (query or "").lower()
+    sections = [name for name, terms in SECTION_TERMS.items() if any(term in query for term in terms)]
+    try:
+        insights = _heuristic_analyzer().analyze_messages(messages)
+        body = "\n\n".join(_plain_text(insights[name]) for name in sections or DEFAULT_SECTIONS)
+    except Exception as e:
+        logger.error(f"Error building extractive answer: {e}")
+        body = "\n".join(f"{i}. {msg.get('user', 'Unknown')}: {msg.get('text', '')}"
+                           for i, msg in enumerate(messages[:5], 1)) or "No recent messages available."
+    return FALLBACK_NOTICE + body
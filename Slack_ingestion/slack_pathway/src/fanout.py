@@ -0,0 +1,57 @@
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Any, Optional, Callable
+
+from llm_scheduler import LLM_MAX_IN_FLIGHT
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# How long a fan-out waits for its calls before returning partial results
+LLM_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "20"))
+
+# Dispatch only: LLMScheduler bounds the model calls that run, so the pool is sized to match it
+_executor = ThreadPoolExecutor(max_workers=max(LLM_MAX_IN_FLIGHT, 1), thread_name_prefix="llm")
+
+def fan_out(calls: Dict[str, Callable[[], Any]], timeout: Optional[float] = None,
+            on_late_result: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+    """Run independent calls concurrently on the shared bounded pool.
+
+    Returns the results of the calls that finished within `timeout` seconds;
+    slower calls are missing from the result. They keep running, and
+    `on_late_result(name, result)` is called when they finish, so the work is not lost.
+    """
+    if not calls:
+        return {}
+    timeout = LLM_CALL_TIMEOUT_SECONDS if timeout is None else timeout
+
+    started = time.perf_counter()
+    futures = {_executor.submit(call): name for name, call in calls.items()}
+    done, pending = wait(futures, timeout=timeout)
+
+    results = {}
+    for future in done:
+        name = futures[future]
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            logger.error(f"Error in '{name}' call: {e}")
+
+    for future in pending:
+        name = futures[future]
+        logger.warning(f"⏱️ '{name}' call exceeded {timeout}s, returning without it")
+        if on_late_result:
+            future.add_done_callback(lambda f, name=name: _deliver_late(name, f, on_late_result))
+
+    logger.info(f"Fan-out of {len(calls)} calls took {time.perf_counter() - started:.2f}s "
+                f"({len(results)} finished)")
+    return results
+
+def _deliver_late(name: str, future, on_late_result: Callable[[str, Any], None]) -> None:
+    try:
+        on_late_result(name, future.result())
+    except Exception as e:
+        logger.error(f"Error in late '{name}' call: {e}")
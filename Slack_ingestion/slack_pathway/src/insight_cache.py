@@ -0,0 +1,195 @@
+import os
+import time
+import threading
+import logging
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from fanout import fan_out, LLM_CALL_TIMEOUT_SECONDS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# How often the background job checks whether the inputs of a section changed
+INSIGHT_REFRESH_SECONDS = float(os.getenv("INSIGHT_REFRESH_SECONDS", "5"))
+# A section with changed inputs is regenerated once its cached text is this old
+# (bounds both how stale an insight can get and how often it calls the LLM)
+INSIGHT_STALENESS_SECONDS = float(os.getenv("INSIGHT_STALENESS_SECONDS", "60"))
+
+PENDING_TEXT = "Insights are being generated..."
+BATCH_CALL = "*batch*"
+
+def message_fingerprint(messages: List[Dict]) -> frozenset:
+    """Identify the set of messages behind an insight."""
+    return frozenset(msg.get('message_id') or msg.get('ts') for msg in messages)
+
+class InsightCache:
+    """Insight sections regenerated in the background, only when their inputs change.
+
+    Each section has a question and a function returning the messages it is based on.
+    Readers always get the cached text immediately, together with its age.
+    With `generate_batch`, due sections registered with batch=True are
+    generated together in one call ({name: (question, messages)} -> {name: text}).
+    """
+
+    def __init__(self, generate: Callable[[str, List[Dict]], str],
+                 refresh_seconds: float = INSIGHT_REFRESH_SECONDS,
+                 staleness_seconds: float = INSIGHT_STALENESS_SECONDS,
+                 timeout_seconds: float = LLM_CALL_TIMEOUT_SECONDS,
+                 generate_batch: Optional[Callable[[Dict[str, Tuple[str, List[Dict]]]], Dict[str, str]]] = None):
+        self.generate = generate
+        self.generate_batch = generate_batch
+        self.refresh_seconds = refresh_seconds
+        self.staleness_seconds = staleness_seconds
+        self.timeout_seconds = timeout_seconds
+        self.sections: Dict[str, Dict[str, Any]] = {}
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.regenerations = 0
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def add_section(self, name: str, question: str, fetch: Callable[[], List[Dict]], empty_text: str,
+                    generate: Optional[Callable[[str, List[Dict]], str]] = None, batch: bool = False) -> None:
+        """Register a section; `fetch` returns the messages the insight is generated from.
+
+        `generate` replaces the cache-wide generator for this section only;
+        `batch` lets the section share a `generate_batch` call with others.
+        """
+        self.sections[name] = {'question': question, 'fetch': fetch, 'empty_text': empty_text,
+                               'generate': generate or self.generate, 'batch': batch}
+
+    def refresh(self, force: bool = False) -> List[str]:
+        """Regenerate the sections whose messages changed; returns their names.
+
+        Due sections are generated concurrently. A section still running after
+        the call timeout is left out of the result and stored when it finishes.
+        """
+        due = {}
+        with self._refresh_lock:
+            for name, section in self.sections.items():
+                if name in self._in_flight:
+                    continue
+                try:
+                    messages = section['fetch']()
+                except Exception as e:
+                    logger.error(f"Error fetching messages for '{name}' insight: {e}")
+                    continue
+                fingerprint = message_fingerprint(messages)
+                if not force and not self._is_due(name, fingerprint):
+                    continue
+                self._in_flight.add(name)
+                due[name] = (section, messages, fingerprint)
+
+        batched = {name: item for name, item in due.items()
+                   if self.generate_batch and item[0]['batch'] and item[1]}
+        if len(batched) < 2:
+            batched = {}
+
+        calls = {}
+        if batched:
+            calls[BATCH_CALL] = lambda: self._regenerate_batch(batched)
+        for name, (section, messages, fingerprint) in due.items():
+            if name not in batched:
+                calls[name] = lambda name=name, section=section, messages=messages, fingerprint=fingerprint: \
+                    self._regenerate(name, section, messages, fingerprint)
+
+        results = fan_out(calls, timeout=self.timeout_seconds)
+        regenerated = []
+        for name in calls:
+            if results.get(name):
+                regenerated.extend(batched if name == BATCH_CALL else [name])
+        return regenerated
+
+    def _is_due(self, name: str, fingerprint: frozenset) -> bool:
+        entry = self.entries.get(name)
+        if entry is None:
+            return True
+        if entry['fingerprint'] == fingerprint:
+            return False
+        return time.time() - entry['generated_at'] >= self.staleness_seconds
+
+    def _regenerate(self, name: str, section: Dict[str, Any], messages: List[Dict], fingerprint: frozenset) -> bool:
+        try:
+            text = section['generate'](section['question'], messages) if messages else section['empty_text']
+            self._store(name, text, messages, fingerprint)
+            return True
+        except Exception as e:
+            logger.error(f"Error refreshing '{name}' insight: {e}")
+            return False
+        finally:
+            self._in_flight.discard(name)
+
+    def _regenerate_batch(self, batched: Dict[str, Tuple[Dict[str, Any], List[Dict], frozenset]]) -> bool:
+        try:
+            texts = self.generate_batch({name: (section['question'], messages)
+                                         for name, (section, messages, _) in batched.items()})
+            for name, (section, messages, fingerprint) in batched.items():
+                if texts.get(name):
+                    self._store(name, texts[name], messages, fingerprint)
+            return True
+        except Exception as e:
+            logger.error(f"Error refreshing batched insights: {e}")
+            return False
+        finally:
+            for name in batched:
+                self._in_flight.discard(name)
+
+    def _store(self, name: str, text: str, messages: List[Dict], fingerprint: frozenset) -> None:
+        with self._lock:
+            self.entries[name] = {
+                'text': text,
+                'fingerprint': fingerprint,
+                'generated_at': time.time(),
+                'message_count': len(messages)
+            }
+            self.regenerations += 1
+
+    def get(self) -> Dict[str, Any]:
+        """Return the cached insights (never blocks on the LLM) and their age."""
+        self.start()
+        now = time.time()
+        result: Dict[str, Any] = {}
+        sections = {}
+        with self._lock:
+            for name in self.sections:
+                entry = self.entries.get(name)
+                if entry is None:
+                    result[name] = PENDING_TEXT
+                    sections[name] = {'age_seconds': None, 'message_count': 0}
+                else:
+                    result[name] = entry['text']
+                    sections[name] = {
+                        'age_seconds': round(now - entry['generated_at'], 1),
+                        'message_count': entry['message_count']
+                    }
+
+        ages = [s['age_seconds'] for s in sections.values() if s['age_seconds'] is not None]
+        result['cache'] = {
+            'age_seconds': max(ages) if ages else None,
+            'staleness_budget_seconds': self.staleness_seconds,
+            'regenerations': self.regenerations,
+            'sections': sections
+        }
+        return result
+
+    def start(self) -> None:
+        """Start the background refresh job (idempotent)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="insight-cache", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background refresh job."""
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            regenerated = self.refresh()
+            if regenerated:
+                logger.info(f"🔄 Regenerated insights: {', '.join(regenerated)}")
+            self._stop.wait(self.refresh_seconds)
@@ -0,0 +1,53 @@
+import threading
+import logging
+from typing import Dict, Any, List, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class LiveTable:
+    """In-memory mirror of a Pathway table, kept current with pw.io.subscribe.
+
+    `version` increases on every change and serves as the data-version
+    watermark for caches built on top of the table.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows: Dict[Any, Dict[str, Any]] = {}
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def attach(self, table) -> None:
+        """Subscribe to a Pathway table (must happen before pw.run)."""
+        import pathway as pw
+
+        pw.io.subscribe(table, on_change=self._on_change)
+        logger.info(f"✅ Live view attached to '{self.name}'")
+
+    def _on_change(self, key, row, time, is_addition):
+        if is_addition:
+            self.upsert(key, row)
+        else:
+            self.remove(key)
+
+    def upsert(self, key: Any, row: Dict[str, Any]) -> None:
+        """Insert or replace a row."""
+        with self._lock:
+            self.rows[key] = dict(row)
+            self.version += 1
+
+    def remove(self, key: Any) -> None:
+        """Remove a row if present."""
+        with self._lock:
+            if self.rows.pop(key, None) is not None:
+                self.version += 1
+
+    def snapshot(self) -> Tuple[List[Dict[str, Any]], int]:
+        """Return the current rows and the version they correspond to."""
+        with self._lock:
+            return list(self.rows.values()), self.version
+
+    def __len__(self) -> int:
+        return len(self.rows)
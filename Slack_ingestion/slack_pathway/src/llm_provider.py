@@ -0,0 +1,119 @@
+import os
+import time
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# "gemini" (default) or "stub" for an offline, deterministic model
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+# Simulated model time per call for the stub backend
+LLM_STUB_LATENCY_SECONDS = float(os.getenv("LLM_STUB_LATENCY_SECONDS", "0.5"))
+# Deadline for a single model call
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "15"))
+
+class LLMProvider(ABC):
+    """Text generation backend used by RAGService."""
+
+    model_name = "unknown"
+
+    @abstractmethod
+    def generate(self, prompt: str, max_tokens: int, temperature: float,
+                 timeout: Optional[float] = None) -> str:
+        """Return the full completion for a prompt; raises TimeoutError past the deadline."""
+
+    def generate_stream(self, prompt: str, max_tokens: int, temperature: float,
+                        timeout: Optional[float] = None) -> Iterator[str]:
+        """Yield the completion in chunks; defaults to a single chunk."""
+        yield self.generate(prompt, max_tokens, temperature, timeout)
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through google-generativeai, configured on first use."""
+
+    def __init__(self, model_name: Optional[str] = None, api_key: Optional[str] = None):
+        import google.generativeai as genai
+
+        self.genai = genai
+        self.model_name = model_name or os.getenv("AI_MODEL", "gemini-1.5-flash")
+        genai.configure(api_key=api_key or os.getenv("GEMINI_API_KEY"))
+        self.model = genai.GenerativeModel(self.model_name)
+
+    def _config(self, max_tokens: int, temperature: float):
+        return self.genai.types.GenerationConfig(max_output_tokens=max_tokens, temperature=temperature)
+
+    def _request_options(self, timeout: Optional[float]):
+        return {'timeout': timeout} if timeout else None
+
+    def generate(self, prompt: str, max_tokens: int, temperature: float,
+                 timeout: Optional[float] = None) -> str:
+        response = self.model.generate_content(prompt, generation_config=self._config(max_tokens, temperature),
+                                               request_options=self._request_options(timeout))
+        return response.text
+
+    def generate_stream(self, prompt: str, max_tokens: int, temperature: float,
+                        timeout: Optional[float] = None) -> Iterator[str]:
+        response = self.model.generate_content(prompt, generation_config=self._config(max_tokens, temperature),
+                                               stream=True, request_options=self._request_options(timeout))
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+class StubProvider(LLMProvider):
+    """Offline model: sleeps for a fixed latency and returns text derived from the prompt.
+
+    The same prompt always gives the same answer, so load tests and benchmarks
+    measure the service's own overhead with a known model time.
+    """
+
+    model_name = "stub"
+
+    def __init__(self, latency_seconds: float = LLM_STUB_LATENCY_SECONDS, chunks: int = 4):
+        self.latency_seconds = latency_seconds
+        self.chunks = max(chunks, 1)
+        self.calls = 0
+
+    def _answer(self, prompt: str, max_tokens: int) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        query = next((line.strip()[len("Query:"):].strip() for line in prompt.splitlines()
+                      if line.strip().startswith("Query:")), "")
+        words = f"Stub answer {digest[:12]} for: {query or 'prompt'}".split()
+        return " ".join(words[:max(max_tokens, 1)])
+
+    def _wait(self, seconds: float, deadline: Optional[float]) -> None:
+        if deadline is not None and time.monotonic() + seconds > deadline:
+            time.sleep(max(deadline - time.monotonic(), 0.0))
+            raise TimeoutError("Stub model call timed out")
+        time.sleep(seconds)
+
+    def generate(self, prompt: str, max_tokens: int, temperature: float,
+                 timeout: Optional[float] = None) -> str:
+        self.calls += 1
+        self._wait(self.latency_seconds, time.monotonic() + timeout if timeout else None)
+        return self._answer(prompt, max_tokens)
+
+    def generate_stream(self, prompt: str, max_tokens: int, temperature: float,
+                        timeout: Optional[float] = None) -> Iterator[str]:
+        self.calls += 1
+        deadline = time.monotonic() + timeout if timeout else None
+        words = self._answer(prompt, max_tokens).split(" ")
+        size = -(-len(words) // self.chunks)
+        for i in range(0, len(words), size):
+            self._wait(self.latency_seconds / self.chunks, deadline)
+            yield " ".join(words[i:i + size]) + (" " if i + size < len(words) else "")
+
+PROVIDERS = {
+    'gemini': GeminiProvider,
+    'stub': StubProvider,
+}
+
+def create_provider(backend: Optional[str] = None) -> LLMProvider:
+    """Build the provider named by `backend` (or LLM_BACKEND)."""
+    backend = (backend or LLM_BACKEND).lower()
+    if backend not in PROVIDERS:
+        raise ValueError(f"Unknown LLM_BACKEND {backend!r}; expected one of {', '.join(PROVIDERS)}")
+    logger.info(f"Using LLM backend: {backend}")
+    return PROVIDERS[backend]()
@@ -0,0 +1,147 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Provider quotas (0 disables a limit)
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "100000"))
+# Model calls running at once
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "4"))
+# Longest a call may wait for its turn before giving up
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+
+# Lower numbers are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+class QueueTimeoutError(TimeoutError):
+    """A call waited longer than the queue timeout for a rate-limit or concurrency slot."""
+
+class TokenBucket:
+    """Refills at `per_minute` units per minute up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_minute / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill(now)
+        # A request larger than the bucket is let through once the bucket is full
+        amount = min(amount, self.capacity)
+        missing = amount - self.level
+        return max(missing, 0.0) * 60.0 / self.per_minute
+
+    def take(self, amount: float) -> None:
+        if self.per_minute > 0:
+            self.level -= min(amount, self.capacity)
+
+class LLMScheduler:
+    """Admits model calls in priority order within rate limits and a concurrency bound.
+
+    Callers block in `slot()` until it is their turn: the highest-priority,
+    longest-waiting call goes next, once both token buckets can cover it and
+    fewer than `max_in_flight` calls are running. Queue wait time is recorded per priority.
+    """
+
+    def __init__(self, requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+                 max_in_flight: int = LLM_MAX_IN_FLIGHT,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_in_flight = max(max_in_flight, 1)
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.waits = {name: deque(maxlen=1000) for name in PRIORITY_NAMES.values()}
+        self.admitted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.timed_out = {name: 0 for name in PRIORITY_NAMES.values()}
+
+    @contextmanager
+    def slot(self, priority: int = INTERACTIVE, tokens: int = 0, timeout: Optional[float] = None):
+        """Wait for a turn to call the model; the slot is released when the block exits."""
+        self._acquire(priority, tokens, self.queue_timeout if timeout is None else timeout)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def _acquire(self, priority: int, tokens: int, timeout: float) -> None:
+        name = PRIORITY_NAMES.get(priority, 'background')
+        enqueued = time.monotonic()
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self.queue, ticket)
+            while True:
+                now = time.monotonic()
+                wait = None
+                if self.queue[0] == ticket and self.in_flight < self.max_in_flight:
+                    wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                    if wait == 0:
+                        heapq.heappop(self.queue)
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        self.in_flight += 1
+                        self.waits[name].append(now - enqueued)
+                        self.admitted[name] += 1
+                        # The next caller in line may be admissible too
+                        self._cond.notify_all()
+                        return
+
+                remaining = enqueued + timeout - now
+                if remaining <= 0:
+                    self.queue.remove(ticket)
+                    heapq.heapify(self.queue)
+                    self.timed_out[name] += 1
+                    self._cond.notify_all()
+                    raise QueueTimeoutError(f"Waited {now - enqueued:.1f}s for an LLM slot")
+                self._cond.wait(min(wait, remaining) if wait else remaining)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue length, calls in flight, bucket levels and queue wait times per priority."""
+        with self._cond:
+            now = time.monotonic()
+            self.requests._refill(now)
+            self.tokens._refill(now)
+            queue_wait = {}
+            for name, waits in self.waits.items():
+                ordered = sorted(waits)
+                queue_wait[name] = {
+                    'admitted': self.admitted[name],
+                    'timed_out': self.timed_out[name],
+                    'avg_ms': round(sum(ordered) / len(ordered) * 1000, 1) if ordered else 0.0,
+                    'p95_ms': round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1) if ordered else 0.0,
+                    'max_ms': round(ordered[-1] * 1000, 1) if ordered else 0.0
+                }
+            return {
+                'queued': len(self.queue),
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'requests_available': round(self.requests.level, 1) if self.requests.per_minute > 0 else None,
+                'tokens_available': round(self.tokens.level) if self.tokens.per_minute > 0 else None,
+                'queue_wait': queue_wait
+            }
@@ -5,14 +5,20 @@ This file integrates the Pathway database with the Flask web application.
 """
 
 import pathway as pw
+import argparse
+import json
 import logging
-from flask import Flask, request, render_template, jsonify
+import threading
+import time
+from flask import Flask, request, render_template, jsonify, Response, stream_with_context
 import os
 from dotenv import load_dotenv
 from stream import push_message, get_stream_stats
 from utils import is_valid_message
 from rag_query_service import rag_query_service
-from pathway_rag_service import initialize_pathway_rag_service
+from pathway_rag_service import initialize_pathway_rag_service, CHANNEL_FIELDS
+from pipeline_metrics import pipeline_metrics
+from time_index import decode_cursor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +26,23 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+def parse_args():
+    """Parse command line options (unknown options are left for the WSGI server)."""
+    parser = argparse.ArgumentParser(description="Pathway-based Slack ingestion system")
+    parser.add_argument("--pathway-threads", type=int, default=None,
+                        help="Pathway worker threads (default: PATHWAY_THREADS or 1)")
+    parser.add_argument("--input-shards", type=int, default=None,
+                        help="Channel-partitioned input connectors (default: PIPELINE_INPUT_SHARDS or thread count)")
+    args, _ = parser.parse_known_args()
+    return args
+
+# Worker settings must be in the environment before the pipeline graph is built
+cli_args = parse_args()
+if cli_args.pathway_threads:
+    os.environ["PATHWAY_THREADS"] = str(cli_args.pathway_threads)
+if cli_args.input_shards:
+    os.environ["PIPELINE_INPUT_SHARDS"] = str(cli_args.input_shards)
+
 # Global variables for Pathway system
 pathway_tables = {}
 pathway_service = None
@@ -27,7 +50,7 @@ pathway_service = None
 # Initialize Pathway system
 try:
     # Import Pathway tables
-    from pathway_pipeline import PATHWAY_TABLES
+    from pathway_pipeline import PATHWAY_TABLES, run_pipeline
     
     # Store tables globally
     pathway_tables = PATHWAY_TABLES
@@ -47,6 +70,19 @@ except Exception as e:
 # Initialize Flask app
 app = Flask(__name__)
 
+def page_args(default_hours, default_limit):
+    """Read hours/limit and the before/after keyset cursors from the query string."""
+    before = request.args.get("before")
+    after = request.args.get("after")
+    if before and after:
+        raise ValueError("Use either 'before' or 'after', not both")
+    return {
+        "hours": request.args.get("hours", default_hours, type=int),
+        "limit": request.args.get("limit", default_limit, type=int),
+        "before": decode_cursor(before) if before else None,
+        "after": decode_cursor(after) if after else None
+    }
+
 # Root route -> serve frontend
 @app.route("/")
 def landing():
@@ -116,6 +152,47 @@ def get_response():
         logger.error(f"Error in query endpoint: {e}")
         return jsonify({"reply": f"Error processing your request: {str(e)}"}), 500
 
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/api/query/stream", methods=["POST"])
+def stream_response():
+    """Stream a RAG answer as Server-Sent Events: `chunk` events, then a `done` event with timings."""
+    data = request.get_json(silent=True) or {}
+    user_message = data.get("message", "")
+    started = time.perf_counter()
+    
+    def generate():
+        first_chunk_at = None
+        chunks = 0
+        try:
+            if not user_message.strip():
+                replies = iter(["Please provide a question or query."])
+            else:
+                replies = rag_query_service.query_rag_stream(user_message)
+            
+            for text in replies:
+                if first_chunk_at is None:
+                    first_chunk_at = time.perf_counter()
+                chunks += 1
+                yield sse_event("chunk", {"text": text})
+                
+        except Exception as e:
+            logger.error(f"Error in streaming query endpoint: {e}")
+            yield sse_event("chunk", {"text": f"Error processing your request: {str(e)}"})
+        
+        total = time.perf_counter() - started
+        ttfb = (first_chunk_at or time.perf_counter()) - started
+        logger.info(f"Streamed answer: first chunk after {ttfb * 1000:.0f} ms, done after {total * 1000:.0f} ms ({chunks} chunks)")
+        yield sse_event("done", {"ttfb_ms": round(ttfb * 1000, 1), "total_ms": round(total * 1000, 1), "chunks": chunks})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route("/api/insights", methods=["GET"])
 def get_insights():
     """Get predefined insights for demo purposes."""
@@ -138,12 +215,15 @@ def get_stats():
 
 @app.route("/api/messages", methods=["GET"])
 def get_messages():
-    """Get recent messages."""
+    """Get recent messages, one keyset page at a time."""
     try:
-        hours = request.args.get("hours", 2, type=int)
-        limit = request.args.get("limit", 50, type=int)
-        messages = rag_query_service.get_recent_messages(hours=hours, limit=limit)
-        return jsonify({"messages": messages})
+        try:
+            args = page_args(default_hours=2, default_limit=50)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        page = rag_query_service.page_messages(**args)
+        return jsonify(page)
     except Exception as e:
         logger.error(f"Error getting messages: {e}")
         return jsonify({"error": str(e)}), 500
@@ -157,13 +237,36 @@ def pathway_status():
             "tables_available": len(pathway_tables) > 0,
             "service_initialized": pathway_service is not None,
             "tables": list(pathway_tables.keys()) if pathway_tables else [],
-            "mode": "pathway" if pathway_service else "fallback"
+            "mode": "pathway" if pathway_service else "fallback",
+            "query_cache": pathway_service.get_cache_stats() if pathway_service else None,
+            "llm_cache": rag_query_service.rag_service.cache.stats(),
+            "llm_coalescing": rag_query_service.rag_service.flights.stats(),
+            "llm_breaker": rag_query_service.rag_service.resilience_stats(),
+            "llm_scheduler": rag_query_service.rag_service.scheduler.stats()
         }
         return jsonify(status)
     except Exception as e:
         logger.error(f"Error getting Pathway status: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/pathway/metrics", methods=["GET"])
+def pathway_metrics():
+    """Get live pipeline metrics: per-stage rows, index lag, connector backlog and UDF time."""
+    try:
+        return jsonify(pipeline_metrics.snapshot())
+    except Exception as e:
+        logger.error(f"Error getting Pathway metrics: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Expose pipeline metrics in Prometheus text format."""
+    try:
+        return Response(pipeline_metrics.to_prometheus(), mimetype="text/plain; version=0.0.4")
+    except Exception as e:
+        logger.error(f"Error rendering Prometheus metrics: {e}")
+        return Response(f"# error: {e}\n", status=500, mimetype="text/plain")
+
 @app.route("/api/pathway/search", methods=["POST"])
 def pathway_search():
     """Search messages using Pathway database."""
@@ -175,11 +278,12 @@ def pathway_search():
         query_text = data.get("query", "")
         limit = data.get("limit", 10)
         channel = data.get("channel")
+        hours = data.get("hours")
         
         if not query_text.strip():
             return jsonify({"error": "Query text required"}), 400
         
-        messages = pathway_service.search_messages(query_text, limit=limit, channel=channel)
+        messages = pathway_service.search_messages(query_text, limit=limit, channel=channel, hours=hours)
         return jsonify({"messages": messages})
         
     except Exception as e:
@@ -193,11 +297,13 @@ def pathway_problems():
         if not pathway_service:
             return jsonify({"error": "Pathway service not available"}), 503
             
-        hours = request.args.get("hours", 24, type=int)
-        limit = request.args.get("limit", 20, type=int)
+        try:
+            args = page_args(default_hours=24, default_limit=20)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        messages = pathway_service.get_problem_messages(hours=hours, limit=limit)
-        return jsonify({"messages": messages})
+        page = pathway_service.page_messages('problems', **args)
+        return jsonify(page)
         
     except Exception as e:
         logger.error(f"Error getting problem messages: {e}")
@@ -210,11 +316,13 @@ def pathway_questions():
         if not pathway_service:
             return jsonify({"error": "Pathway service not available"}), 503
             
-        hours = request.args.get("hours", 24, type=int)
-        limit = request.args.get("limit", 20, type=int)
+        try:
+            args = page_args(default_hours=24, default_limit=20)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        messages = pathway_service.get_question_messages(hours=hours, limit=limit)
-        return jsonify({"messages": messages})
+        page = pathway_service.page_messages('questions', **args)
+        return jsonify(page)
         
     except Exception as e:
         logger.error(f"Error getting question messages: {e}")
@@ -227,16 +335,62 @@ def pathway_urgent():
         if not pathway_service:
             return jsonify({"error": "Pathway service not available"}), 503
             
-        hours = request.args.get("hours", 24, type=int)
-        limit = request.args.get("limit", 10, type=int)
+        try:
+            args = page_args(default_hours=24, default_limit=10)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        messages = pathway_service.get_urgent_messages(hours=hours, limit=limit)
-        return jsonify({"messages": messages})
+        page = pathway_service.page_messages('urgent', **args)
+        return jsonify(page)
         
     except Exception as e:
         logger.error(f"Error getting urgent messages: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/pathway/threads", methods=["GET"])
+def pathway_threads():
+    """Get conversation threads using Pathway database."""
+    try:
+        if not pathway_service:
+            return jsonify({"error": "Pathway service not available"}), 503
+            
+        hours = request.args.get("hours", 24, type=int)
+        limit = request.args.get("limit", 20, type=int)
+        channel = request.args.get("channel")
+        
+        threads = pathway_service.get_threads(hours=hours, limit=limit, channel=channel)
+        return jsonify({"threads": threads})
+        
+    except Exception as e:
+        logger.error(f"Error getting threads: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/channels", methods=["GET"])
+def channel_stats():
+    """Get per-channel statistics, sorted and paginated."""
+    try:
+        if not pathway_service:
+            return jsonify({"error": "Pathway service not available"}), 503
+            
+        sort_by = request.args.get("sort", "message_count")
+        order = request.args.get("order", "desc")
+        offset = request.args.get("offset", 0, type=int)
+        limit = request.args.get("limit", 50, type=int)
+        
+        if sort_by not in CHANNEL_FIELDS:
+            return jsonify({"error": f"sort must be one of {list(CHANNEL_FIELDS)}"}), 400
+        if order not in ("asc", "desc"):
+            return jsonify({"error": "order must be 'asc' or 'desc'"}), 400
+        
+        result = pathway_service.get_channel_stats(
+            sort_by=sort_by, descending=(order == "desc"), offset=offset, limit=limit
+        )
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"Error getting channel stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route("/api/stream/stats", methods=["GET"])
 def stream_stats():
     """Get stream statistics."""
@@ -256,5 +410,13 @@ if __name__ == "__main__":
     logger.info("📈 Dashboard: http://localhost:5000/dashboard")
     logger.info("🔗 Slack webhook: http://localhost:5000/slack/events")
     
+    # Run the Pathway graph alongside the web server
+    if pathway_service:
+        pipeline_thread = threading.Thread(target=run_pipeline, name="pathway-pipeline", daemon=True)
+        pipeline_thread.start()
+        # Warm the insight cache so the first dashboard poll has something to show
+        pathway_service.insights.start()
+    
     # Listen on all interfaces so ngrok can reach it
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    # (no reloader: the Pathway engine can only be started once per process)
+    app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)
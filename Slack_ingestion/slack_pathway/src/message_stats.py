@@ -0,0 +1,147 @@
+import heapq
+import threading
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class _Bucket:
+    """Counts for one time bucket (or for the whole window)."""
+
+    __slots__ = ('messages', 'length_sum', 'questions', 'problems', 'urgent', 'users', 'channels')
+
+    def __init__(self):
+        self.messages = 0
+        self.length_sum = 0
+        self.questions = 0
+        self.problems = 0
+        self.urgent = 0
+        self.users = Counter()
+        self.channels = Counter()
+
+    def add(self, user: str, channel: str, length: int, is_question: bool,
+            has_problem: bool, has_urgency: bool, sign: int = 1) -> None:
+        self.messages += sign
+        self.length_sum += sign * length
+        self.questions += sign * int(is_question)
+        self.problems += sign * int(has_problem)
+        self.urgent += sign * int(has_urgency)
+        _bump(self.users, user, sign)
+        _bump(self.channels, channel, sign)
+
+    def subtract(self, other: '_Bucket') -> None:
+        self.messages -= other.messages
+        self.length_sum -= other.length_sum
+        self.questions -= other.questions
+        self.problems -= other.problems
+        self.urgent -= other.urgent
+        for user, count in other.users.items():
+            _bump(self.users, user, -count)
+        for channel, count in other.channels.items():
+            _bump(self.channels, channel, -count)
+
+def _bump(counter: Counter, key: str, delta: int) -> None:
+    """Adjust a counter entry, dropping it when it reaches zero."""
+    value = counter[key] + delta
+    if value > 0:
+        counter[key] = value
+    else:
+        del counter[key]
+
+class MessageStats:
+    """Running message aggregates, updated once per ingested message.
+
+    Keeps all-time totals plus time-bucketed counts for a sliding window
+    (24h by default). Reading the stats never rescans messages.
+    """
+
+    def __init__(self, window_hours: float = 24, bucket_seconds: int = 60):
+        self.window_seconds = window_hours * 3600
+        self.bucket_seconds = bucket_seconds
+        self.all_time = _Bucket()
+        self.window = _Bucket()
+        self.buckets: Dict[int, _Bucket] = {}
+        self._bucket_heap = []
+        self._lock = threading.Lock()
+
+    def attach(self, table) -> None:
+        """Keep the stats current from a Pathway table with rag_index columns."""
+        import pathway as pw
+
+        def on_change(key, row, time, is_addition):
+            self.add(
+                user=row['user'],
+                channel=row['channel'],
+                ts=row['timestamp_parsed'],
+                length=row['message_length'],
+                is_question=row['is_question'],
+                has_problem=row['has_problem_keywords'],
+                has_urgency=row['has_urgency'],
+                sign=1 if is_addition else -1
+            )
+
+        pw.io.subscribe(table, on_change=on_change)
+
+    def add(self, user: str, channel: str, ts: Any, length: int, is_question: bool = False,
+            has_problem: bool = False, has_urgency: bool = False, sign: int = 1) -> None:
+        """Count one message (sign=-1 retracts a previously counted message)."""
+        try:
+            ts = float(ts)
+        except (TypeError, ValueError):
+            ts = time.time()
+        counts = (user or '', channel or '', int(length or 0), bool(is_question), bool(has_problem), bool(has_urgency))
+
+        now = time.time()
+        with self._lock:
+            self.all_time.add(*counts, sign=sign)
+
+            self._evict(now)
+            if ts < now - self.window_seconds:
+                return
+
+            bucket_id = int(ts // self.bucket_seconds)
+            bucket = self.buckets.get(bucket_id)
+            if bucket is None:
+                if sign < 0:
+                    return
+                bucket = self.buckets[bucket_id] = _Bucket()
+                heapq.heappush(self._bucket_heap, bucket_id)
+            bucket.add(*counts, sign=sign)
+            self.window.add(*counts, sign=sign)
+
+    def remove(self, *args, **kwargs) -> None:
+        """Retract a previously counted message."""
+        self.add(*args, sign=-1, **kwargs)
+
+    def _evict(self, now: float) -> None:
+        """Drop buckets that have slid out of the window (amortised O(log buckets))."""
+        oldest_bucket = int((now - self.window_seconds) // self.bucket_seconds)
+        while self._bucket_heap and self._bucket_heap[0] < oldest_bucket:
+            bucket_id = heapq.heappop(self._bucket_heap)
+            bucket = self.buckets.pop(bucket_id, None)
+            if bucket is not None:
+                self.window.subtract(bucket)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Return the window stats (and all-time totals) without touching messages."""
+        with self._lock:
+            self._evict(now or time.time())
+            window = self.window
+            return {
+                'total_messages': window.messages,
+                'unique_users': len(window.users),
+                'unique_channels': len(window.channels),
+                'avg_message_length': round(window.length_sum / window.messages, 1) if window.messages else 0,
+                'questions_count': window.questions,
+                'problems_count': window.problems,
+                'urgent_count': window.urgent,
+                'window_hours': self.window_seconds / 3600,
+                'total_messages_all_time': self.all_time.messages,
+                'unique_users_all_time': len(self.all_time.users),
+                'last_updated': datetime.now().isoformat()
+            }
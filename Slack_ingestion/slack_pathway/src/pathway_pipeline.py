@@ -2,15 +2,25 @@ import pathway as pw
 from stream import read_stream
 from ai_service import rag_service
 import json
+import os
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 import time
+from utils import build_thread_text, thread_participants
+from pipeline_metrics import pipeline_metrics
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Maximum characters of concatenated thread text kept for RAG context
+THREAD_TEXT_MAX_CHARS = int(os.getenv("THREAD_TEXT_MAX_CHARS", "2000"))
+
+# Number of Pathway worker threads and of channel-partitioned input connectors
+PATHWAY_THREADS = int(os.getenv("PATHWAY_THREADS", "1"))
+PIPELINE_INPUT_SHARDS = int(os.getenv("PIPELINE_INPUT_SHARDS", str(PATHWAY_THREADS)))
+
 # Define comprehensive schemas for Pathway database
 class MessageSchema(pw.Schema):
     user: str
@@ -42,8 +52,14 @@ class AnalyticsSchema(pw.Schema):
 
 # Custom Subject to push messages from read_stream()
 class MessageSubject(pw.io.python.ConnectorSubject):
+    def __init__(self, shard: Optional[int] = None, num_shards: int = 1):
+        """Read every message, or only the channels mapped to `shard` when sharding."""
+        super().__init__()
+        self.shard = shard
+        self.num_shards = num_shards
+    
     def run(self):
-        for msg in read_stream():
+        for msg in read_stream(shard=self.shard, num_shards=self.num_shards):
             # Generate unique message ID if not present
             message_id = msg.get("message_id", f"{msg.get('ts', '')}_{msg.get('user', '')}")
             
@@ -56,9 +72,35 @@ class MessageSubject(pw.io.python.ConnectorSubject):
                 thread_ts=msg.get("thread_ts", ""),
                 message_type=msg.get("type", "message")
             )
+            pipeline_metrics.record_connector_emit()
+
+# Python UDFs used by the pipeline (timed so their cost shows up in pipeline metrics)
+@pipeline_metrics.timed_udf("created_at")
+def _created_at(ts: str) -> str:
+    return datetime.fromtimestamp(float(ts)).isoformat() if ts else ""
+
+@pipeline_metrics.timed_udf("hour_bucket")
+def _hour_bucket(ts: str) -> str:
+    return datetime.fromtimestamp(float(ts)).strftime("%Y-%m-%d %H:00") if ts else ""
+
+@pipeline_metrics.timed_udf("searchable_text")
+def _searchable_text(text: str) -> str:
+    return text.lower().strip()
 
-# Read messages into Pathway table
-messages_table = pw.io.python.read(MessageSubject(), schema=MessageSchema)
+@pipeline_metrics.timed_udf("thread_text")
+def _thread_text(entries) -> str:
+    return build_thread_text(entries, THREAD_TEXT_MAX_CHARS)
+
+# Read messages into Pathway table, one connector per channel shard so that
+# input is spread across workers; groupbys below are partitioned by key
+if PIPELINE_INPUT_SHARDS > 1:
+    message_shards = [
+        pw.io.python.read(MessageSubject(shard=shard, num_shards=PIPELINE_INPUT_SHARDS), schema=MessageSchema)
+        for shard in range(PIPELINE_INPUT_SHARDS)
+    ]
+    messages_table = pw.Table.concat_reindex(*message_shards)
+else:
+    messages_table = pw.io.python.read(MessageSubject(), schema=MessageSchema)
 
 # Filter and process messages
 valid_messages = messages_table.filter(
@@ -76,6 +118,8 @@ processed_messages = valid_messages.select(
     message_id=valid_messages.message_id,
     thread_ts=valid_messages.thread_ts,
     message_type=valid_messages.message_type,
+    # Replies carry their root's thread_ts; root messages start their own thread
+    thread_id=pw.if_else(valid_messages.thread_ts != "", valid_messages.thread_ts, valid_messages.ts),
     # Computed fields for analytics
     message_length=pw.cast(int, valid_messages.text.str.len()),
     is_question=valid_messages.text.str.contains("?"),
@@ -84,7 +128,7 @@ processed_messages = valid_messages.select(
     word_count=pw.cast(int, valid_messages.text.str.split().str.len()),
     timestamp_parsed=pw.cast(float, valid_messages.ts),
     # Create timestamp for indexing
-    created_at=pw.cast(str, pw.apply(lambda ts: datetime.fromtimestamp(float(ts)).isoformat() if ts else "", valid_messages.ts))
+    created_at=pw.cast(str, pw.apply(_created_at, valid_messages.ts))
 )
 
 # Create users table from messages
@@ -96,12 +140,17 @@ users_table = processed_messages.groupby(processed_messages.user).reduce(
     message_count=pw.reducers.count()
 )
 
-# Create channels table from messages
+# Create channels table from messages (per-channel stats, updated per message)
 channels_table = processed_messages.groupby(processed_messages.channel).reduce(
     channel_id=processed_messages.channel,
     channel_name=processed_messages.channel,
     channel_type=pw.cast(str, "public"),
-    message_count=pw.reducers.count()
+    message_count=pw.reducers.count(),
+    questions_count=pw.reducers.sum(pw.cast(int, processed_messages.is_question)),
+    problems_count=pw.reducers.sum(pw.cast(int, processed_messages.has_problem_keywords)),
+    urgent_count=pw.reducers.sum(pw.cast(int, processed_messages.has_urgency)),
+    unique_users=pw.reducers.count_distinct(processed_messages.user),
+    last_activity=pw.reducers.max(processed_messages.timestamp_parsed)
 )
 
 # Create real-time analytics
@@ -115,10 +164,10 @@ analytics_table = processed_messages.select(
 # Create aggregated analytics
 hourly_stats = processed_messages.groupby(
     processed_messages.channel,
-    pw.apply(lambda ts: datetime.fromtimestamp(float(ts)).strftime("%Y-%m-%d %H:00") if ts else "", processed_messages.ts)
+    pw.apply(_hour_bucket, processed_messages.ts)
 ).reduce(
     channel=processed_messages.channel,
-    hour=pw.apply(lambda ts: datetime.fromtimestamp(float(ts)).strftime("%Y-%m-%d %H:00") if ts else "", processed_messages.ts),
+    hour=pw.apply(_hour_bucket, processed_messages.ts),
     message_count=pw.reducers.count(),
     avg_message_length=pw.reducers.avg(processed_messages.message_length),
     questions_count=pw.reducers.sum(pw.cast(int, processed_messages.is_question)),
@@ -131,13 +180,45 @@ rag_index = processed_messages.select(
     user=processed_messages.user,
     text=processed_messages.text,
     channel=processed_messages.channel,
+    thread_id=processed_messages.thread_id,
     timestamp=processed_messages.created_at,
+    timestamp_parsed=processed_messages.timestamp_parsed,
     message_length=processed_messages.message_length,
     is_question=processed_messages.is_question,
     has_problem_keywords=processed_messages.has_problem_keywords,
     has_urgency=processed_messages.has_urgency,
     # Create searchable text field
-    searchable_text=pw.apply(lambda text: text.lower().strip(), processed_messages.text)
+    searchable_text=pw.apply(_searchable_text, processed_messages.text)
+)
+
+# Create conversation threads from messages (updated in place as replies arrive)
+thread_groups = processed_messages.groupby(processed_messages.thread_id).reduce(
+    thread_id=processed_messages.thread_id,
+    channel=pw.reducers.any(processed_messages.channel),
+    entries=pw.reducers.sorted_tuple(pw.make_tuple(
+        processed_messages.timestamp_parsed,
+        processed_messages.message_id,
+        processed_messages.user,
+        processed_messages.text
+    )),
+    message_count=pw.reducers.count(),
+    last_activity=pw.reducers.max(processed_messages.timestamp_parsed),
+    has_problem_keywords=pw.reducers.any(processed_messages.has_problem_keywords),
+    has_urgency=pw.reducers.any(processed_messages.has_urgency)
+)
+
+threads_table = thread_groups.select(
+    thread_id=thread_groups.thread_id,
+    channel=thread_groups.channel,
+    root_message_id=pw.apply(lambda entries: entries[0][1], thread_groups.entries),
+    root_user=pw.apply(lambda entries: entries[0][2], thread_groups.entries),
+    root_text=pw.apply(lambda entries: entries[0][3], thread_groups.entries),
+    reply_count=thread_groups.message_count - 1,
+    participants=pw.apply(thread_participants, thread_groups.entries),
+    last_activity=thread_groups.last_activity,
+    has_problem_keywords=thread_groups.has_problem_keywords,
+    has_urgency=thread_groups.has_urgency,
+    thread_text=pw.apply(_thread_text, thread_groups.entries)
 )
 
 # Global tables for access from other modules
@@ -147,12 +228,39 @@ PATHWAY_TABLES = {
     'channels': channels_table,
     'analytics': analytics_table,
     'hourly_stats': hourly_stats,
-    'rag_index': rag_index
+    'rag_index': rag_index,
+    'threads': threads_table
 }
 
+# Live per-stage metrics (populated while the pipeline runs)
+pipeline_metrics.observe_table('messages_table', messages_table)
+pipeline_metrics.observe_table('valid_messages', valid_messages, upstream='messages_table')
+pipeline_metrics.observe_table('processed_messages', processed_messages, upstream='valid_messages')
+pipeline_metrics.observe_table('users_table', users_table, upstream='processed_messages')
+pipeline_metrics.observe_table('channels_table', channels_table, upstream='processed_messages')
+pipeline_metrics.observe_table('hourly_stats', hourly_stats, upstream='processed_messages')
+pipeline_metrics.observe_table('threads', threads_table, upstream='processed_messages')
+pipeline_metrics.observe_table(
+    'rag_index', rag_index, upstream='processed_messages',
+    on_insert=lambda row: pipeline_metrics.record_visibility(row['timestamp_parsed'])
+)
+
+def run_pipeline(threads: Optional[int] = None) -> None:
+    """Run the Pathway graph (blocking) with the given number of worker threads.
+    
+    Multiple processes are started with `pathway spawn --processes N`, which sets
+    the worker environment for each process before this is called.
+    """
+    if threads:
+        os.environ["PATHWAY_THREADS"] = str(threads)
+    logger.info(
+        f"🚀 Running Pathway pipeline with {os.getenv('PATHWAY_THREADS', '1')} thread(s), "
+        f"{os.getenv('PATHWAY_PROCESSES', '1')} process(es), {PIPELINE_INPUT_SHARDS} input shard(s)"
+    )
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+
 # Note: Pathway tables are now ready for use
-# The pipeline will be automatically managed by the main application
-# No need to call pw.run() here as it's handled by the main app
+# The pipeline is run by the main application via run_pipeline()
 
 if __name__ == "__main__":
     # This file should not be run directly
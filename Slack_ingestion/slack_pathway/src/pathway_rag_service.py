@@ -1,224 +1,391 @@
 import pathway as pw
 import json
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Callable, Iterator
 from datetime import datetime, timedelta
 from ai_service import rag_service
+from bm25_index import BM25Index
+from insight_cache import InsightCache
+from live_table import LiveTable
+from message_stats import MessageStats
+from ranking import hybrid_ranker
+from time_index import TimeIndex, encode_cursor
+from utils import select_top_k
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Fields returned for a message when no projection is requested
+MESSAGE_FIELDS = (
+    'message_id', 'user', 'text', 'channel', 'thread_id', 'timestamp', 'ts',
+    'message_length', 'is_question', 'has_problem_keywords', 'has_urgency'
+)
+
+THREAD_FIELDS = (
+    'thread_id', 'channel', 'root_message_id', 'root_user', 'root_text', 'reply_count',
+    'participants', 'last_activity', 'has_problem_keywords', 'has_urgency', 'thread_text'
+)
+
+CHANNEL_FIELDS = (
+    'channel', 'message_count', 'questions_count', 'problems_count', 'urgent_count',
+    'unique_users', 'last_activity'
+)
+
+# Time-ordered message indexes for keyset pagination: name -> flag rows must have
+TIMELINE_FLAGS = {
+    'all': None,
+    'problems': 'has_problem_keywords',
+    'questions': 'is_question',
+    'urgent': 'has_urgency'
+}
+
+# Candidates retrieved for RAG before the ranking stage picks the context
+RAG_CANDIDATES = 100
+RAG_CONTEXT_SIZE = 10
+
+NO_MESSAGES_REPLY = "No recent messages available to analyze. Please check if the chat integration is working."
+
+# Maximum number of cached query results
+QUERY_CACHE_SIZE = 256
+
 class PathwayRAGService:
     def __init__(self, pathway_tables: Dict[str, pw.Table]):
         """Initialize the Pathway-based RAG service."""
         self.tables = pathway_tables
         self.rag_service = rag_service
+        self.ranker = hybrid_ranker
         
-    def get_recent_messages(self, hours: int = 24, limit: int = 100, channel: Optional[str] = None) -> List[Dict]:
-        """Get recent messages using Pathway SQL queries."""
+        # Live views of the tables we query, kept current by the running pipeline
+        self.live = {
+            'rag_index': LiveTable('rag_index'),
+            'threads': LiveTable('threads'),
+            'channels': LiveTable('channels')
+        }
+        for name, live_table in self.live.items():
+            if self.tables.get(name) is not None:
+                live_table.attach(self.tables[name])
+        
+        # Inverted index for relevance search and RAG retrieval
+        self.search_index = BM25Index()
+        if self.tables.get('rag_index') is not None:
+            self.search_index.attach(self.tables['rag_index'])
+        
+        # Time-ordered indexes behind the paginated message endpoints
+        self.timelines = {name: TimeIndex() for name in TIMELINE_FLAGS}
+        if self.tables.get('rag_index') is not None:
+            pw.io.subscribe(self.tables['rag_index'], on_change=self._update_timelines)
+        
+        # Running 24h aggregates behind /api/stats, updated once per message
+        self.stats = MessageStats(window_hours=24)
+        if self.tables.get('rag_index') is not None:
+            self.stats.attach(self.tables['rag_index'])
+        
+        # Predefined insights, regenerated in the background when their messages change
+        batch = self.rag_service.insight_mode == 'batch'
+        self.insights = InsightCache(
+            self.rag_service.generate_response,
+            generate_batch=self.rag_service.generate_insights_batch if batch else None
+        )
+        self.insights.add_section(
+            'problems', "What are the top 3 problems teams are facing right now?",
+            lambda: self.get_problem_messages(hours=6, limit=10)[:5],
+            "No problems detected in recent messages.",
+            generate=self.rag_service.insight_generator('problems'),
+            batch=self.rag_service.insight_engine('problems') == 'llm'
+        )
+        self.insights.add_section(
+            'questions', "Summarize the most frequently asked questions.",
+            lambda: self.get_question_messages(hours=6, limit=10)[:5],
+            "No questions detected in recent messages.",
+            generate=self.rag_service.insight_generator('questions'),
+            batch=self.rag_service.insight_engine('questions') == 'llm'
+        )
+        self.insights.add_section(
+            'trending', "What topics are trending in the chat right now?",
+            lambda: self.get_recent_messages(hours=2, limit=20),
+            "No recent activity to analyze.",
+            generate=self.rag_service.insight_generator('trending'),
+            batch=self.rag_service.insight_engine('trending') == 'llm'
+        )
+        
+        # Query results keyed by (table, query parameters, data version)
+        self._query_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def data_version(self, table: str = 'rag_index') -> int:
+        """Return the data-version watermark of a live table."""
+        return self.live[table].version
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Return query cache counters."""
+        return {
+            'entries': len(self._query_cache),
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'data_version': self.data_version()
+        }
+    
+    def _execute(self, table: str, cache_key: tuple, predicates: List[Callable[[Dict], bool]],
+                 time_field: str, cutoff: Optional[float], limit: int) -> List[tuple]:
+        """Filter a live table, newest first, caching results per data version.
+        
+        Returns (time, row) pairs. A cached result stays valid until the table
+        changes; rows that have since aged out of the time window are dropped on read.
+        """
+        # Check the cache against the current version before copying any rows
+        live = self.live[table]
+        key = (table, cache_key, live.version)
+        
+        with self._cache_lock:
+            cached = self._query_cache.get(key)
+            if cached is not None:
+                self._query_cache.move_to_end(key)
+                self.cache_hits += 1
+        if cached is not None:
+            return [entry for entry in cached if cutoff is None or entry[0] >= cutoff]
+        
+        # The table may have changed since; cache under the version of the rows actually read
+        rows, version = live.snapshot()
+        key = (table, cache_key, version)
+        
+        def matches():
+            for row in rows:
+                row_time = float(row.get(time_field) or 0)
+                if cutoff is not None and row_time < cutoff:
+                    continue
+                if all(predicate(row) for predicate in predicates):
+                    yield row_time, row
+        
+        # Newest `limit` matches via a bounded heap instead of sorting every match
+        result = select_top_k(matches(), limit, key=lambda entry: entry[0])
+        
+        with self._cache_lock:
+            self.cache_misses += 1
+            self._query_cache[key] = result
+            while len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        
+        return result
+    
+    def _message_dict(self, row: Dict, fields: Sequence[str]) -> Dict:
+        """Project a rag_index row onto the requested message fields."""
+        message = {}
+        for field in fields:
+            if field == 'ts':
+                message['ts'] = str(row.get('timestamp_parsed', ''))
+            else:
+                message[field] = row.get(field)
+        return message
+    
+    def query_messages(self, hours: Optional[float] = 24, channel: Optional[str] = None,
+                       user: Optional[str] = None, is_question: Optional[bool] = None,
+                       has_problem_keywords: Optional[bool] = None, has_urgency: Optional[bool] = None,
+                       text: Optional[str] = None, fields: Optional[Sequence[str]] = None,
+                       limit: int = 100) -> List[Dict]:
+        """Query messages from the Pathway rag_index, most recent first.
+        
+        Args:
+            hours: Only messages from the last `hours` hours (None for all time).
+            channel: Only messages from this channel.
+            user: Only messages from this user.
+            is_question, has_problem_keywords, has_urgency: Flag predicates (None to ignore).
+            text: Case-insensitive substring the message must contain.
+            fields: Projection; defaults to all MESSAGE_FIELDS.
+            limit: Maximum number of messages returned.
+        """
         try:
-            # Calculate cutoff timestamp
-            cutoff_time = datetime.now() - timedelta(hours=hours)
-            cutoff_timestamp = cutoff_time.timestamp()
+            fields = tuple(fields) if fields else MESSAGE_FIELDS
+            unknown = [field for field in fields if field not in MESSAGE_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown message fields: {unknown}")
             
-            # Build query
-            query = self.tables['rag_index'].filter(
-                self.tables['rag_index'].timestamp_parsed >= cutoff_timestamp
-            )
+            cutoff = (datetime.now() - timedelta(hours=hours)).timestamp() if hours is not None else None
+            search_text = text.lower().strip() if text else None
             
-            # Filter by channel if specified
+            predicates = []
             if channel:
-                query = query.filter(self.tables['rag_index'].channel == channel)
-            
-            # Order by timestamp and limit
-            query = query.sort(key=query.timestamp_parsed, reverse=True)
-            
-            # Execute query and convert to list of dicts
-            messages = []
-            for row in pw.debug.compute_and_print(query):
-                messages.append({
-                    'message_id': row['message_id'],
-                    'user': row['user'],
-                    'text': row['text'],
-                    'channel': row['channel'],
-                    'timestamp': row['timestamp'],
-                    'ts': str(row['timestamp_parsed']),
-                    'message_length': row['message_length'],
-                    'is_question': row['is_question'],
-                    'has_problem_keywords': row['has_problem_keywords'],
-                    'has_urgency': row['has_urgency']
-                })
-                
-                if len(messages) >= limit:
-                    break
-            
-            return messages
+                predicates.append(lambda row: row.get('channel') == channel)
+            if user:
+                predicates.append(lambda row: row.get('user') == user)
+            for flag, wanted in (('is_question', is_question),
+                                 ('has_problem_keywords', has_problem_keywords),
+                                 ('has_urgency', has_urgency)):
+                if wanted is not None:
+                    predicates.append(lambda row, flag=flag, wanted=wanted: bool(row.get(flag)) == wanted)
+            if search_text:
+                predicates.append(lambda row: search_text in (row.get('searchable_text') or ''))
+            
+            cache_key = (hours, channel, user, is_question, has_problem_keywords,
+                         has_urgency, search_text, limit)
+            results = self._execute('rag_index', cache_key, predicates, 'timestamp_parsed', cutoff, limit)
+            
+            return [self._message_dict(row, fields) for _, row in results]
             
         except Exception as e:
-            logger.error(f"Error getting recent messages: {e}")
+            logger.error(f"Error querying messages: {e}")
             return []
     
-    def search_messages(self, query_text: str, limit: int = 10, channel: Optional[str] = None) -> List[Dict]:
-        """Search messages using Pathway text matching."""
+    def _update_timelines(self, key, row, time, is_addition):
+        for name, flag in TIMELINE_FLAGS.items():
+            if flag is not None and not row.get(flag):
+                continue
+            if is_addition:
+                self.timelines[name].add(row['message_id'], row['timestamp_parsed'], row)
+            else:
+                self.timelines[name].remove(row['message_id'])
+    
+    def page_messages(self, timeline: str = 'all', limit: int = 50, before: Optional[tuple] = None,
+                      after: Optional[tuple] = None, hours: Optional[float] = None,
+                      fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Get one page of messages (newest first) using (ts, message_id) cursors.
+        
+        Pass the returned `next_cursor` as `before` for older messages and
+        `prev_cursor` as `after` for newer ones.
+        """
+        if timeline not in self.timelines:
+            raise ValueError(f"Unknown timeline '{timeline}'")
+        fields = tuple(fields) if fields else MESSAGE_FIELDS
+        
+        since = (datetime.now() - timedelta(hours=hours)).timestamp() if hours is not None else None
+        rows, has_older, has_newer = self.timelines[timeline].page(limit, before=before, after=after, since=since)
+        
+        return {
+            'messages': [self._message_dict(row, fields) for row in rows],
+            'next_cursor': encode_cursor(rows[-1]['timestamp_parsed'], rows[-1]['message_id']) if rows and has_older else None,
+            'prev_cursor': encode_cursor(rows[0]['timestamp_parsed'], rows[0]['message_id']) if rows and has_newer else None
+        }
+    
+    def get_recent_messages(self, hours: int = 24, limit: int = 100, channel: Optional[str] = None) -> List[Dict]:
+        """Get recent messages using Pathway queries."""
+        return self.query_messages(hours=hours, channel=channel, limit=limit)
+    
+    def search_messages(self, query_text: str, limit: int = 10, channel: Optional[str] = None,
+                        hours: Optional[float] = None) -> List[Dict]:
+        """Search messages by BM25 relevance, best match first.
+        
+        Falls back to substring matching when no indexed term matches the query.
+        """
         try:
-            # Convert query to lowercase for matching
-            search_text = query_text.lower()
-            
-            # Build search query
-            query = self.tables['rag_index'].filter(
-                self.tables['rag_index'].searchable_text.str.contains(search_text)
-            )
-            
-            # Filter by channel if specified
-            if channel:
-                query = query.filter(self.tables['rag_index'].channel == channel)
-            
-            # Order by timestamp (most recent first)
-            query = query.sort(key=query.timestamp_parsed, reverse=True)
-            
-            # Execute query
-            messages = []
-            for row in pw.debug.compute_and_print(query):
-                messages.append({
-                    'message_id': row['message_id'],
-                    'user': row['user'],
-                    'text': row['text'],
-                    'channel': row['channel'],
-                    'timestamp': row['timestamp'],
-                    'ts': str(row['timestamp_parsed']),
-                    'message_length': row['message_length'],
-                    'is_question': row['is_question'],
-                    'has_problem_keywords': row['has_problem_keywords'],
-                    'has_urgency': row['has_urgency']
-                })
-                
-                if len(messages) >= limit:
-                    break
-            
-            return messages
-            
+            since = (datetime.now() - timedelta(hours=hours)).timestamp() if hours is not None else None
+            hits = self.search_index.search(query_text, limit=limit, channel=channel, since=since)
+            if hits:
+                results = []
+                for score, row in hits:
+                    message = self._message_dict(row, MESSAGE_FIELDS)
+                    message['score'] = round(score, 4)
+                    results.append(message)
+                return results
         except Exception as e:
-            logger.error(f"Error searching messages: {e}")
-            return []
+            logger.error(f"Error searching index: {e}")
+        
+        return self.query_messages(hours=hours, channel=channel, text=query_text, limit=limit)
     
     def get_problem_messages(self, hours: int = 24, limit: int = 20) -> List[Dict]:
         """Get messages that contain problem keywords."""
-        try:
-            cutoff_time = datetime.now() - timedelta(hours=hours)
-            cutoff_timestamp = cutoff_time.timestamp()
-            
-            query = self.tables['rag_index'].filter(
-                (self.tables['rag_index'].has_problem_keywords == True) &
-                (self.tables['rag_index'].timestamp_parsed >= cutoff_timestamp)
-            ).sort(key=self.tables['rag_index'].timestamp_parsed, reverse=True)
-            
-            messages = []
-            for row in pw.debug.compute_and_print(query):
-                messages.append({
-                    'message_id': row['message_id'],
-                    'user': row['user'],
-                    'text': row['text'],
-                    'channel': row['channel'],
-                    'timestamp': row['timestamp'],
-                    'ts': str(row['timestamp_parsed']),
-                    'message_length': row['message_length'],
-                    'is_question': row['is_question'],
-                    'has_problem_keywords': row['has_problem_keywords'],
-                    'has_urgency': row['has_urgency']
-                })
-                
-                if len(messages) >= limit:
-                    break
-            
-            return messages
-            
-        except Exception as e:
-            logger.error(f"Error getting problem messages: {e}")
-            return []
+        return self.query_messages(hours=hours, has_problem_keywords=True, limit=limit)
     
     def get_question_messages(self, hours: int = 24, limit: int = 20) -> List[Dict]:
         """Get messages that are questions."""
+        return self.query_messages(hours=hours, is_question=True, limit=limit)
+    
+    def get_urgent_messages(self, hours: int = 24, limit: int = 10) -> List[Dict]:
+        """Get messages marked as urgent."""
+        return self.query_messages(hours=hours, has_urgency=True, limit=limit)
+    
+    def get_threads(self, hours: int = 24, limit: int = 20, channel: Optional[str] = None,
+                    thread_ids: Optional[List[str]] = None) -> List[Dict]:
+        """Get conversation threads, most recently active first."""
         try:
-            cutoff_time = datetime.now() - timedelta(hours=hours)
-            cutoff_timestamp = cutoff_time.timestamp()
+            cutoff = (datetime.now() - timedelta(hours=hours)).timestamp()
+            wanted = frozenset(thread_ids) if thread_ids else None
             
-            query = self.tables['rag_index'].filter(
-                (self.tables['rag_index'].is_question == True) &
-                (self.tables['rag_index'].timestamp_parsed >= cutoff_timestamp)
-            ).sort(key=self.tables['rag_index'].timestamp_parsed, reverse=True)
+            predicates = []
+            if channel:
+                predicates.append(lambda row: row.get('channel') == channel)
+            if wanted:
+                predicates.append(lambda row: row.get('thread_id') in wanted)
             
-            messages = []
-            for row in pw.debug.compute_and_print(query):
-                messages.append({
-                    'message_id': row['message_id'],
-                    'user': row['user'],
-                    'text': row['text'],
-                    'channel': row['channel'],
-                    'timestamp': row['timestamp'],
-                    'ts': str(row['timestamp_parsed']),
-                    'message_length': row['message_length'],
-                    'is_question': row['is_question'],
-                    'has_problem_keywords': row['has_problem_keywords'],
-                    'has_urgency': row['has_urgency']
-                })
-                
-                if len(messages) >= limit:
-                    break
+            cache_key = (hours, channel, wanted, limit)
+            results = self._execute('threads', cache_key, predicates, 'last_activity', cutoff, limit)
             
-            return messages
+            return [{field: row.get(field) for field in THREAD_FIELDS} for _, row in results]
             
         except Exception as e:
-            logger.error(f"Error getting question messages: {e}")
+            logger.error(f"Error getting threads: {e}")
             return []
     
-    def get_urgent_messages(self, hours: int = 24, limit: int = 10) -> List[Dict]:
-        """Get messages marked as urgent."""
-        try:
-            cutoff_time = datetime.now() - timedelta(hours=hours)
-            cutoff_timestamp = cutoff_time.timestamp()
-            
-            query = self.tables['rag_index'].filter(
-                (self.tables['rag_index'].has_urgency == True) &
-                (self.tables['rag_index'].timestamp_parsed >= cutoff_timestamp)
-            ).sort(key=self.tables['rag_index'].timestamp_parsed, reverse=True)
-            
-            messages = []
-            for row in pw.debug.compute_and_print(query):
-                messages.append({
-                    'message_id': row['message_id'],
-                    'user': row['user'],
-                    'text': row['text'],
-                    'channel': row['channel'],
-                    'timestamp': row['timestamp'],
-                    'ts': str(row['timestamp_parsed']),
-                    'message_length': row['message_length'],
-                    'is_question': row['is_question'],
-                    'has_problem_keywords': row['has_problem_keywords'],
-                    'has_urgency': row['has_urgency']
+    def expand_to_threads(self, messages: List[Dict], limit: int = 10) -> List[Dict]:
+        """Replace matched messages with the whole threads they belong to.
+        
+        Threads are returned as context rows (user/text/ts) so they can be passed
+        straight to generate_response. Messages whose thread is unavailable are kept as-is.
+        """
+        thread_ids = []
+        for msg in messages:
+            thread_id = msg.get('thread_id') or msg.get('ts')
+            if thread_id and thread_id not in thread_ids:
+                thread_ids.append(thread_id)
+        
+        if not thread_ids:
+            return messages[:limit]
+        
+        threads = {t['thread_id']: t for t in self.get_threads(hours=24 * 365, limit=len(thread_ids), thread_ids=thread_ids)}
+        
+        context = []
+        seen_threads = set()
+        for msg in messages:
+            thread_id = msg.get('thread_id') or msg.get('ts')
+            if thread_id in seen_threads:
+                continue
+            seen_threads.add(thread_id)
+            
+            thread = threads.get(thread_id)
+            if thread and thread['reply_count'] > 0:
+                context.append({
+                    'message_id': thread['root_message_id'],
+                    'thread_id': thread_id,
+                    'user': thread['root_user'],
+                    'text': thread['thread_text'],
+                    'channel': thread['channel'],
+                    'ts': str(thread['last_activity']),
+                    'reply_count': thread['reply_count']
                 })
-                
-                if len(messages) >= limit:
-                    break
-            
-            return messages
+            else:
+                context.append(msg)
             
-        except Exception as e:
-            logger.error(f"Error getting urgent messages: {e}")
+            if len(context) >= limit:
+                break
+        
+        return context
+    
+    def _rag_context(self, query: str, context_hours: int) -> List[Dict]:
+        """Retrieve, rank and thread-expand the context messages for a query."""
+        # Candidate retrieval: matching messages, or recent messages if nothing matches
+        candidates = self.search_messages(query, limit=RAG_CANDIDATES)
+        if not candidates:
+            candidates = self.get_recent_messages(hours=context_hours, limit=RAG_CANDIDATES)
+        
+        if not candidates:
             return []
+        
+        # Ranking: blend keyword relevance and embedding similarity with recency decay and urgency/problem boosts
+        candidates = self.rag_service.with_semantic_scores(query, candidates)
+        relevant_messages = self.ranker.rank(candidates, limit=RAG_CONTEXT_SIZE)
+        
+        # Pull in whole conversations so replies travel with their root message
+        return self.expand_to_threads(relevant_messages)
     
     def query_rag(self, query: str, context_hours: int = 2) -> str:
         """Query the RAG system using Pathway database."""
         try:
-            # First try to find relevant messages using search
-            relevant_messages = self.search_messages(query, limit=10)
-            
-            # If no search results, get recent messages
+            relevant_messages = self._rag_context(query, context_hours)
             if not relevant_messages:
-                relevant_messages = self.get_recent_messages(hours=context_hours, limit=20)
-            
-            if not relevant_messages:
-                return "No recent messages available to analyze. Please check if the chat integration is working."
+                return NO_MESSAGES_REPLY
             
             # Generate response using AI service
             response = self.rag_service.generate_response(query, relevant_messages)
@@ -228,47 +395,24 @@ class PathwayRAGService:
             logger.error(f"Error in RAG query: {e}")
             return f"I'm having trouble processing that request. Error: {str(e)}"
     
-    def get_predefined_insights(self) -> Dict[str, str]:
-        """Get predefined insights using Pathway queries."""
+    def query_rag_stream(self, query: str, context_hours: int = 2) -> Iterator[str]:
+        """Query the RAG system, yielding the answer in chunks as it is generated."""
         try:
-            # Get problem messages
-            problem_messages = self.get_problem_messages(hours=6, limit=10)
-            problems_insight = ""
-            if problem_messages:
-                problems_insight = self.rag_service.generate_response(
-                    "What are the top 3 problems teams are facing right now?", 
-                    problem_messages[:5]
-                )
-            else:
-                problems_insight = "No problems detected in recent messages."
-            
-            # Get question messages
-            question_messages = self.get_question_messages(hours=6, limit=10)
-            questions_insight = ""
-            if question_messages:
-                questions_insight = self.rag_service.generate_response(
-                    "Summarize the most frequently asked questions.", 
-                    question_messages[:5]
-                )
-            else:
-                questions_insight = "No questions detected in recent messages."
+            relevant_messages = self._rag_context(query, context_hours)
+            if not relevant_messages:
+                yield NO_MESSAGES_REPLY
+                return
             
-            # Get trending topics from recent messages
-            recent_messages = self.get_recent_messages(hours=2, limit=20)
-            trending_insight = ""
-            if recent_messages:
-                trending_insight = self.rag_service.generate_response(
-                    "What topics are trending in the chat right now?", 
-                    recent_messages
-                )
-            else:
-                trending_insight = "No recent activity to analyze."
+            yield from self.rag_service.generate_response_stream(query, relevant_messages)
             
-            return {
-                'problems': problems_insight,
-                'questions': questions_insight,
-                'trending': trending_insight
-            }
+        except Exception as e:
+            logger.error(f"Error in RAG query: {e}")
+            yield f"I'm having trouble processing that request. Error: {str(e)}"
+    
+    def get_predefined_insights(self) -> Dict[str, Any]:
+        """Get predefined insights from the background-refreshed cache."""
+        try:
+            return self.insights.get()
             
         except Exception as e:
             logger.error(f"Error getting insights: {e}")
@@ -279,46 +423,9 @@ class PathwayRAGService:
             }
     
     def get_message_stats(self) -> Dict[str, Any]:
-        """Get message statistics using Pathway analytics."""
+        """Get message statistics from the running aggregates (constant-time read)."""
         try:
-            # Get recent messages for stats
-            recent_messages = self.get_recent_messages(hours=24, limit=1000)
-            
-            if not recent_messages:
-                return {
-                    'total_messages': 0,
-                    'unique_users': 0,
-                    'avg_message_length': 0,
-                    'questions_count': 0,
-                    'problems_count': 0,
-                    'urgent_count': 0,
-                    'channels_count': 0
-                }
-            
-            # Calculate stats
-            total_messages = len(recent_messages)
-            unique_users = len(set(msg.get('user', '') for msg in recent_messages))
-            unique_channels = len(set(msg.get('channel', '') for msg in recent_messages))
-            
-            # Message length analysis
-            message_lengths = [msg.get('message_length', 0) for msg in recent_messages]
-            avg_message_length = sum(message_lengths) / len(message_lengths) if message_lengths else 0
-            
-            # Question and problem analysis
-            questions_count = sum(1 for msg in recent_messages if msg.get('is_question', False))
-            problems_count = sum(1 for msg in recent_messages if msg.get('has_problem_keywords', False))
-            urgent_count = sum(1 for msg in recent_messages if msg.get('has_urgency', False))
-            
-            return {
-                'total_messages': total_messages,
-                'unique_users': unique_users,
-                'unique_channels': unique_channels,
-                'avg_message_length': round(avg_message_length, 1),
-                'questions_count': questions_count,
-                'problems_count': problems_count,
-                'urgent_count': urgent_count,
-                'last_updated': datetime.now().isoformat()
-            }
+            return self.stats.snapshot()
             
         except Exception as e:
             logger.error(f"Error calculating stats: {e}")
@@ -333,38 +440,45 @@ class PathwayRAGService:
                 'error': str(e)
             }
     
-    def get_channel_stats(self) -> List[Dict[str, Any]]:
-        """Get statistics per channel."""
+    def get_channel_stats(self, sort_by: str = 'message_count', descending: bool = True,
+                          offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Get per-channel statistics from the maintained channels aggregate.
+        
+        Cost depends on the number of channels, not on the number of messages.
+        """
         try:
-            # This would use the channels table and hourly_stats
-            # For now, return basic channel info
-            recent_messages = self.get_recent_messages(hours=24, limit=1000)
-            
-            channel_stats = {}
-            for msg in recent_messages:
-                channel = msg.get('channel', 'unknown')
-                if channel not in channel_stats:
-                    channel_stats[channel] = {
-                        'channel': channel,
-                        'message_count': 0,
-                        'questions_count': 0,
-                        'problems_count': 0,
-                        'urgent_count': 0
-                    }
-                
-                channel_stats[channel]['message_count'] += 1
-                if msg.get('is_question', False):
-                    channel_stats[channel]['questions_count'] += 1
-                if msg.get('has_problem_keywords', False):
-                    channel_stats[channel]['problems_count'] += 1
-                if msg.get('has_urgency', False):
-                    channel_stats[channel]['urgent_count'] += 1
+            if sort_by not in CHANNEL_FIELDS:
+                raise ValueError(f"Cannot sort channels by '{sort_by}'")
+            
+            rows, version = self.live['channels'].snapshot()
+            channels = [
+                {
+                    'channel': row.get('channel_id', ''),
+                    'message_count': row.get('message_count', 0),
+                    'questions_count': row.get('questions_count', 0),
+                    'problems_count': row.get('problems_count', 0),
+                    'urgent_count': row.get('urgent_count', 0),
+                    'unique_users': row.get('unique_users', 0),
+                    'last_activity': row.get('last_activity', 0.0)
+                }
+                for row in rows
+            ]
+            # Tie-break on channel name so pages are stable
+            channels.sort(key=lambda c: (c[sort_by], c['channel']), reverse=descending)
             
-            return list(channel_stats.values())
+            offset = max(offset, 0)
+            page = channels[offset:offset + max(limit, 0)] if limit is not None else channels[offset:]
+            return {
+                'channels': page,
+                'total': len(channels),
+                'offset': offset,
+                'limit': limit,
+                'data_version': version
+            }
             
         except Exception as e:
             logger.error(f"Error getting channel stats: {e}")
-            return []
+            return {'channels': [], 'total': 0, 'offset': offset, 'limit': limit, 'error': str(e)}
 
 # Global instance - will be initialized with tables from pathway_pipeline
 pathway_rag_service = None
@@ -0,0 +1,209 @@
+import time
+import threading
+import logging
+from collections import deque
+from functools import wraps
+from typing import Dict, Any, Optional, Callable
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Window used for throughput rates and lag percentiles
+RATE_WINDOW_SECONDS = 60
+LAG_SAMPLE_SIZE = 1000
+
+class PipelineMetrics:
+    """Live counters for the Pathway pipeline: per-stage rows, index lag, connector backlog and UDF time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        # stage name -> upstream stage name (None for the connector output)
+        self.stage_inputs: Dict[str, Optional[str]] = {}
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.udfs: Dict[str, Dict[str, float]] = {}
+        self.connector_emitted = 0
+        self.connector_last_emit = 0.0
+        self.lag_samples = deque(maxlen=LAG_SAMPLE_SIZE)
+        self.lag_count = 0
+        self.lag_last = 0.0
+
+    def _stage(self, name: str) -> Dict[str, Any]:
+        if name not in self.stages:
+            self.stages[name] = {
+                'inserted': 0,
+                'deleted': 0,
+                'recent_inserts': deque()
+            }
+        return self.stages[name]
+
+    def observe_table(self, name: str, table, upstream: Optional[str] = None,
+                      on_insert: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+        """Subscribe to a Pathway table and count the rows flowing through it."""
+        import pathway as pw
+
+        with self._lock:
+            self.stage_inputs[name] = upstream
+            self._stage(name)
+
+        def on_change(key, row, time, is_addition):
+            self.record_rows(name, 1 if is_addition else 0, 0 if is_addition else 1)
+            if is_addition and on_insert:
+                on_insert(row)
+
+        pw.io.subscribe(table, on_change=on_change)
+
+    def record_rows(self, stage: str, inserted: int = 0, deleted: int = 0) -> None:
+        """Record rows added to or retracted from a stage."""
+        now = time.time()
+        with self._lock:
+            stats = self._stage(stage)
+            stats['inserted'] += inserted
+            stats['deleted'] += deleted
+            recent = stats['recent_inserts']
+            for _ in range(inserted):
+                recent.append(now)
+            while recent and recent[0] < now - RATE_WINDOW_SECONDS:
+                recent.popleft()
+
+    def record_visibility(self, ts: Any) -> None:
+        """Record the lag between a message's ts and the moment it became queryable."""
+        try:
+            lag = time.time() - float(ts)
+        except (TypeError, ValueError):
+            return
+        with self._lock:
+            self.lag_samples.append(lag)
+            self.lag_count += 1
+            self.lag_last = lag
+
+    def record_connector_emit(self) -> None:
+        """Count a message handed from the stream file to Pathway."""
+        with self._lock:
+            self.connector_emitted += 1
+            self.connector_last_emit = time.time()
+
+    def record_udf(self, name: str, seconds: float) -> None:
+        """Add one Python UDF call to its timing totals."""
+        with self._lock:
+            udf = self.udfs.setdefault(name, {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            udf['calls'] += 1
+            udf['total_seconds'] += seconds
+            udf['max_seconds'] = max(udf['max_seconds'], seconds)
+
+    def timed_udf(self, name: str) -> Callable:
+        """Decorator that times a function used inside pw.apply."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record_udf(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def _connector_backlog(self) -> Dict[str, Any]:
+        from stream import get_stream_stats
+
+        stream_stats = get_stream_stats()
+        total = stream_stats.get('total_messages', 0)
+        return {
+            'stream_messages': total,
+            'emitted': self.connector_emitted,
+            'backlog': max(total - self.connector_emitted, 0),
+            'seconds_since_last_emit': round(time.time() - self.connector_last_emit, 3) if self.connector_last_emit else None
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all metrics as a JSON-serialisable dict."""
+        now = time.time()
+        with self._lock:
+            stages = {}
+            for name, stats in self.stages.items():
+                recent = stats['recent_inserts']
+                while recent and recent[0] < now - RATE_WINDOW_SECONDS:
+                    recent.popleft()
+                upstream = self.stage_inputs.get(name)
+                rows_in = self.stages[upstream]['inserted'] if upstream in self.stages else stats['inserted']
+                stages[name] = {
+                    'upstream': upstream,
+                    'rows_in': rows_in,
+                    'rows_out': stats['inserted'],
+                    'rows_retracted': stats['deleted'],
+                    'current_rows': stats['inserted'] - stats['deleted'],
+                    'throughput_per_sec': round(len(recent) / RATE_WINDOW_SECONDS, 3)
+                }
+
+            lags = sorted(self.lag_samples)
+            lag = {
+                'samples': self.lag_count,
+                'last_seconds': round(self.lag_last, 3),
+                'p50_seconds': round(lags[len(lags) // 2], 3) if lags else 0.0,
+                'p95_seconds': round(lags[min(int(len(lags) * 0.95), len(lags) - 1)], 3) if lags else 0.0,
+                'max_seconds': round(lags[-1], 3) if lags else 0.0
+            }
+
+            udfs = {
+                name: {
+                    'calls': int(udf['calls']),
+                    'total_seconds': round(udf['total_seconds'], 6),
+                    'avg_seconds': round(udf['total_seconds'] / udf['calls'], 9) if udf['calls'] else 0.0,
+                    'max_seconds': round(udf['max_seconds'], 6)
+                }
+                for name, udf in self.udfs.items()
+            }
+
+        return {
+            'uptime_seconds': round(now - self.started_at, 1),
+            'stages': stages,
+            'rag_index_lag': lag,
+            'connector': self._connector_backlog(),
+            'udfs': udfs
+        }
+
+    def to_prometheus(self) -> str:
+        """Render the current snapshot in Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, help_text, metric_type, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        stages = snapshot['stages']
+        metric("pathway_stage_rows_in_total", "Rows received by a pipeline stage.", "counter",
+               [({'stage': name}, s['rows_in']) for name, s in stages.items()])
+        metric("pathway_stage_rows_out_total", "Rows emitted by a pipeline stage.", "counter",
+               [({'stage': name}, s['rows_out']) for name, s in stages.items()])
+        metric("pathway_stage_rows", "Rows currently held by a pipeline stage.", "gauge",
+               [({'stage': name}, s['current_rows']) for name, s in stages.items()])
+        metric("pathway_stage_throughput_rows_per_second", "Rows emitted per second over the last minute.", "gauge",
+               [({'stage': name}, s['throughput_per_sec']) for name, s in stages.items()])
+
+        lag = snapshot['rag_index_lag']
+        metric("pathway_rag_index_lag_seconds", "Seconds between a message ts and its visibility in rag_index.", "gauge",
+               [({'quantile': '0.5'}, lag['p50_seconds']), ({'quantile': '0.95'}, lag['p95_seconds']),
+                ({'quantile': '1'}, lag['max_seconds'])])
+
+        connector = snapshot['connector']
+        metric("pathway_connector_emitted_total", "Messages handed from the stream file to Pathway.", "counter",
+               [({}, connector['emitted'])])
+        metric("pathway_connector_backlog", "Messages in the stream file not yet read by the connector.", "gauge",
+               [({}, connector['backlog'])])
+
+        udfs = snapshot['udfs']
+        metric("pathway_udf_calls_total", "Python UDF invocations.", "counter",
+               [({'udf': name}, u['calls']) for name, u in udfs.items()])
+        metric("pathway_udf_seconds_total", "Time spent inside Python UDFs.", "counter",
+               [({'udf': name}, u['total_seconds']) for name, u in udfs.items()])
+
+        return "\n".join(lines) + "\n"
+
+# Global instance
+pipeline_metrics = PipelineMetrics()
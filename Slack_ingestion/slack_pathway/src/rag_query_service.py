@@ -1,16 +1,25 @@
 import json
 import os
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator
 from datetime import datetime, timedelta
 import logging
+import threading
 from ai_service import rag_service
-from pathway_rag_service import pathway_rag_service, initialize_pathway_rag_service
+from utils import message_ts, select_top_k
+from bm25_index import BM25Index
+from ranking import hybrid_ranker
+from time_index import TimeIndex, encode_cursor
+from message_stats import MessageStats
+from pathway_rag_service import pathway_rag_service, initialize_pathway_rag_service, NO_MESSAGES_REPLY
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PROBLEM_KEYWORDS = ['problem', 'issue', 'error', 'bug', 'stuck', 'help', 'broken', 'not working']
+URGENCY_KEYWORDS = ['urgent', 'asap', 'emergency', 'critical']
+
 class RAGQueryService:
     def __init__(self):
         """Initialize the RAG query service."""
@@ -18,6 +27,13 @@ class RAGQueryService:
         self.rag_service = rag_service
         self.pathway_service = pathway_rag_service
         
+        # Running stats, search index and timeline for the file-based fallback (file offset already counted)
+        self.stats = MessageStats(window_hours=24)
+        self.search_index = BM25Index()
+        self.timeline = TimeIndex()
+        self._stats_offset = 0
+        self._stats_lock = threading.Lock()
+        
     def get_recent_messages(self, hours: int = 24, limit: int = 100) -> List[Dict]:
         """Get recent messages from the stream."""
         # Use Pathway service if available
@@ -29,40 +45,50 @@ class RAGQueryService:
                 # Fall back to file-based approach
         
         # Fallback to file-based approach
-        messages = []
-        
         if not self.messages_file.exists():
-            return messages
+            return []
             
         try:
-            with self.messages_file.open() as f:
-                for line in f:
-                    if line.strip():
-                        msg = json.loads(line.strip())
-                        messages.append(msg)
-            
-            # Sort by timestamp (most recent first)
-            messages.sort(key=lambda x: float(x.get('ts', '0')), reverse=True)
-            
             # Filter by time if needed
-            if hours < 24:
-                cutoff_time = datetime.now() - timedelta(hours=hours)
-                filtered_messages = []
-                for msg in messages:
-                    try:
-                        msg_time = datetime.fromtimestamp(float(msg.get('ts', '0')))
-                        if msg_time >= cutoff_time:
-                            filtered_messages.append(msg)
-                    except:
-                        continue
-                messages = filtered_messages
+            cutoff_timestamp = (datetime.now() - timedelta(hours=hours)).timestamp() if hours < 24 else None
+            
+            def read_messages():
+                with self.messages_file.open() as f:
+                    for line in f:
+                        if line.strip():
+                            msg = json.loads(line.strip())
+                            if cutoff_timestamp is None or message_ts(msg) >= cutoff_timestamp:
+                                yield msg
             
-            return messages[:limit]
+            # Most recent first, keeping only `limit` messages in a bounded heap
+            return select_top_k(read_messages(), limit, key=message_ts)
             
         except Exception as e:
             logger.error(f"Error reading messages: {e}")
             return []
     
+    def page_messages(self, limit: int = 50, before: Optional[tuple] = None, after: Optional[tuple] = None,
+                      hours: Optional[float] = None) -> Dict[str, Any]:
+        """Get one page of messages (newest first) using (ts, message_id) cursors."""
+        # Use Pathway service if available
+        if self.pathway_service:
+            try:
+                return self.pathway_service.page_messages('all', limit=limit, before=before, after=after, hours=hours)
+            except Exception as e:
+                logger.error(f"Error using Pathway service: {e}")
+                # Fall back to file-based approach
+        
+        # Fallback: page the timeline fed from the file tail
+        self._ingest_new_messages()
+        since = (datetime.now() - timedelta(hours=hours)).timestamp() if hours is not None else None
+        rows, has_older, has_newer = self.timeline.page(limit, before=before, after=after, since=since)
+        
+        return {
+            'messages': rows,
+            'next_cursor': encode_cursor(message_ts(rows[-1]), self._message_id(rows[-1])) if rows and has_older else None,
+            'prev_cursor': encode_cursor(message_ts(rows[0]), self._message_id(rows[0])) if rows and has_newer else None
+        }
+    
     def query_rag(self, query: str, context_hours: int = 2) -> str:
         """Query the RAG system with recent context."""
         # Use Pathway service if available
@@ -75,14 +101,9 @@ class RAGQueryService:
         
         # Fallback to original approach
         try:
-            # Get recent messages for context
-            recent_messages = self.get_recent_messages(hours=context_hours, limit=50)
-            
-            if not recent_messages:
-                return "No recent messages available to analyze. Please check if the chat integration is working."
-            
-            # Find relevant messages
-            relevant_messages = self.rag_service.find_relevant_messages(query, recent_messages, top_k=10)
+            relevant_messages = self._fallback_context(query, context_hours)
+            if not relevant_messages:
+                return NO_MESSAGES_REPLY
             
             # Generate response
             response = self.rag_service.generate_response(query, relevant_messages)
@@ -93,7 +114,41 @@ class RAGQueryService:
             logger.error(f"Error in RAG query: {e}")
             return f"I'm having trouble processing that request. Error: {str(e)}"
     
-    def get_predefined_insights(self) -> Dict[str, str]:
+    def query_rag_stream(self, query: str, context_hours: int = 2) -> Iterator[str]:
+        """Query the RAG system, yielding the answer in chunks as it is generated."""
+        # Use Pathway service if available
+        if self.pathway_service:
+            yield from self.pathway_service.query_rag_stream(query, context_hours)
+            return
+        
+        try:
+            relevant_messages = self._fallback_context(query, context_hours)
+            if not relevant_messages:
+                yield NO_MESSAGES_REPLY
+                return
+            
+            yield from self.rag_service.generate_response_stream(query, relevant_messages)
+            
+        except Exception as e:
+            logger.error(f"Error in RAG query: {e}")
+            yield f"I'm having trouble processing that request. Error: {str(e)}"
+    
+    def _fallback_context(self, query: str, context_hours: int) -> List[Dict]:
+        """Retrieve and rank context messages from the messages file."""
+        # Find relevant messages from the recent context window
+        self._ingest_new_messages()
+        cutoff = (datetime.now() - timedelta(hours=context_hours)).timestamp()
+        candidates = [dict(msg, score=score) for score, msg in self.search_index.search(query, limit=100, since=cutoff)]
+        
+        # If nothing matches, use the most recent messages
+        if not candidates:
+            candidates = self.get_recent_messages(hours=context_hours, limit=100)
+        
+        # Prefer similar, fresh and urgent matches
+        candidates = self.rag_service.with_semantic_scores(query, candidates)
+        return hybrid_ranker.rank(candidates, limit=10)
+    
+    def get_predefined_insights(self) -> Dict[str, Any]:
         """Get predefined insights for demo purposes."""
         # Use Pathway service if available
         if self.pathway_service:
@@ -125,41 +180,10 @@ class RAGQueryService:
                 logger.error(f"Error using Pathway service: {e}")
                 # Fall back to original approach
         
-        # Fallback to original approach
+        # Fallback: running aggregates fed by the new lines of the messages file
         try:
-            messages = self.get_recent_messages(hours=24, limit=1000)
-            
-            if not messages:
-                return {
-                    'total_messages': 0,
-                    'unique_users': 0,
-                    'avg_message_length': 0,
-                    'questions_count': 0,
-                    'problems_count': 0
-                }
-            
-            # Calculate stats
-            total_messages = len(messages)
-            unique_users = len(set(msg.get('user', '') for msg in messages))
-            
-            # Message length analysis
-            message_lengths = [len(msg.get('text', '')) for msg in messages]
-            avg_message_length = sum(message_lengths) / len(message_lengths) if message_lengths else 0
-            
-            # Question and problem analysis
-            questions_count = sum(1 for msg in messages if msg.get('text', '').strip().endswith('?'))
-            problem_keywords = ['problem', 'issue', 'error', 'bug', 'stuck', 'help', 'broken', 'not working']
-            problems_count = sum(1 for msg in messages 
-                               if any(keyword in msg.get('text', '').lower() for keyword in problem_keywords))
-            
-            return {
-                'total_messages': total_messages,
-                'unique_users': unique_users,
-                'avg_message_length': round(avg_message_length, 1),
-                'questions_count': questions_count,
-                'problems_count': problems_count,
-                'last_updated': datetime.now().isoformat()
-            }
+            self._ingest_new_messages()
+            return self.stats.snapshot()
             
         except Exception as e:
             logger.error(f"Error calculating stats: {e}")
@@ -171,6 +195,57 @@ class RAGQueryService:
                 'problems_count': 0,
                 'error': str(e)
             }
+    
+    def _ingest_new_messages(self) -> None:
+        """Count and index messages appended to the messages file since the last call."""
+        if not self.messages_file.exists():
+            return
+        
+        with self._stats_lock:
+            # The file was truncated or replaced: start over
+            if self.messages_file.stat().st_size < self._stats_offset:
+                self.stats = MessageStats(window_hours=24)
+                self.search_index = BM25Index()
+                self.timeline = TimeIndex()
+                self._stats_offset = 0
+            
+            with self.messages_file.open("rb") as f:
+                f.seek(self._stats_offset)
+                for raw_line in f:
+                    if not raw_line.endswith(b"\n"):
+                        break  # partially written line, pick it up next time
+                    self._stats_offset += len(raw_line)
+                    line = raw_line.decode("utf-8").strip()
+                    if not line:
+                        continue
+                    try:
+                        msg = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    text = msg.get('text', '') or ''
+                    text_lower = text.lower()
+                    has_problem = any(keyword in text_lower for keyword in PROBLEM_KEYWORDS)
+                    has_urgency = any(keyword in text_lower for keyword in URGENCY_KEYWORDS)
+                    self.stats.add(
+                        user=msg.get('user', ''),
+                        channel=msg.get('channel', ''),
+                        ts=message_ts(msg),
+                        length=len(text),
+                        is_question=text.strip().endswith('?'),
+                        has_problem=has_problem,
+                        has_urgency=has_urgency
+                    )
+                    message_id = self._message_id(msg)
+                    self.search_index.add(
+                        message_id, text, channel=msg.get('channel'), ts=message_ts(msg),
+                        payload=dict(msg, has_problem_keywords=has_problem, has_urgency=has_urgency)
+                    )
+                    self.timeline.add(message_id, message_ts(msg), msg)
+    
+    @staticmethod
+    def _message_id(msg: Dict) -> str:
+        """The message's id, or channel:ts for messages stored without one."""
+        return msg.get('message_id') or f"{msg.get('channel', '')}:{msg.get('ts', '')}"
 
 # Global instance
 rag_query_service = RAGQueryService()
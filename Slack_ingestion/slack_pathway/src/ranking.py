@@ -0,0 +1,109 @@
+import os
+import time
+import math
+import logging
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Ranking weights (all configurable through the environment)
+RANK_RELEVANCE_WEIGHT = float(os.getenv("RANK_RELEVANCE_WEIGHT", "1.0"))
+RANK_SEMANTIC_WEIGHT = float(os.getenv("RANK_SEMANTIC_WEIGHT", "0.5"))
+RANK_RECENCY_WEIGHT = float(os.getenv("RANK_RECENCY_WEIGHT", "0.5"))
+RANK_RECENCY_HALF_LIFE_MINUTES = float(os.getenv("RANK_RECENCY_HALF_LIFE_MINUTES", "60"))
+RANK_URGENCY_BOOST = float(os.getenv("RANK_URGENCY_BOOST", "0.3"))
+RANK_PROBLEM_BOOST = float(os.getenv("RANK_PROBLEM_BOOST", "0.2"))
+
+class HybridRanker:
+    """Re-ranks retrieved candidates by relevance, freshness and urgency.
+
+    score = relevance_weight * relevance / max(relevance)
+          + semantic_weight * semantic (embedding cosine to the query, 0..1)
+          + recency_weight * 0.5 ** (age / half_life)
+          + urgency_boost * has_urgency + problem_boost * has_problem_keywords
+    """
+
+    def __init__(self, relevance_weight: float = RANK_RELEVANCE_WEIGHT,
+                 recency_weight: float = RANK_RECENCY_WEIGHT,
+                 semantic_weight: float = RANK_SEMANTIC_WEIGHT,
+                 half_life_minutes: float = RANK_RECENCY_HALF_LIFE_MINUTES,
+                 urgency_boost: float = RANK_URGENCY_BOOST,
+                 problem_boost: float = RANK_PROBLEM_BOOST):
+        self.relevance_weight = relevance_weight
+        self.recency_weight = recency_weight
+        self.semantic_weight = semantic_weight
+        self.half_life_seconds = half_life_minutes * 60
+        self.urgency_boost = urgency_boost
+        self.problem_boost = problem_boost
+
+    def scores(self, relevance: np.ndarray, timestamps: np.ndarray, urgent: np.ndarray,
+               problem: np.ndarray, now: Optional[float] = None,
+               semantic: Optional[np.ndarray] = None) -> np.ndarray:
+        """Compute blended scores for arrays of candidate features."""
+        now = time.time() if now is None else now
+        max_relevance = relevance.max() if relevance.size else 0.0
+        relevance_part = relevance / max_relevance if max_relevance > 0 else np.zeros_like(relevance)
+
+        ages = np.maximum(now - timestamps, 0.0)
+        recency_part = np.exp(ages * (-math.log(2) / self.half_life_seconds))
+
+        semantic_part = np.zeros_like(relevance) if semantic is None else np.clip(semantic, 0.0, 1.0)
+
+        return (self.relevance_weight * relevance_part
+                + self.semantic_weight * semantic_part
+                + self.recency_weight * recency_part
+                + self.urgency_boost * urgent
+                + self.problem_boost * problem)
+
+    def rank(self, candidates: List[Dict[str, Any]], limit: int = 10,
+             now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Return the best `limit` candidates, each with its blended `rank_score`.
+
+        Candidates carry an optional relevance `score` (e.g. BM25), an optional
+        `semantic_score` (embedding cosine), a `ts` and the has_urgency /
+        has_problem_keywords flags.
+        """
+        if not candidates or limit <= 0:
+            return []
+
+        count = len(candidates)
+        relevance = np.array([c.get('score') or 0.0 for c in candidates], dtype=np.float64)
+        semantic = np.array([c.get('semantic_score') or 0.0 for c in candidates], dtype=np.float64)
+        timestamps = _timestamps([c.get('ts') for c in candidates])
+        urgent = np.array([bool(c.get('has_urgency')) for c in candidates], dtype=np.float64)
+        problem = np.array([bool(c.get('has_problem_keywords')) for c in candidates], dtype=np.float64)
+
+        scores = self.scores(relevance, timestamps, urgent, problem, now, semantic)
+
+        # Top `limit` without sorting every candidate
+        if limit < count:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+        else:
+            top = np.arange(count)
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        ranked = []
+        for i in top:
+            candidate = dict(candidates[i])
+            candidate['rank_score'] = round(float(scores[i]), 4)
+            ranked.append(candidate)
+        return ranked
+
+def _timestamps(values: List[Any]) -> np.ndarray:
+    """Convert ts values (floats or numeric strings) to an array; bad values become 0."""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([_as_float(value) for value in values], dtype=np.float64)
+
+def _as_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+# Global instance
+hybrid_ranker = HybridRanker()
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import logging
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# SQLite file backing the cache ("" keeps the cache in memory only)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query."""
+    return " ".join((query or "").lower().split())
+
+def context_fingerprint(messages: List[Dict]) -> str:
+    """Hash the ids and texts of the context messages, in order."""
+    digest = hashlib.sha256()
+    for msg in messages:
+        digest.update(str(msg.get('message_id') or msg.get('ts') or '').encode("utf-8"))
+        digest.update(b"\x1f")
+        digest.update((msg.get('text') or '').encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+def response_key(model: str, generation_config: Dict[str, Any], query: str, messages: List[Dict]) -> str:
+    """Cache key for one model call."""
+    payload = json.dumps({
+        'model': model,
+        'config': generation_config,
+        'query': normalize_query(query),
+        'context': context_fingerprint(messages)
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """LLM responses in an in-memory LRU with TTL, backed by SQLite so they survive restarts."""
+
+    def __init__(self, path: Optional[str] = LLM_CACHE_PATH, ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 memory_entries: int = LLM_CACHE_MEMORY_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        # key -> (response, created_at, latency_seconds)
+        self.memory: OrderedDict = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._lock = threading.Lock()
+        self._db = None
+
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                    "created_at REAL NOT NULL, latency_seconds REAL NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ LLM cache database unavailable, using memory only: {e}")
+                self._db = None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                self.saved_seconds += entry[2]
+                return entry[0]
+            if entry is not None:
+                del self.memory[key]
+
+            entry = self._load(key, now)
+            if entry is not None:
+                self._remember(key, entry)
+                self.disk_hits += 1
+                self.saved_seconds += entry[2]
+                return entry[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str, latency_seconds: float = 0.0) -> None:
+        """Store a response along with how long the model took to produce it."""
+        entry = (response, time.time(), latency_seconds)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, response, created_at, latency_seconds) VALUES (?, ?, ?, ?)",
+                        (key, *entry)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Error writing LLM cache: {e}")
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _load(self, key: str, now: float) -> Optional[tuple]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT response, created_at, latency_seconds FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                return None
+            return row
+        except sqlite3.Error as e:
+            logger.error(f"Error reading LLM cache: {e}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the model time saved by cache hits."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                'memory_entries': len(self.memory),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+                'saved_seconds': round(self.saved_seconds, 3),
+                'ttl_seconds': self.ttl_seconds,
+                'persistent': self._db is not None
+            }
@@ -0,0 +1,74 @@
+import threading
+import logging
+from typing import Any, Callable, Dict, Hashable
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """One in-flight call and the result its waiters will share."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Exception = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait and receive the same result (or exception). Once the
+    call finishes the key is released, so later calls run again.
+    """
+
+    def __init__(self):
+        self.flights: Dict[Hashable, _Flight] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Run func for key, or wait for the run already in flight."""
+        with self._lock:
+            self.calls += 1
+            flight = self.flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                flight.waiters += 1
+                leader = False
+            else:
+                flight = self.flights[key] = _Flight()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self.flights[key]
+                if flight.waiters:
+                    logger.info(f"Shared one generation with {flight.waiters} coalesced call(s)")
+            flight.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call, execution and coalescing counters."""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'in_flight': len(self.flights)
+            }
@@ -26,6 +26,62 @@ document.addEventListener("DOMContentLoaded", () => {
     div.innerHTML = `<p><strong>${sender === "user" ? "You" : "AI"}:</strong> ${text}</p>`;
     chatWindow.appendChild(div);
     chatWindow.scrollTop = chatWindow.scrollHeight;
+    return div;
+  }
+
+  function parseEvent(rawEvent) {
+    const event = { type: "message", data: null };
+    rawEvent.split("\n").forEach(line => {
+      if (line.startsWith("event:")) event.type = line.slice(6).trim();
+      else if (line.startsWith("data:")) event.data = JSON.parse(line.slice(5).trim());
+    });
+    return event;
+  }
+
+  // Stream the answer over Server-Sent Events, calling onChunk with the text so far.
+  // Returns null when the stream endpoint is unavailable.
+  async function streamAIResponse(userMessage, onChunk) {
+    const started = performance.now();
+    const response = await fetch("/api/query/stream", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ message: userMessage })
+    });
+    
+    const contentType = response.headers.get("Content-Type") || "";
+    if (!response.ok || !response.body || !contentType.includes("text/event-stream")) {
+      return null;
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let reply = "";
+    let firstByteMs = null;
+    let serverTimings = null;
+    
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      if (firstByteMs === null) firstByteMs = performance.now() - started;
+      
+      buffer += decoder.decode(value, { stream: true });
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const event = parseEvent(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        if (event.type === "chunk") {
+          reply += event.data.text;
+          onChunk(reply);
+        } else if (event.type === "done") {
+          serverTimings = event.data;
+        }
+      }
+    }
+    
+    const totalMs = performance.now() - started;
+    console.info(`Answer streamed: first byte after ${Math.round(firstByteMs)} ms, complete after ${Math.round(totalMs)} ms`, serverTimings);
+    return { reply, firstByteMs, totalMs };
   }
 
   async function getAIResponse(userMessage) {
@@ -64,12 +120,36 @@ document.addEventListener("DOMContentLoaded", () => {
     showLoading();
 
     try {
-      // Get AI response
-      const aiReply = await getAIResponse(text);
+      // Stream the answer, rendering it as it arrives
+      let botDiv = null;
+      let streamed = null;
+      try {
+        streamed = await streamAIResponse(text, (replySoFar) => {
+          if (!botDiv) {
+            hideLoading();
+            botDiv = addMessage(replySoFar, "bot");
+          } else {
+            botDiv.innerHTML = `<p><strong>AI:</strong> ${replySoFar}</p>`;
+            chatWindow.scrollTop = chatWindow.scrollHeight;
+          }
+        });
+      } catch (err) {
+        console.error("Streaming failed, falling back to a single response:", err);
+      }
       
-      // Hide loading and show response
-      hideLoading();
-      addMessage(aiReply, "bot");
+      if (streamed && botDiv) {
+        const timing = document.createElement("small");
+        timing.classList.add("text-muted");
+        timing.textContent = `first words in ${(streamed.firstByteMs / 1000).toFixed(1)}s · complete in ${(streamed.totalMs / 1000).toFixed(1)}s`;
+        botDiv.appendChild(timing);
+      } else if (!botDiv) {
+        // Get AI response
+        const aiReply = await getAIResponse(text);
+        
+        // Hide loading and show response
+        hideLoading();
+        addMessage(aiReply, "bot");
+      }
     } catch (error) {
       hideLoading();
       addMessage("Error: " + error.message, "bot");
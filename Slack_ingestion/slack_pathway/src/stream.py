@@ -1,7 +1,8 @@
 import json
 import logging
+import zlib
 from pathlib import Path
-from typing import Generator, Dict, Any
+from typing import Generator, Dict, Any, Optional
 import time
 
 # Configure logging
@@ -32,8 +33,17 @@ def push_message(msg: Dict[str, Any]) -> None:
     except Exception as e:
         logger.error(f"❌ Error pushing message to stream: {e}")
 
-def read_stream() -> Generator[Dict[str, Any], None, None]:
-    """Yield messages from the stream for Pathway consumption."""
+def channel_shard(channel: str, num_shards: int) -> int:
+    """Map a channel to a stable shard number (same result in every process)."""
+    if num_shards <= 1:
+        return 0
+    return zlib.crc32((channel or "general").encode("utf-8")) % num_shards
+
+def read_stream(shard: Optional[int] = None, num_shards: int = 1) -> Generator[Dict[str, Any], None, None]:
+    """Yield messages from the stream for Pathway consumption.
+    
+    When `shard` is given, only messages whose channel maps to that shard are yielded.
+    """
     try:
         if not STREAM_FILE.exists():
             logger.info("📁 No messages file found, waiting for messages...")
@@ -44,6 +54,8 @@ def read_stream() -> Generator[Dict[str, Any], None, None]:
                 try:
                     if line.strip():
                         msg = json.loads(line.strip())
+                        if shard is not None and channel_shard(msg.get("channel", "general"), num_shards) != shard:
+                            continue
                         yield msg
                 except json.JSONDecodeError as e:
                     logger.warning(f"⚠️ Skipping invalid JSON on line {line_num}: {e}")
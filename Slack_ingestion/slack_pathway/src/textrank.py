@@ -0,0 +1,98 @@
+import os
+import re
+import logging
+import numpy as np
+from typing import List, Dict, Tuple
+from embedding_index import hash_features
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Sentences picked per summary
+TEXTRANK_SENTENCES = int(os.getenv("TEXTRANK_SENTENCES", "3"))
+# Only the most recent sentences are ranked, bounding the n x n similarity matrix
+TEXTRANK_MAX_SENTENCES = int(os.getenv("TEXTRANK_MAX_SENTENCES", "400"))
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+|\n+")
+EMPTY_SUMMARY = "No recent activity to summarize."
+
+def split_sentences(text: str) -> List[str]:
+    """Split a chat message into sentences, dropping fragments of fewer than three words."""
+    return [s.strip() for s in SENTENCE_PATTERN.split(text or "") if len(s.split()) >= 3]
+
+class TextRankSummarizer:
+    """Extractive summaries without a model: TextRank over a sentence-similarity graph.
+
+    Sentences are TF-IDF hashing vectors; edges are cosine similarities above
+    a threshold; PageRank on that graph scores the sentences that are most
+    similar to the rest of the conversation, and the best distinct ones are returned.
+    """
+
+    def __init__(self, sentences: int = TEXTRANK_SENTENCES, max_sentences: int = TEXTRANK_MAX_SENTENCES,
+                 damping: float = 0.85, similarity_threshold: float = 0.05, dim: int = 1024):
+        self.sentences = sentences
+        self.max_sentences = max_sentences
+        self.damping = damping
+        self.similarity_threshold = similarity_threshold
+        self.dim = dim
+
+    def rank(self, messages: List[Dict]) -> List[Tuple[float, str, str]]:
+        """Return (score, sentence, user) for every sentence, best first."""
+        candidates = [(sentence, msg.get('user', 'Unknown'))
+                      for msg in messages for sentence in split_sentences(msg.get('text', ''))]
+        candidates = candidates[-self.max_sentences:]
+        if not candidates:
+            return []
+
+        vectors = self._vectors([sentence for sentence, _ in candidates])
+        scores = self._pagerank(vectors @ vectors.T)
+        order = np.argsort(-scores, kind="stable")
+        return [(float(scores[i]), *candidates[i]) for i in order]
+
+    def summarize(self, messages: List[Dict]) -> str:
+        """Bullet list of the top sentences, skipping near-repeats of one already chosen."""
+        ranked = self.rank(messages)
+        if not ranked:
+            return EMPTY_SUMMARY
+
+        chosen: List[Tuple[str, str]] = []
+        chosen_vectors = []
+        for _, sentence, user in ranked:
+            vector = self._vectors([sentence])[0]
+            if any(float(vector @ other) > 0.8 for other in chosen_vectors):
+                continue
+            chosen.append((sentence, user))
+            chosen_vectors.append(vector)
+            if len(chosen) >= self.sentences:
+                break
+        return "\n".join(f"• {sentence} ({user})" for sentence, user in chosen)
+
+    def _vectors(self, sentences: List[str]) -> np.ndarray:
+        counts = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for i, sentence in enumerate(sentences):
+            for slot, value in hash_features(sentence, self.dim).items():
+                counts[i, slot] = value
+        doc_freq = np.count_nonzero(counts, axis=0)
+        vectors = counts * (np.log((1.0 + len(sentences)) / (1.0 + doc_freq)) + 1.0).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+    def _pagerank(self, similarity: np.ndarray, iterations: int = 100, tolerance: float = 1e-6) -> np.ndarray:
+        n = len(similarity)
+        weights = np.where(similarity >= self.similarity_threshold, similarity, 0.0)
+        np.fill_diagonal(weights, 0.0)
+        out_degree = weights.sum(axis=1, keepdims=True)
+        # Sentences with no edges spread their rank uniformly
+        transition = np.where(out_degree > 0, weights / np.where(out_degree > 0, out_degree, 1.0), 1.0 / n)
+
+        scores = np.full(n, 1.0 / n)
+        for _ in range(iterations):
+            updated = (1 - self.damping) / n + self.damping * (transition.T @ scores)
+            if np.abs(updated - scores).sum() < tolerance:
+                return updated
+            scores = updated
+        return scores
+
+# Global instance
+textrank_summarizer = TextRankSummarizer()
@@ -0,0 +1,84 @@
+import json
+import base64
+import bisect
+import threading
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+Cursor = Tuple[float, str]
+
+def encode_cursor(ts: float, message_id: str) -> str:
+    """Encode a (ts, message_id) position as an opaque, URL-safe cursor."""
+    raw = json.dumps([ts, message_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Decode a cursor produced by encode_cursor; raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, message_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return float(ts), str(message_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+
+class TimeIndex:
+    """Rows kept sorted by (ts, message_id) for keyset pagination.
+
+    A page is located with a binary search on the cursor and then sliced, so
+    its cost depends on the page size rather than on how many rows exist.
+    """
+
+    def __init__(self):
+        self.keys: List[Cursor] = []
+        self.rows: Dict[str, Tuple[Cursor, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, message_id: str, ts: float, row: Dict[str, Any]) -> None:
+        """Insert a row (replacing any previous version with the same message_id)."""
+        key = (float(ts or 0), message_id)
+        with self._lock:
+            self._remove(message_id)
+            bisect.insort(self.keys, key)
+            self.rows[message_id] = (key, row)
+
+    def remove(self, message_id: str) -> None:
+        """Drop a row if present."""
+        with self._lock:
+            self._remove(message_id)
+
+    def _remove(self, message_id: str) -> None:
+        entry = self.rows.pop(message_id, None)
+        if entry is None:
+            return
+        i = bisect.bisect_left(self.keys, entry[0])
+        if i < len(self.keys) and self.keys[i] == entry[0]:
+            del self.keys[i]
+
+    def page(self, limit: int, before: Optional[Cursor] = None, after: Optional[Cursor] = None,
+             since: Optional[float] = None) -> Tuple[List[Dict[str, Any]], bool, bool]:
+        """Return (rows newest first, has_older, has_newer).
+
+        `before` pages towards older rows, `after` towards newer ones; with
+        neither, the newest rows are returned. `since` hides rows older than it.
+        """
+        limit = max(limit, 0)
+        with self._lock:
+            low = bisect.bisect_left(self.keys, (since,)) if since is not None else 0
+            if after is not None:
+                start = max(bisect.bisect_right(self.keys, after), low)
+                end = min(start + limit, len(self.keys))
+            else:
+                end = bisect.bisect_left(self.keys, before) if before is not None else len(self.keys)
+                start = max(end - limit, low)
+                end = max(end, start)
+
+            keys = self.keys[start:end]
+            rows = [self.rows[message_id][1] for _, message_id in reversed(keys)]
+            return rows, start > low, end < len(self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
@@ -1,3 +1,5 @@
+import heapq
+
 def is_valid_message(msg):
     """Filter out bot messages or empty text."""
     if not msg.get("text"):
@@ -5,3 +7,39 @@ def is_valid_message(msg):
     if msg.get("user") is None:  # Ignore messages without user
         return False
     return True
+
+def thread_participants(entries):
+    """Return the distinct users of a thread in order of first message.
+
+    `entries` are (ts, message_id, user, text) tuples sorted by ts.
+    """
+    participants = []
+    for _, _, user, _ in entries:
+        if user not in participants:
+            participants.append(user)
+    return ", ".join(participants)
+
+def build_thread_text(entries, max_chars=2000):
+    """Concatenate a thread's messages into one context block, capped at max_chars."""
+    lines = [f"{user}: {text}" for _, _, user, text in entries]
+    thread_text = "\n".join(lines)
+    if len(thread_text) > max_chars:
+        thread_text = thread_text[:max_chars].rstrip() + "..."
+    return thread_text
+
+def message_ts(msg):
+    """Return a message's ts as a float (0.0 when missing or malformed)."""
+    try:
+        return float(msg.get('ts') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+def select_top_k(items, k, key):
+    """Return the k items with the largest key, largest first, in O(n log k).
+
+    Same result as sorted(items, key=key, reverse=True)[:k] without sorting
+    every candidate; `items` may be a generator.
+    """
+    if k <= 0:
+        return []
+    return heapq.nlargest(k, items, key=key)
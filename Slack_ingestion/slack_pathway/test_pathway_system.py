@@ -13,6 +13,8 @@ import os
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+# Repository root, for the dashboard analyzer (Slack_ingestion.ai_service)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -131,6 +133,78 @@ def test_pathway_rag_service():
         logger.error(f"❌ PathwayRAGService test failed: {e}")
         return False
 
+def test_pathway_query_engine():
+    """Test the unified query API and its data-version cache."""
+    from pathway_rag_service import PathwayRAGService
+    from time_index import decode_cursor
+    
+    service = PathwayRAGService({'rag_index': None, 'threads': None})
+    rag_index = service.live['rag_index']
+    now = time.time()
+    rows = [
+        ("m1", "alice", "Login API returns an error", "general", now - 3600, False, True, False),
+        ("m2", "bob", "When is the deadline?", "general", now - 1800, True, False, False),
+        ("m3", "carol", "Database is down, urgent help", "tech-support", now - 60, False, True, True),
+    ]
+    for message_id, user, text, channel, ts, is_question, has_problem, has_urgency in rows:
+        row = {
+            'message_id': message_id, 'user': user, 'text': text, 'channel': channel,
+            'thread_id': str(ts), 'timestamp': '', 'timestamp_parsed': ts,
+            'message_length': len(text), 'is_question': is_question,
+            'has_problem_keywords': has_problem, 'has_urgency': has_urgency,
+            'searchable_text': text.lower()
+        }
+        rag_index.upsert(message_id, row)
+        service.search_index.add(message_id, text, channel=channel, ts=ts, payload=row)
+        service._update_timelines(message_id, row, 0, True)
+    
+    recent = service.get_recent_messages(hours=24, limit=10)
+    assert [m['message_id'] for m in recent] == ["m3", "m2", "m1"]
+    
+    problems = service.query_messages(has_problem_keywords=True, channel="general", fields=["message_id"])
+    assert problems == [{'message_id': "m1"}]
+    
+    assert [m['message_id'] for m in service.search_messages("DATABASE")] == ["m3"]
+    assert [m['message_id'] for m in service.search_messages("errors", channel="tech-support")] == []
+    assert [m['message_id'] for m in service.search_messages("deadline", hours=1)] == ["m2"]
+    
+    # Repeated query with no new data is served from the cache
+    hits = service.cache_hits
+    copy_rows, rag_index.snapshot = rag_index.snapshot, None  # a hit must not copy the table
+    service.get_recent_messages(hours=24, limit=10)
+    rag_index.snapshot = copy_rows
+    assert service.cache_hits == hits + 1
+    
+    # New data bumps the watermark and invalidates cached results
+    rag_index.remove("m3")
+    assert [m['message_id'] for m in service.get_recent_messages(hours=24, limit=10)] == ["m2", "m1"]
+    
+    # Keyset pages over the time-ordered indexes
+    page = service.page_messages('all', limit=2)
+    assert [m['message_id'] for m in page['messages']] == ["m3", "m2"]
+    assert page['prev_cursor'] is None
+    older = service.page_messages('all', limit=2, before=decode_cursor(page['next_cursor']))
+    assert [m['message_id'] for m in older['messages']] == ["m1"]
+    assert older['next_cursor'] is None
+    newer = service.page_messages('all', limit=2, after=decode_cursor(older['prev_cursor']))
+    assert [m['message_id'] for m in newer['messages']] == ["m3", "m2"]
+    assert [m['message_id'] for m in service.page_messages('problems', limit=5)['messages']] == ["m3", "m1"]
+    
+    # Channel stats come from the maintained channels aggregate
+    for channel, count, users in (("general", 5, 3), ("random", 2, 1), ("tech-support", 5, 2)):
+        service.live['channels'].upsert(channel, {
+            'channel_id': channel, 'message_count': count, 'questions_count': 1,
+            'problems_count': 0, 'urgent_count': 0, 'unique_users': users, 'last_activity': now
+        })
+    page = service.get_channel_stats(sort_by='message_count', offset=0, limit=2)
+    assert page['total'] == 3
+    assert [c['channel'] for c in page['channels']] == ["tech-support", "general"]
+    page = service.get_channel_stats(sort_by='unique_users', descending=False, offset=1, limit=2)
+    assert [c['channel'] for c in page['channels']] == ["tech-support", "general"]
+    
+    logger.info("✅ Pathway query engine works correctly")
+    return True
+
 def test_rag_query_service():
     """Test the RAG query service with Pathway integration."""
     try:
@@ -153,6 +227,40 @@ def test_rag_query_service():
         logger.error(f"❌ RAG query service test failed: {e}")
         return False
 
+def test_file_message_paging():
+    """Test file-based paging: cursors only when rows exist that way; bad lines are skipped."""
+    import tempfile
+    from rag_query_service import RAGQueryService
+    from time_index import decode_cursor
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        service = RAGQueryService()
+        service.pathway_service = None
+        service.messages_file = Path(tmp) / "messages.json"
+        lines = [json.dumps({'message_id': f"m{i}", 'text': f"message {i}", 'ts': str(1700000000 + i)}) for i in range(3)]
+        service.messages_file.write_text("\n".join(lines[:2] + ["{not json"] + lines[2:]) + "\n")
+        
+        page = service.page_messages(limit=2)
+        assert [m['message_id'] for m in page['messages']] == ["m2", "m1"]
+        assert page['prev_cursor'] is None and page['next_cursor']
+        older = service.page_messages(limit=2, before=decode_cursor(page['next_cursor']))
+        assert [m['message_id'] for m in older['messages']] == ["m0"]
+        assert older['next_cursor'] is None and older['prev_cursor']
+        newer = service.page_messages(limit=5, after=decode_cursor(older['prev_cursor']))
+        assert [m['message_id'] for m in newer['messages']] == ["m2", "m1"]
+        assert newer['prev_cursor'] is None and newer['next_cursor']
+        oldest = service.page_messages(limit=5, after=(0.0, ""))
+        assert len(oldest['messages']) == 3 and oldest['next_cursor'] is None
+
+        # Appended lines are indexed from the file tail on the next request
+        with service.messages_file.open("a") as f:
+            f.write(json.dumps({'message_id': "m3", 'text': "message 3", 'ts': str(1700000003)}) + "\n")
+        latest = service.page_messages(limit=1)
+        assert [m['message_id'] for m in latest['messages']] == ["m3"] and len(service.timeline) == 4
+
+    logger.info("✅ File-based message paging works correctly")
+    return True
+
 def test_ai_service():
     """Test the AI service."""
     try:
@@ -200,12 +308,707 @@ def test_stream_processing():
         assert len(messages) > 0
         logger.info(f"✅ Stream read successful: {len(messages)} messages")
         
+        
         return True
         
     except Exception as e:
         logger.error(f"❌ Stream processing test failed: {e}")
         return False
 
+def test_channel_shards():
+    """Test that channel shards partition the stream without losing messages."""
+    from stream import read_stream, channel_shard
+    
+    messages = list(read_stream())
+    assert channel_shard("general", 4) == channel_shard("general", 4)
+    sharded = sum(len(list(read_stream(shard=shard, num_shards=4))) for shard in range(4))
+    assert sharded == len(messages)
+    logger.info("✅ Channel sharding covers every message exactly once")
+    return True
+
+def test_thread_helpers():
+    """Test thread grouping helpers used by the threads table."""
+    from utils import build_thread_text, thread_participants
+    
+    entries = (
+        (1.0, "m1", "alice", "Our deploy is failing on Railway"),
+        (2.0, "m2", "bob", "Check the build logs"),
+        (3.0, "m3", "alice", "Found it, missing env var"),
+    )
+    
+    assert thread_participants(entries) == "alice, bob"
+    
+    thread_text = build_thread_text(entries)
+    assert thread_text.startswith("alice: Our deploy is failing")
+    assert thread_text.count("\n") == 2
+    
+    capped = build_thread_text(entries, max_chars=20)
+    assert len(capped) <= 23 and capped.endswith("...")
+    
+    logger.info("✅ Thread helpers work correctly")
+    return True
+
+def test_top_k_selection():
+    """Test the shared top-k selector against a full sort."""
+    import random
+    from utils import select_top_k, message_ts
+    
+    messages = [{"ts": str(random.uniform(0, 1e9))} for _ in range(1000)]
+    messages.append({"ts": "not-a-timestamp"})
+    
+    expected = sorted(messages, key=message_ts, reverse=True)[:25]
+    assert select_top_k(messages, 25, key=message_ts) == expected
+    assert select_top_k(iter(messages), 0, key=message_ts) == []
+    
+    logger.info("✅ Top-k selection matches a full sort")
+    return True
+
+def test_pipeline_metrics():
+    """Test pipeline metrics counters and Prometheus rendering."""
+    from pipeline_metrics import PipelineMetrics
+    
+    metrics = PipelineMetrics()
+    metrics.stage_inputs['valid_messages'] = 'messages_table'
+    metrics.record_rows('messages_table', inserted=5)
+    metrics.record_rows('valid_messages', inserted=4, deleted=1)
+    metrics.record_visibility(time.time() - 2)
+    metrics.record_connector_emit()
+    
+    @metrics.timed_udf("created_at")
+    def created_at(ts):
+        return ts
+    created_at("1")
+    
+    snapshot = metrics.snapshot()
+    assert snapshot['stages']['valid_messages']['rows_in'] == 5
+    assert snapshot['stages']['valid_messages']['current_rows'] == 3
+    assert snapshot['rag_index_lag']['samples'] == 1
+    assert snapshot['udfs']['created_at']['calls'] == 1
+    
+    text = metrics.to_prometheus()
+    assert 'pathway_stage_rows_out_total{stage="valid_messages"} 4' in text
+    assert '# TYPE pathway_connector_backlog gauge' in text
+    
+    logger.info("✅ Pipeline metrics work correctly")
+    return True
+
+def test_message_stats():
+    """Test incremental message stats, including window expiry and retraction."""
+    from message_stats import MessageStats
+    
+    stats = MessageStats(window_hours=1)
+    now = time.time()
+    stats.add(user="alice", channel="general", ts=now - 10, length=20, is_question=True)
+    stats.add(user="bob", channel="help", ts=now - 20, length=40, has_problem=True)
+    stats.add(user="carol", channel="general", ts=now - 7200, length=10)
+    
+    snapshot = stats.snapshot()
+    assert snapshot['total_messages'] == 2
+    assert snapshot['unique_users'] == 2
+    assert snapshot['avg_message_length'] == 30
+    assert snapshot['questions_count'] == 1
+    assert snapshot['problems_count'] == 1
+    assert snapshot['total_messages_all_time'] == 3
+    
+    stats.remove(user="bob", channel="help", ts=now - 20, length=40, has_problem=True)
+    snapshot = stats.snapshot()
+    assert snapshot['total_messages'] == 1
+    assert snapshot['problems_count'] == 0
+    
+    # Buckets slide out of the window as time passes
+    assert stats.snapshot(now=now + 7200)['total_messages'] == 0
+    
+    logger.info("✅ Message stats update incrementally")
+    return True
+
+def test_insight_cache():
+    """Test that insights are only regenerated when their messages change."""
+    from insight_cache import InsightCache
+    
+    calls = []
+    def generate(question, messages):
+        calls.append(question)
+        return f"{len(messages)} messages"
+    
+    problems = [{'message_id': "m1"}, {'message_id': "m2"}]
+    cache = InsightCache(generate, staleness_seconds=0)
+    cache.add_section('problems', "Top problems?", lambda: list(problems), "No problems.")
+    cache.add_section('questions', "Top questions?", lambda: [], "No questions.")
+    
+    assert cache.refresh() == ['problems', 'questions']
+    assert calls == ["Top problems?"]
+    
+    # Same messages: nothing regenerated
+    assert cache.refresh() == []
+    
+    problems.append({'message_id': "m3"})
+    assert cache.refresh() == ['problems']
+    
+    # Changes inside the staleness budget wait for the budget to expire
+    cache.staleness_seconds = 3600
+    problems.append({'message_id': "m4"})
+    assert cache.refresh() == []
+    
+    insights = cache.get()
+    cache.stop()
+    assert insights['problems'] == "3 messages"
+    assert insights['questions'] == "No questions."
+    assert insights['cache']['sections']['problems']['age_seconds'] is not None
+    
+    logger.info("✅ Insight cache regenerates only on change")
+    return True
+
+def test_fan_out():
+    """Test concurrent fan-out with partial results on timeout."""
+    from fanout import fan_out
+    
+    late = []
+    started = time.perf_counter()
+    results = fan_out(
+        {'fast': lambda: "fast", 'also_fast': lambda: "also fast", 'slow': lambda: time.sleep(0.5) or "slow"},
+        timeout=0.2,
+        on_late_result=lambda name, result: late.append((name, result))
+    )
+    assert results == {'fast': "fast", 'also_fast': "also fast"}
+    assert time.perf_counter() - started < 0.5
+    
+    time.sleep(0.5)
+    assert late == [('slow', "slow")]
+    
+    logger.info("✅ Fan-out returns partial results on timeout")
+    return True
+
+def test_bm25_index():
+    """Test BM25 ranking, filters and incremental updates of the inverted index."""
+    from bm25_index import BM25Index, tokenize
+    
+    assert tokenize("The deployments are failing!") == ["deployment", "fail"]
+    assert tokenize("deploying") == tokenize("deployed") == tokenize("deploys")
+    
+    index = BM25Index()
+    index.add("m1", "Login API returns an error", channel="general", ts=1, payload="m1")
+    index.add("m2", "Another error in the build, error everywhere", channel="general", ts=2, payload="m2")
+    index.add("m3", "Database migration error", channel="backend", ts=3, payload="m3")
+    index.add("m4", "Lunch is served", channel="general", ts=4, payload="m4")
+    
+    # The rare term outweighs the common one
+    assert [doc for _, doc in index.search("database error")][0] == "m3"
+    assert [doc for _, doc in index.search("error", channel="general")] == ["m2", "m1"]
+    assert [doc for _, doc in index.search("error", since=2.5)] == ["m3"]
+    assert index.search("the and of") == []
+    
+    index.remove("m3")
+    assert [doc for _, doc in index.search("database")] == []
+    assert "databas" not in index.postings
+    
+    logger.info("✅ BM25 index ranks and updates correctly")
+    return True
+
+def test_hybrid_ranking():
+    """Test that ranking blends relevance with recency and urgency."""
+    from ranking import HybridRanker
+    
+    now = time.time()
+    ranker = HybridRanker(relevance_weight=1.0, recency_weight=0.5, half_life_minutes=60,
+                          urgency_boost=0.3, problem_boost=0.2)
+    candidates = [
+        {'message_id': "stale", 'score': 2.0, 'ts': str(now - 6 * 3600)},
+        {'message_id': "fresh", 'score': 1.9, 'ts': str(now - 60)},
+        {'message_id': "urgent", 'score': 1.0, 'ts': str(now - 1800), 'has_urgency': True, 'has_problem_keywords': True},
+        {'message_id': "noise", 'score': 0.1, 'ts': "not-a-timestamp"},
+    ]
+    
+    ranked = ranker.rank(candidates, limit=3, now=now)
+    assert [c['message_id'] for c in ranked] == ["fresh", "urgent", "stale"]
+    assert ranked[0]['rank_score'] >= ranked[1]['rank_score'] >= ranked[2]['rank_score']
+    assert ranker.rank([], limit=3) == []
+    
+    # Embedding similarity breaks a tie in keyword relevance
+    tied = [{'message_id': "other", 'score': 1.0, 'ts': str(now), 'semantic_score': 0.1},
+            {'message_id': "similar", 'score': 1.0, 'ts': str(now), 'semantic_score': 0.8}]
+    assert ranker.rank(tied, limit=1, now=now)[0]['message_id'] == "similar"
+    
+    logger.info("✅ Hybrid ranking prefers fresh and urgent matches")
+    return True
+
+def test_time_index():
+    """Test keyset pagination over the time-ordered index."""
+    from time_index import TimeIndex, encode_cursor, decode_cursor
+    
+    index = TimeIndex()
+    for i in range(10):
+        index.add(f"m{i}", 100 + i, {'message_id': f"m{i}"})
+    index.add("m5b", 105, {'message_id': "m5b"})  # same ts, ordered by message_id
+    
+    rows, has_older, has_newer = index.page(3)
+    assert [r['message_id'] for r in rows] == ["m9", "m8", "m7"]
+    assert has_older and not has_newer
+    
+    rows, has_older, has_newer = index.page(3, before=(106.0, "m6"))
+    assert [r['message_id'] for r in rows] == ["m5b", "m5", "m4"]
+    assert has_older and has_newer
+    
+    rows, _, _ = index.page(2, after=(105.0, "m5"))
+    assert [r['message_id'] for r in rows] == ["m6", "m5b"]
+    
+    rows, has_older, _ = index.page(5, since=108)
+    assert [r['message_id'] for r in rows] == ["m9", "m8"] and not has_older
+    
+    index.remove("m9")
+    assert index.page(1)[0][0]['message_id'] == "m8"
+    
+    assert decode_cursor(encode_cursor(105.25, "1700000000.1_U123")) == (105.25, "1700000000.1_U123")
+    try:
+        decode_cursor("not a cursor")
+        assert False, "malformed cursor accepted"
+    except ValueError:
+        pass
+    
+    logger.info("✅ Time index pages by cursor")
+    return True
+
+def test_response_cache():
+    """Test the LLM response cache: keying, persistence across restarts and TTL."""
+    import tempfile
+    from response_cache import ResponseCache, response_key
+    
+    context = [{'message_id': "m1", 'text': "Login API returns an error"}]
+    config = {'max_output_tokens': 500, 'temperature': 0.7}
+    key = response_key("gemini-1.5-flash", config, "What are the top 3 problems?", context)
+    
+    # Normalised query matches; different context, model or config do not
+    assert key == response_key("gemini-1.5-flash", config, "  what are the TOP 3 problems? ", context)
+    assert key != response_key("gemini-1.5-flash", config, "What are the top 3 problems?",
+                               [{'message_id': "m1", 'text': "Login API works"}])
+    assert key != response_key("gemini-1.5-pro", config, "What are the top 3 problems?", context)
+    assert key != response_key("gemini-1.5-flash", dict(config, temperature=0.2), "What are the top 3 problems?", context)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "llm_cache.sqlite3")
+        cache = ResponseCache(path=path, ttl_seconds=60)
+        assert cache.get(key) is None
+        cache.put(key, "Auth errors", latency_seconds=1.5)
+        assert cache.get(key) == "Auth errors"
+        
+        # A new process starts with an empty LRU but finds the answer on disk
+        restarted = ResponseCache(path=path, ttl_seconds=60)
+        assert restarted.get(key) == "Auth errors"
+        stats = restarted.stats()
+        assert stats['disk_hits'] == 1 and stats['saved_seconds'] == 1.5
+        
+        expired = ResponseCache(path=path, ttl_seconds=0)
+        time.sleep(0.01)
+        assert expired.get(key) is None
+    
+    logger.info("✅ Response cache works correctly")
+    return True
+
+def test_context_packer():
+    """Test deduplication, truncation around query terms and the token budget."""
+    from context_packer import ContextPacker, estimate_tokens
+    
+    packer = ContextPacker(token_budget=120, message_token_limit=30, duplicate_similarity=0.8)
+    long_text = "intro " * 100 + "the database migration failed " + "tail " * 100
+    messages = [
+        {'message_id': "m1", 'text': "Login API returns an error"},
+        {'message_id': "m2", 'text': "login API returns an error!"},
+        {'message_id': "m3", 'text': long_text},
+        {'message_id': "m4", 'text': "word " * 400},
+        {'message_id': "m5", 'text': "Deploy is done"},
+    ]
+    
+    packed = packer.pack("database migration", messages)
+    ids = [m['message_id'] for m in packed]
+    assert "m2" not in ids  # near-duplicate of m1
+    assert "migration" in packed[ids.index("m3")]['text']
+    assert estimate_tokens(packed[ids.index("m3")]['text']) <= 32
+    assert messages[2]['text'] == long_text  # input is not modified
+    assert packer.last_stats['tokens_out'] <= 120
+    assert packer.last_stats['duplicates_dropped'] == 1
+    
+    logger.info("✅ Context packer keeps prompts within budget")
+    return True
+
+def test_response_streaming():
+    """Test streamed answers: chunks arrive in order, the joined answer is cached, SSE framing."""
+    import tempfile
+    from ai_service import RAGService
+    from llm_provider import LLMProvider
+    from response_cache import ResponseCache
+    from main import sse_event
+    
+    class ChunkedProvider(LLMProvider):
+        model_name = "chunked"
+        calls = 0
+        
+        def generate(self, prompt, max_tokens, temperature, timeout=None):
+            return "".join(self.generate_stream(prompt, max_tokens, temperature, timeout))
+        
+        def generate_stream(self, prompt, max_tokens, temperature, timeout=None):
+            self.calls += 1
+            yield from ["Auth ", "errors"]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        service = RAGService(provider=ChunkedProvider())
+        service.cache = ResponseCache(path=os.path.join(tmp, "llm_cache.sqlite3"))
+        context = [{'message_id': "m1", 'user': "alice", 'text': "Login API returns an error", 'ts': "1700000000"}]
+        
+        assert list(service.generate_response_stream("top problems?", context)) == ["Auth ", "errors"]
+        # The second ask is served from the cache in one chunk
+        assert list(service.generate_response_stream("top problems?", context)) == ["Auth errors"]
+        assert service.llm.calls == 1
+    
+    event = sse_event("chunk", {"text": "a\nb"})
+    assert event == 'event: chunk\ndata: {"text": "a\\nb"}\n\n'
+    
+    logger.info("✅ Response streaming works correctly")
+    return True
+
+def test_llm_provider():
+    """Test backend selection and the deterministic offline stub."""
+    import tempfile
+    from ai_service import RAGService
+    from llm_provider import LLMProvider, StubProvider, create_provider
+    from response_cache import ResponseCache
+    
+    # Backends must implement generate()
+    try:
+        LLMProvider()
+        assert False, "abstract provider instantiated"
+    except TypeError:
+        pass
+    
+    stub = StubProvider(latency_seconds=0.05, chunks=3)
+    started = time.perf_counter()
+    answer = stub.generate("Query: top problems?", 100, 0.7)
+    assert time.perf_counter() - started >= 0.05
+    assert answer == stub.generate("Query: top problems?", 100, 0.7)
+    assert answer != stub.generate("Query: open questions?", 100, 0.7)
+    assert "".join(stub.generate_stream("Query: top problems?", 100, 0.7)) == answer
+    
+    assert isinstance(create_provider("stub"), StubProvider)
+    try:
+        create_provider("nope")
+        assert False, "unknown backend accepted"
+    except ValueError:
+        pass
+    
+    # The backend is only built when a response is first needed
+    service = RAGService()
+    assert service._provider is None
+    with tempfile.TemporaryDirectory() as tmp:
+        service = RAGService(provider=StubProvider(latency_seconds=0))
+        service.cache = ResponseCache(path=os.path.join(tmp, "llm_cache.sqlite3"))
+        reply = service.generate_response("top problems?", [{'message_id': "m1", 'text': "Login API error"}])
+        assert reply.startswith("Stub answer") and "top problems?" in reply
+    
+    logger.info("✅ LLM provider works correctly")
+    return True
+
+def test_single_flight():
+    """Test that identical concurrent LLM calls share one generation."""
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from ai_service import RAGService
+    from llm_provider import StubProvider
+    from response_cache import ResponseCache
+    from single_flight import SingleFlight
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = StubProvider(latency_seconds=0.2)
+        service = RAGService(provider=stub)
+        service.cache = ResponseCache(path=os.path.join(tmp, "llm_cache.sqlite3"))
+        context = [{'message_id': "m1", 'text': "Login API returns an error"}]
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            replies = list(pool.map(lambda _: service.generate_response("top problems?", context), range(8)))
+        
+        assert len(set(replies)) == 1 and replies[0].startswith("Stub answer")
+        assert stub.calls == 1
+        stats = service.flights.stats()
+        assert stats['calls'] == 8 and stats['executions'] + stats['coalesced'] == 8
+        assert stats['in_flight'] == 0
+    
+    # Errors reach every waiter and release the key
+    flights = SingleFlight()
+    def fail():
+        time.sleep(0.1)
+        raise RuntimeError("quota exceeded")
+    def call(_):
+        try:
+            flights.do("k", fail)
+        except RuntimeError as e:
+            return str(e)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        assert list(pool.map(call, range(3))) == ["quota exceeded"] * 3
+    assert flights.do("k", lambda: "ok") == "ok"
+    
+    logger.info("✅ Single-flight coalescing works correctly")
+    return True
+
+def test_circuit_breaker():
+    """Test LLM deadlines, the circuit breaker and the extractive fallback."""
+    import tempfile
+    from ai_service import RAGService
+    from llm_provider import StubProvider
+    from response_cache import ResponseCache
+    from circuit_breaker import CircuitBreaker
+    from extractive_answer import FALLBACK_NOTICE
+    
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.1)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow() and breaker.state == "open"
+    time.sleep(0.12)
+    assert breaker.allow() and not breaker.allow()  # one trial call while half open
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+    
+    # Only the permit that took the half-open trial frees it
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.12)
+    trial = breaker.admit()
+    assert trial and breaker.admit() is None
+    breaker.release(0)
+    assert breaker.admit() is None
+    breaker.release(trial)
+    assert breaker.admit()
+    breaker.record_success()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        stub = StubProvider(latency_seconds=1.0)
+        service = RAGService(provider=stub)
+        service.cache = ResponseCache(path=os.path.join(tmp, "llm_cache.sqlite3"))
+        service.request_timeout = 0.05
+        service.breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+        context = [{'message_id': "m1", 'user': "alice", 'text': "Database connection timeout, we are stuck"}]
+        
+        # Timeouts are cut at the deadline and answered locally
+        for query in ("top problems?", "what are the problems now?"):
+            started = time.perf_counter()
+            reply = service.generate_response(query, context)
+            assert time.perf_counter() - started < 0.5
+            assert reply.startswith(FALLBACK_NOTICE) and "Database" in reply
+        
+        # The breaker is now open: no model call at all
+        calls = stub.calls
+        assert "Database" in "".join(service.generate_response_stream("problems again?", context))
+        assert service.generate_response("any problems?", context).startswith(FALLBACK_NOTICE)
+        assert stub.calls == calls
+        stats = service.resilience_stats()
+        assert stats['state'] == "open" and stats['fallbacks'] == 4 and stats['rejected'] == 2
+        
+        # A client that disconnects during the half-open trial gives the trial back
+        stub.latency_seconds = 0
+        service.request_timeout = 5
+        service.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+        service.breaker.record_failure()
+        time.sleep(0.06)
+        stream = service.generate_response_stream("what are people stuck on?", context)
+        next(stream)
+        stream.close()
+        assert service.breaker.state == "half_open" and service.breaker.allow()
+    
+    logger.info("✅ Circuit breaker and fallback work correctly")
+    return True
+
+def test_embedding_index():
+    """Test local embeddings: relevance, per-message caching and bounded size."""
+    import numpy as np
+    from embedding_index import EmbeddingIndex
+    from ai_service import RAGService
+    
+    messages = [
+        {'message_id': "m1", 'user': "alice", 'text': "Database connection timeout on deploy"},
+        {'message_id': "m2", 'user': "bob", 'text': "Lunch is served in the main hall"},
+        {'message_id': "m3", 'user': "carol", 'text': "Login API returns an authentication error"},
+        {'message_id': "m4", 'user': "dave", 'text': "The database migration keeps timing out"},
+    ]
+    
+    index = EmbeddingIndex(dim=4096, capacity=100)
+    results = index.search("database timeout", messages, limit=2)
+    assert {msg['message_id'] for _, msg in results} == {"m1", "m4"}
+    assert all(0 < score <= 1.0001 for score, _ in results)
+    assert index.stats()['misses'] == 4
+    
+    # Second query reuses the stored vectors
+    results = index.search("authentication error", messages, limit=3)
+    assert results[0][1]['message_id'] == "m3"
+    assert index.stats()['hits'] == 4 and len(index) == 4
+    assert index.search("quantum knitting", messages) == []
+    
+    # Stored vectors are unit length rows of one float32 matrix
+    assert index.matrix.dtype == np.float32
+    assert abs(np.linalg.norm(index.matrix[index.rows["m1"]]) - 1.0) < 1e-5
+    
+    # Past capacity the oldest messages are evicted
+    small = EmbeddingIndex(dim=64, capacity=3)
+    for i in range(5):
+        small.add(f"m{i}", f"message number {i}")
+    assert len(small) == 3 and "m0" not in small.rows and "m4" in small.rows
+    
+    service = RAGService()
+    assert len(service.get_embedding("deploy failed")) == service.embeddings.dim
+    assert service.find_relevant_messages("login error", messages, top_k=1)[0]['message_id'] == "m3"
+    
+    # Retrieval candidates get their similarity as the ranker's semantic score
+    scored = service.with_semantic_scores("login error", messages)
+    assert [msg['message_id'] for msg in scored] == ["m1", "m2", "m3", "m4"]
+    assert max(scored, key=lambda msg: msg['semantic_score'])['message_id'] == "m3"
+    assert 'semantic_score' not in messages[0]
+    
+    logger.info("✅ Embedding index works correctly")
+    return True
+
+def test_textrank_summarizer():
+    """Test the TextRank summarizer and per-section engine selection."""
+    from textrank import TextRankSummarizer, split_sentences, EMPTY_SUMMARY
+    from ai_service import RAGService, parse_engines
+    from llm_provider import StubProvider
+    
+    assert split_sentences("Deploy failed again. ok\nThe database is down!") == ["Deploy failed again.", "The database is down!"]
+    
+    messages = [
+        {'user': "alice", 'text': "The database connection keeps timing out on deploy. We restarted it twice."},
+        {'user': "bob", 'text': "Database timeout again when we deploy to staging."},
+        {'user': "carol", 'text': "Lunch is served in the main hall now."},
+        {'user': "dave", 'text': "Deploy failed with a database connection timeout."},
+    ]
+    summarizer = TextRankSummarizer(sentences=2)
+    ranked = summarizer.rank(messages)
+    assert "database" in ranked[0][1].lower() and "Lunch" not in ranked[0][1]
+    summary = summarizer.summarize(messages)
+    assert summary.count("•") == 2 and "Lunch" not in summary
+    assert summarizer.summarize([]) == EMPTY_SUMMARY
+    
+    assert parse_engines("trending=textrank, problems=LLM,questions=magic") == {'trending': 'textrank', 'problems': 'llm'}
+    
+    stub = StubProvider(latency_seconds=0)
+    service = RAGService(provider=stub)
+    insights = service.get_predefined_insights(messages, engines={'problems': 'textrank', 'questions': 'textrank',
+                                                                  'trending': 'textrank'})
+    assert "database" in insights['trending'].lower() and stub.calls == 0
+    
+    logger.info("✅ TextRank summarizer works correctly")
+    return True
+
+def test_llm_scheduler():
+    """Test token-bucket rate limits, priority order and queue timeouts."""
+    import threading
+    from llm_scheduler import LLMScheduler, QueueTimeoutError, INTERACTIVE, BACKGROUND
+    
+    # 120 requests/min = one every 0.5s once the burst allowance is used
+    scheduler = LLMScheduler(requests_per_minute=120, tokens_per_minute=0, max_in_flight=4, queue_timeout=5)
+    scheduler.requests.level = 0
+    order = []
+    
+    def call(name, priority, delay):
+        time.sleep(delay)
+        with scheduler.slot(priority):
+            order.append(name)
+    
+    threads = [threading.Thread(target=call, args=("background", BACKGROUND, 0.0)),
+               threading.Thread(target=call, args=("background-2", BACKGROUND, 0.05)),
+               threading.Thread(target=call, args=("interactive", INTERACTIVE, 0.1))]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    
+    # All three queue for the first token; the interactive call arrived last but goes first
+    assert order == ["interactive", "background", "background-2"], order
+    assert 1.2 < elapsed < 2.5, elapsed
+    stats = scheduler.stats()
+    assert stats['queue_wait']['background']['admitted'] == 2
+    assert stats['queue_wait']['interactive']['max_ms'] > 0
+    assert stats['in_flight'] == 0 and stats['queued'] == 0
+    
+    # Token limits: a call needing more tokens than are left waits; callers past the timeout give up
+    scheduler = LLMScheduler(requests_per_minute=0, tokens_per_minute=600, max_in_flight=1, queue_timeout=0.1)
+    with scheduler.slot(INTERACTIVE, tokens=600):
+        pass
+    try:
+        with scheduler.slot(INTERACTIVE, tokens=100):
+            assert False, "admitted without tokens"
+    except QueueTimeoutError:
+        pass
+    assert scheduler.stats()['queue_wait']['interactive']['timed_out'] == 1
+    assert scheduler.stats()['queued'] == 0
+    
+    logger.info("✅ LLM scheduler works correctly")
+    return True
+
+def test_batched_insights():
+    """Test single-call JSON insights, robust parsing and the per-section fallback."""
+    from ai_service import RAGService, parse_json_object
+    from llm_provider import StubProvider
+    from response_cache import ResponseCache
+    from insight_cache import InsightCache
+    
+    keys = ["problems", "questions", "trending"]
+    assert parse_json_object('{"problems": "Auth", "questions": "Demo"}', keys) == {'problems': "Auth", 'questions': "Demo"}
+    assert parse_json_object('```json\n{"problems": ["Auth", "DB"]}\n```', keys) == {'problems': "• Auth\n• DB"}
+    assert parse_json_object('Sure! Here you go: {"trending": "Deploys"} Hope that helps.', keys) == {'trending': "Deploys"}
+    assert parse_json_object("Problems: auth errors", keys) is None
+    assert parse_json_object('{"problems": "Auth",}', keys) is None
+    
+    class ScriptedProvider(StubProvider):
+        def __init__(self, batch_answer):
+            super().__init__(latency_seconds=0)
+            self.batch_answer = batch_answer
+            self.prompts = []
+        
+        def generate(self, prompt, max_tokens, temperature, timeout=None):
+            self.prompts.append(prompt)
+            self.calls += 1
+            return self.batch_answer if "JSON object" in prompt else "section answer"
+    
+    messages = [
+        {'message_id': "m1", 'user': "alice", 'text': "Login API error, we are stuck", 'ts': "1700000000"},
+        {'message_id': "m2", 'user': "bob", 'text': "How do we submit the demo?", 'ts': "1700000060"},
+        {'message_id': "m3", 'user': "carol", 'text': "Docker build is broken?", 'ts': "1700000120"},
+    ]
+    
+    provider = ScriptedProvider('{"problems": "Auth", "questions": "Demo", "trending": "Docker"}')
+    service = RAGService(provider=provider)
+    service.cache = ResponseCache(path="")
+    service.insight_mode = "batch"
+    insights = service.get_predefined_insights(messages)
+    assert insights == {'problems': "Auth", 'questions': "Demo", 'trending': "Docker"}
+    assert provider.calls == 1
+    # m3 is both a problem and a question but appears once in the prompt
+    assert provider.prompts[0].count("Docker build is broken?") == 1
+    
+    # Unparseable answer: every section is generated on its own
+    provider = ScriptedProvider("Auth problems mostly.")
+    service = RAGService(provider=provider)
+    service.cache = ResponseCache(path="")
+    service.insight_mode = "batch"
+    insights = service.get_predefined_insights(messages)
+    assert set(insights.values()) == {"section answer"} and provider.calls == 4
+    
+    # The insight cache sends batchable sections in one call
+    batches = []
+    def generate_batch(sections):
+        batches.append(sorted(sections))
+        return {name: f"{name} text" for name in sections}
+    cache = InsightCache(lambda question, msgs: "single", generate_batch=generate_batch, timeout_seconds=5)
+    cache.add_section('problems', "Problems?", lambda: messages[:1], "none", batch=True)
+    cache.add_section('questions', "Questions?", lambda: messages[1:], "none", batch=True)
+    cache.add_section('trending', "Trending?", lambda: messages, "none")
+    assert sorted(cache.refresh()) == ['problems', 'questions', 'trending']
+    assert batches == [['problems', 'questions']]
+    result = cache.get()
+    assert result['problems'] == "problems text" and result['trending'] == "single"
+    cache.stop()
+    
+    logger.info("✅ Batched insights work correctly")
+    return True
+
 def test_dependencies():
     """Test that all required dependencies are available."""
     try:
@@ -229,6 +1032,116 @@ def test_dependencies():
         logger.error(f"❌ Missing dependency: {e}")
         return False
 
+def test_analyzer_single_pass():
+    """Test that the single-pass dashboard analyzer gives the same insights as the old multi-pass one."""
+    from Slack_ingestion.ai_service import AIService
+    
+    messages = [
+        {'user': "alice", 'text': "Database connection timeout when we deploy the backend. Urgent, we are blocked!", 'ts': "1"},
+        {'user': "bob", 'text': "How do we submit the demo video?", 'ts': "2"},
+        {'user': "carol", 'text': "Login error on the auth endpoint, is anyone else stuck?", 'ts': "3"},
+        {'user': "alice", 'text': "What is the problem statement for track two?", 'ts': "4"},
+        {'user': "dave", 'text': "Great progress everyone, lunch is in the main hall", 'ts': "5"},
+        {'user': "bob", 'text': "Where can I find the judging criteria?", 'ts': "6"},
+        {'user': "erin", 'text': "The deployment failed on our hosting provider", 'ts': "7"},
+    ]
+    # Output of the multi-pass implementation for these messages
+    expected = {
+        'problems': "<strong>Top Problems Identified:</strong><br><br>"
+                    "1. <strong>Authentication:</strong> Login error on the auth endpoint, is anyone else stuck? 🚨<br>"
+                    "2. <strong>Database/Infrastructure:</strong> Database connection timeout when we deploy the backend. Urgent, we are blocked! ⚠️<br>"
+                    "3. <strong>Problem Understanding:</strong> What is the problem statement for track two? <br>"
+                    "4. <strong>Deployment:</strong> The deployment failed on our hosting provider <br>",
+        'questions': "<strong>Top Questions by Category:</strong><br><br>"
+                     "<strong>General Question:</strong><br>"
+                     "&bull; Database connection timeout when we deploy the backend. Urgent, we are blocked!<br>"
+                     "&bull; Login error on the auth endpoint, is anyone else stuck?<br><br>"
+                     "<strong>How-to:</strong><br>&bull; How do we submit the demo video?<br><br>"
+                     "<strong>Clarification:</strong><br>&bull; What is the problem statement for track two?<br><br>"
+                     "<strong>Resource Location:</strong><br>&bull; Where can I find the judging criteria?<br><br>",
+        'trending': "<strong>Current Trends:</strong><br><br>"
+                    "<strong>Problem Statement Clarification:</strong> Multiple participants are struggling to understand the problem statement. 🚨<br><br>"
+                    "<strong>API & Authentication Issues:</strong> Several teams are reporting problems with API authentication and general authentication flows. 🚨<br><br>"
+                    "<strong>Deployment & Infrastructure:</strong> Questions about deploying apps and database connection timeouts highlight infrastructure challenges. ⚠️<br><br>"
+                    "<strong>Key Terms:</strong> database, connection, timeout, when, deploy",
+    }
+    
+    analyzer = AIService()
+    assert analyzer.analyze_messages(messages) == expected
+    assert analyzer.analyze_messages([]) == analyzer._get_empty_insights()
+    
+    # Every message is read once into a feature record
+    features = analyzer._extract_features(messages)
+    assert len(features) == len(messages)
+    assert [f.is_problem for f in features] == [True, False, True, True, False, False, True]
+    assert features[0].urgency == 3 and features[2].urgency == 5
+    
+    logger.info("✅ Single-pass analyzer matches the multi-pass results")
+    return True
+
+def test_keyword_automaton():
+    """Test whole-word, multi-word and overlapping keyword matching."""
+    from Slack_ingestion.keyword_automaton import KeywordAutomaton
+    from Slack_ingestion.ai_service import AIService
+    
+    automaton = KeywordAutomaton({
+        'question': ['how', 'can', 'is there'],
+        'help': ['help'],
+        'help me': ['help me'],
+        'broken': ['not working', 'working late'],
+    })
+    
+    # Whole words only: no hits inside longer words
+    assert automaton.scan("please show the scan results") == frozenset()
+    assert automaton.scan("how can i fix this") == {'question'}
+    assert automaton.scan("helpful hints") == frozenset()
+    
+    # Multi-word keywords need the whole phrase, in order
+    assert automaton.scan("is there a mentor") == {'question'}
+    assert automaton.scan("there is a mentor") == frozenset()
+    
+    # Overlapping keywords are all reported
+    assert automaton.scan("can you help me") == {'question', 'help', 'help me'}
+    assert automaton.scan("please help") == {'help'}
+    assert automaton.scan("it is not working late at night") == {'broken'}
+    assert automaton.scan("") == frozenset()
+    
+    # The analyzer uses whole-word matching, with plural forms listed explicitly
+    analyzer = AIService()
+    show, = analyzer._extract_features([{'user': "u", 'text': "Let me show the scan results"}])
+    assert not show.is_question and not show.is_problem
+    plural, = analyzer._extract_features([{'user': "u", 'text': "We have problems with the login flow"}])
+    assert plural.is_problem and plural.category == "Authentication"
+    
+    logger.info("✅ Keyword automaton matches whole words")
+    return True
+
+def test_insight_window():
+    """Test that the incremental insight window matches a full analysis of the same messages."""
+    import random
+    from Slack_ingestion.ai_service import ai_service, InsightWindow
+    
+    words = ("problem with login api how what where deploy hosting database connection timeout "
+             "urgent stuck blocking is there help me explain statement find guide lunch error").split()
+    rng = random.Random(7)
+    window = InsightWindow(ai_service, window=8)
+    assert window.insights() == ai_service.analyze_messages([])
+    
+    messages = []
+    for i in range(60):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 8))) + rng.choice(["", "?"])
+        msg = {'user': f"user{rng.randint(0, 4)}", 'text': text, 'ts': str(1700000000 + i)}
+        messages.append(msg)
+        window.add(msg)
+        assert window.insights() == ai_service.analyze_messages(messages[-8:]), f"after message {i}"
+    
+    # Evicted messages leave no counts behind
+    assert len(window.entries) == 8
+    assert sum(len(seen) for seen in window.user_seen.values()) == 8
+    
+    logger.info("✅ Insight window matches the full analysis")
+    return True
+
 def main():
     """Run all tests."""
     logger.info("🧪 Testing Pathway-based Slack ingestion system...")
@@ -238,9 +1151,34 @@ def main():
         ("Dependencies", test_dependencies),
         ("Pathway Schemas", test_pathway_schemas),
         ("Pathway RAG Service", test_pathway_rag_service),
+        ("Pathway Query Engine", test_pathway_query_engine),
         ("RAG Query Service", test_rag_query_service),
+        ("File Message Paging", test_file_message_paging),
         ("AI Service", test_ai_service),
         ("Stream Processing", test_stream_processing),
+        ("Channel Shards", test_channel_shards),
+        ("Thread Helpers", test_thread_helpers),
+        ("Top-k Selection", test_top_k_selection),
+        ("Pipeline Metrics", test_pipeline_metrics),
+        ("Message Stats", test_message_stats),
+        ("Insight Cache", test_insight_cache),
+        ("LLM Fan-out", test_fan_out),
+        ("BM25 Index", test_bm25_index),
+        ("Hybrid Ranking", test_hybrid_ranking),
+        ("Time Index", test_time_index),
+        ("Response Cache", test_response_cache),
+        ("Context Packer", test_context_packer),
+        ("Response Streaming", test_response_streaming),
+        ("LLM Provider", test_llm_provider),
+        ("Single-flight Coalescing", test_single_flight),
+        ("Circuit Breaker", test_circuit_breaker),
+        ("Embedding Index", test_embedding_index),
+        ("TextRank Summarizer", test_textrank_summarizer),
+        ("LLM Scheduler", test_llm_scheduler),
+        ("Batched Insights", test_batched_insights),
+        ("Single-pass Analyzer", test_analyzer_single_pass),
+        ("Keyword Automaton", test_keyword_automaton),
+        ("Insight Window", test_insight_window),
     ]
     
     results = []